@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+from importlib.util import find_spec
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include every other middleware
+    'LittleLemonAPI.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,13 +85,58 @@ WSGI_APPLICATION = 'APICapstone.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent requests: WAL lets readers run while a write
+# is in progress, transactions take the write lock up front (BEGIN
+# IMMEDIATE) so they wait on busy_timeout instead of failing with "database
+# is locked" part way through, and connections are kept open between
+# requests. See also LITTLELEMON_SQLITE_WRITE_QUEUE.
+#
+# journal_mode = WAL is stored in the database file: the first connection
+# rewrites the header of the committed db.sqlite3, which then shows as
+# modified in git, and creates db.sqlite3-wal and db.sqlite3-shm next to it
+# (both ignored). Run "git checkout db.sqlite3" to drop the change.
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    # With WAL, NORMAL only syncs at checkpoints and is still crash safe
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    # 64 MiB of page cache and 256 MiB memory mapped, per connection
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': '; '.join(SQLITE_PRAGMAS),
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Sends LittleLemonAPI reads to LITTLELEMON_READ_REPLICAS where allowed
+DATABASE_ROUTERS = ['LittleLemonAPI.replicas.ReplicaRouter']
+
+# "default" is per process and holds the cached menu pages and page
+# counts. "shared" is seen by every worker process and holds what they must
+# agree on: the menu version and the replica read-your-writes marks. SQLite
+# keeps the API on one host, so a file based cache is enough; use Redis or
+# Memcached for both once the workers run on several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'var' / 'cache',
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,7 +185,7 @@ INTERNAL_IPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'LittleLemonAPI.renderers.FastJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
         'rest_framework_xml.renderers.XMLRenderer',
     ],
@@ -147,26 +195,82 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'LittleLemonAPI.authentication.RoleClaimsJWTAuthentication',
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication' 
     ),
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'LittleLemonAPI.throttling.AnonBucketThrottle',
+        'LittleLemonAPI.throttling.UserBucketThrottle'
     ],    
     "DEFAULT_THROTTLE_RATES": {
         "anon": "10/day",   
         "user": "100/day",
     },
+    # Tokens taken per request by "<ViewName>.<action>", default 1
+    "THROTTLE_COSTS": {
+        "OrderViewSet.order": 5,
+        "OrderViewSet.export": 10,
+        "OrderViewSet.assign": 10,
+        "OrderViewSet.batch_status": 5,
+        "MenuItemsViewSet.bulk_import": 10,
+    },
+    # Token buckets shared by all worker processes on this host
+    "THROTTLE_STORE": BASE_DIR / "throttle.sqlite3",
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 3,
 }
 
+# MessagePack responses for the POS terminals (Accept: application/msgpack
+# or ?format=msgpack), when msgpack is installed
+if find_spec("msgpack"):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('LittleLemonAPI.renderers.MessagePackRenderer')
+
 DJOSER = {
     "USER_ID_FIELD": "username",
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
-}
\ No newline at end of file
+    # Put the user's roles in the tokens, see LITTLELEMON_JWT_ROLE_CLAIMS
+    'TOKEN_OBTAIN_SERIALIZER': 'LittleLemonAPI.authentication.RoleClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'LittleLemonAPI.authentication.RoleClaimsTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'LittleLemonAPI.authentication.BlacklistIndexTokenVerifySerializer',
+}
+
+# Serve the hot LittleLemonAPI endpoints (menu, cart, orders) with native
+# async views. Only worth turning on when running under an ASGI server.
+LITTLELEMON_ASYNC_VIEWS = False
+
+# Authenticate JWT requests from the role claims in the access token instead
+# of loading the user and their groups. Role changes then take up to
+# ACCESS_TOKEN_LIFETIME to apply.
+LITTLELEMON_JWT_ROLE_CLAIMS = False
+
+# Render the list endpoints with serializers compiled to plain functions,
+# see LittleLemonAPI/compiled.py. Turn off to use the DRF serializers.
+LITTLELEMON_COMPILED_SERIALIZERS = True
+
+# Record per route latency, response size and SQL metrics and serve them in
+# Prometheus format at /metrics. The scraper must send "Authorization:
+# Bearer <LITTLELEMON_METRICS_TOKEN>"; with no token set /metrics answers
+# 403, unless LITTLELEMON_METRICS_PUBLIC = True serves it to anyone.
+LITTLELEMON_METRICS = True
+LITTLELEMON_METRICS_TOKEN = None
+LITTLELEMON_METRICS_PUBLIC = False
+
+# Run SQLite write transactions (checkout, cart changes, order updates) one
+# at a time per process, see LittleLemonAPI/writes.py. Other threads queue
+# on a lock instead of polling the database file on busy_timeout.
+LITTLELEMON_SQLITE_WRITE_QUEUE = True
+
+# Aliases in DATABASES that the menu, order list/detail/export and sales
+# report endpoints read from, see LittleLemonAPI/replicas.py. After a cart
+# change, an order or any other write, a user reads from the primary for
+# LITTLELEMON_REPLICA_STICKY_SECONDS. To try it locally, add a second
+# alias on the same SQLite file (or on a copy of it, or on a local Postgres
+# instance) and mirror it in tests:
+#     DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+#     LITTLELEMON_READ_REPLICAS = ['replica']
+LITTLELEMON_READ_REPLICAS = []
+LITTLELEMON_REPLICA_STICKY_SECONDS = 5
@@ -16,11 +16,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from LittleLemonAPI.metrics import metrics_view
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('djoser.urls.authtoken')),
+    path('', include('djoser.urls.jwt')),
     path('api/', include('LittleLemonAPI.urls')),
     path('__debug__/', include('debug_toolbar.urls')),
+    path('metrics', metrics_view, name="metrics"),
 ]
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class LittelemonapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'LittleLemonAPI'
+
+    def ready(self):
+        # Connect the role cache, menu catalog, token blacklist index, token
+        # cache and sales rollup signals
+        from . import roles, catalog, blacklist, authentication, reports  # noqa: F401
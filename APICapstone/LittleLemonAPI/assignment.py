@@ -0,0 +1,58 @@
+import heapq
+from django.contrib.auth.models import User
+from django.db.models import Case, Count, When
+from .models import Order
+from .roles import DELIVERY_CREW
+from .writes import write_transaction
+
+# Bulk delivery crew assignment. The open, unassigned orders are handed out
+# oldest first to whichever crew member has the fewest open orders at that
+# point, so crew that are already busy get fewer new ones. Crew membership
+# is checked once for the whole batch, and every assignment is written with
+# one UPDATE ... SET delivery_crew_id = CASE id WHEN ... per batch of orders.
+BATCH_SIZE = 500
+
+
+def assign_orders(crew_ids=None, limit=None):
+    # Assign open, unassigned orders to the delivery crew, or to the given
+    # members of it. Returns the (order_id, crew_id) pairs written, or None
+    # and the errors when nothing could be assigned.
+    with write_transaction():
+        crew = set(User.objects.filter(groups__name=DELIVERY_CREW, is_active=True).values_list("id", flat=True))
+        if crew_ids is not None:
+            not_crew = sorted(set(crew_ids) - crew)
+            if not_crew:
+                return None, {"delivery_crew_ids": [f"User {user_id} is not in the Delivery Crew group." for user_id in not_crew]}
+            crew = set(crew_ids)
+        if not crew:
+            return None, {"detail": "There is no delivery crew to assign orders to."}
+
+        # Lock the orders so a concurrent run cannot hand them out twice
+        orders = list(
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(status=False, delivery_crew__isnull=True)
+            .order_by("date", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not orders:
+            return [], None
+
+        load = dict(
+            Order.objects.filter(status=False, delivery_crew_id__in=crew)
+            .values_list("delivery_crew_id")
+            .annotate(Count("id"))
+        )
+        heap = [(load.get(crew_id, 0), crew_id) for crew_id in crew]
+        heapq.heapify(heap)
+        assignments = []
+        for order_id in orders:
+            open_orders, crew_id = heap[0]
+            assignments.append((order_id, crew_id))
+            heapq.heapreplace(heap, (open_orders + 1, crew_id))
+
+        for start in range(0, len(assignments), BATCH_SIZE):
+            batch = assignments[start:start + BATCH_SIZE]
+            Order.objects.filter(id__in=[order_id for order_id, _ in batch]).update(
+                delivery_crew_id=Case(*(When(id=order_id, then=crew_id) for order_id, crew_id in batch))
+            )
+    return assignments, None
@@ -0,0 +1,168 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from .authentication import ASYNC_AUTHENTICATORS
+from .cart import summary_queryset, summarize
+from .pagination import apaginate_page_number
+from .replicas import replica_scope
+from .roles import aget_roles
+from .serializers import CartSummarySerializer
+from .views import MenuItemsViewSet, CartViewSet, OrderViewSet
+
+# Native async versions of the hot endpoints, used under ASGI when
+# LITTLELEMON_ASYNC_VIEWS is on. They reuse the DRF viewsets for querysets,
+# filters, serializers, permissions, pagination and rendering, and only
+# replace the parts that talk to the database with the async ORM. Methods
+# without an async handler are passed on to the regular sync view.
+#
+# Django's async ORM has no transactions yet, so checkout and cart writes
+# still run through sync_to_async.
+
+
+async def authenticate(request, authenticators):
+    # Same order and result as Request._authenticate, without blocking the
+    # event loop on the user lookup
+    for authenticator in authenticators:
+        if hasattr(authenticator, "aauthenticate"):
+            user_auth = await authenticator.aauthenticate(request)
+        elif type(authenticator) in ASYNC_AUTHENTICATORS:
+            user_auth = await ASYNC_AUTHENTICATORS[type(authenticator)](authenticator, request)
+        else:
+            user_auth = await sync_to_async(authenticator.authenticate)(request)
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+    request._not_authenticated()
+
+
+async def apaginate(view, queryset):
+    paginator = view.paginator
+    if paginator is None:
+        return None
+    if hasattr(paginator, "apaginate_queryset"):
+        return await paginator.apaginate_queryset(queryset, view.request, view)
+    if isinstance(paginator, PageNumberPagination):
+        return await apaginate_page_number(paginator, queryset, view.request, view)
+    return await sync_to_async(paginator.paginate_queryset)(queryset, view.request, view)
+
+
+async def alist(view, request):
+    # Filter backends may validate their params against the database
+    queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+    page = await apaginate(view, queryset)
+    if page is not None:
+        return view.get_paginated_response(view.get_serializer(page, many=True).data)
+    rows = [row async for row in queryset]
+    return Response(view.get_serializer(rows, many=True).data)
+
+
+async def aretrieve(view, request, pk):
+    try:
+        instance = await view.get_queryset().aget(pk=pk)
+    except view.get_queryset().model.DoesNotExist:
+        raise Http404
+    view.check_object_permissions(request, instance)
+    return Response(view.get_serializer(instance).data)
+
+
+async def menu_list(view, request):
+    return await view.acatalog_response(request, lambda: alist(view, request))
+
+
+async def menu_retrieve(view, request, pk):
+    return await view.acatalog_response(request, lambda: aretrieve(view, request, pk))
+
+
+async def cart_create(view, request):
+    # The upsert runs in a transaction
+    return await sync_to_async(view.create)(request)
+
+
+async def cart_summary(view, request):
+    rows = [row async for row in summary_queryset(request.user)]
+    return Response(CartSummarySerializer(summarize(rows)).data)
+
+
+async def cart_clear(view, request):
+    # Through write_transaction(), like every other write
+    return await sync_to_async(view.clear)(request)
+
+
+async def order_create(view, request):
+    return await sync_to_async(view.order)(request)
+
+
+def async_view(viewset, actions, handlers):
+    # Build an async Django view for a DRF viewset. actions is the same
+    # method -> action mapping the sync route uses, handlers maps the
+    # methods served natively to their async handler.
+    sync_view = viewset.as_view(actions)
+
+    async def view(request, *args, **kwargs):
+        method = request.method.lower()
+        handler = handlers.get(method)
+        if handler is None:
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        self = viewset(action_map=actions, action=actions[method], args=args, kwargs=kwargs,
+                       format_kwarg=None, headers={})
+        self.headers = self.default_response_headers
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        with replica_scope():
+            try:
+                await authenticate(request, self.get_authenticators())
+                request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+                # Resolve roles without blocking so the permission classes and
+                # get_queryset() find them on the user
+                await aget_roles(request.user)
+                self.check_permissions(request)
+                self.check_throttles(request)
+                self.use_replica(request)
+                response = await handler(self, request, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+
+            response = self.finalize_response(request, response, *args, **kwargs)
+        if response.accepted_renderer.format == "api":
+            # The browsable API renders forms that query the database
+            return await sync_to_async(response.render)()
+        return response.render()
+
+    return csrf_exempt(view)
+
+
+urlpatterns = [
+    path('menu-items', async_view(MenuItemsViewSet, {
+            'get': 'list',
+            'post': 'create',
+        }, {'get': menu_list}), name="menu-collection"),
+    path('menu-items/<int:pk>', async_view(MenuItemsViewSet, {
+            'get': 'retrieve',
+            'put': 'update',
+            'patch': 'partial_update',
+            'delete': 'destroy',
+        }, {'get': menu_retrieve}), name="menu-single"),
+    path('cart/menu-items', async_view(CartViewSet, {
+            'get': 'list',
+            'post': 'create',
+            'delete': 'clear',
+        }, {'get': alist, 'post': cart_create, 'delete': cart_clear}), name="cart"),
+    path('cart/summary', async_view(CartViewSet, {
+            'get': 'summary',
+        }, {'get': cart_summary}), name="cart-summary"),
+    path('orders', async_view(OrderViewSet, {
+            'get': 'list',
+            'post': 'order',
+        }, {'get': alist, 'post': order_create}), name="order-collection"),
+    path('orders/<int:pk>', async_view(OrderViewSet, {
+            'get': 'retrieve',
+            'put': 'update',
+            'patch': 'partial_update',
+            'delete': 'destroy',
+        }, {'get': aretrieve}), name="order-single"),
+]
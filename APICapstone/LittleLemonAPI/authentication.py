@@ -0,0 +1,262 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, serializers
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer, TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+from .blacklist import BlacklistIndexMixin, blacklist_index
+from .roles import RoleCache, Roles, get_roles
+
+# JWTs issued by the project carry the user's username, superuser/staff
+# flags and groups. With LITTLELEMON_JWT_ROLE_CLAIMS on, requests with such
+# an access token are authenticated from the claims alone: request.user is
+# a User built from them (its other fields load on first access) and its
+# roles are already resolved, so neither the user nor the groups are
+# queried. Role changes and deactivations take effect when the access token
+# is next refreshed, which re-reads them from the database.
+CLAIMS_FIELDS = ["username", "is_staff", "is_superuser"]
+GROUPS_CLAIM = "groups"
+
+
+def add_role_claims(token, user):
+    for field in CLAIMS_FIELDS:
+        token[field] = getattr(user, field)
+    token[GROUPS_CLAIM] = sorted(get_roles(user).groups)
+    return token
+
+
+def claims_user(validated_token):
+    # The user described by an access token's claims, or None when the fast
+    # path is off or the token has no role claims
+    if not getattr(settings, "LITTLELEMON_JWT_ROLE_CLAIMS", False) or GROUPS_CLAIM not in validated_token:
+        return None
+    try:
+        values = {field: validated_token[field] for field in CLAIMS_FIELDS}
+        values[jwt_settings.USER_ID_FIELD] = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        return None
+    values["is_active"] = True
+
+    # from_db takes the loaded values in field order and defers the rest
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    user = User.from_db(router.db_for_read(User), fields, [values[field] for field in fields])
+    user._littlelemon_roles = Roles(user.is_superuser, validated_token[GROUPS_CLAIM])
+    return user
+
+
+class RoleClaimsRefreshToken(BlacklistIndexMixin, RefreshToken):
+
+    @classmethod
+    def for_user(cls, user):
+        token = add_role_claims(super().for_user(user), user)
+        token._user = user
+        return token
+
+    @property
+    def access_token(self):
+        # Re-read the claims every time a refresh token is exchanged
+        access = super().access_token
+        user = getattr(self, "_user", None)
+        if user is None:
+            user = User.objects.filter(**{jwt_settings.USER_ID_FIELD: self[jwt_settings.USER_ID_CLAIM]}).first()
+        if user is None or not user.is_active:
+            # Leave the fast path to the user lookup, which rejects the token
+            access.payload.pop(GROUPS_CLAIM, None)
+        else:
+            add_role_claims(access, user)
+        return access
+
+
+class RoleClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleClaimsRefreshToken
+
+
+class RoleClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleClaimsRefreshToken
+
+
+class BlacklistIndexTokenVerifySerializer(TokenVerifySerializer):
+
+    def validate(self, attrs):
+        # TokenVerifySerializer.validate, with the blacklist index in front
+        # of the blacklist query
+        token = UntypedToken(attrs["token"])
+        if jwt_settings.BLACKLIST_AFTER_ROTATION:
+            jti = token.get(jwt_settings.JTI_CLAIM)
+            if jti and blacklist_index.might_contain(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists():
+                raise serializers.ValidationError("Token is blacklisted")
+        return {}
+
+
+class RoleClaimsJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        user = claims_user(validated_token)
+        if user is not None:
+            return user
+        return super().get_user(validated_token)
+
+
+# Token key -> user cache for CachedTokenAuthentication. It keeps a snapshot
+# of the Token and User rows, and every hit builds fresh instances from it,
+# so nothing set on request.user leaks into later requests. Deleting the
+# token (djoser logout) or saving or deleting the user drops the entry in
+# this process; the TTL bounds how long other processes keep using it.
+TOKEN_CACHE_SIZE = getattr(settings, "LITTLELEMON_TOKEN_CACHE_SIZE", 10000)
+TOKEN_CACHE_TTL = getattr(settings, "LITTLELEMON_TOKEN_CACHE_TTL", 300)
+
+
+class TokenCache(RoleCache):
+    def __init__(self, max_size, ttl):
+        super().__init__(max_size, ttl)
+        self._keys = {}
+        self.hits = self.misses = 0
+
+    def lookup(self, key):
+        # (user, token) for a cached key, or None
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        user_values, token_values = entry
+        user = restore(User, user_values)
+        token = restore(Token, token_values)
+        token.user = user
+        return user, token
+
+    def add(self, token):
+        self.set(token.key, (snapshot(token.user), snapshot(token)))
+        self._keys[token.user_id] = token.key
+
+    def invalidate_user(self, user_id):
+        key = self._keys.pop(user_id, None)
+        if key is not None:
+            self.invalidate(key)
+
+    def clear(self):
+        super().clear()
+        self._keys.clear()
+        self.hits = self.misses = 0
+
+
+def snapshot(instance):
+    return tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields)
+
+
+def restore(model, values):
+    fields = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db(router.db_for_read(model), fields, values)
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+
+@receiver(post_delete, sender=Token)
+def _token_deleted(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def _user_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.lookup(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.add(token)
+        return user, token
+
+
+# Async versions of the authentication classes' user lookups, for the
+# native async views
+
+
+async def jwt_authenticate(authenticator, request):
+    header = authenticator.get_header(request)
+    if header is None:
+        return None
+    raw_token = authenticator.get_raw_token(header)
+    if raw_token is None:
+        return None
+    validated_token = authenticator.get_validated_token(raw_token)
+
+    if isinstance(authenticator, RoleClaimsJWTAuthentication):
+        user = claims_user(validated_token)
+        if user is not None:
+            return user, validated_token
+
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+    try:
+        user = await authenticator.user_model.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except authenticator.user_model.DoesNotExist:
+        raise exceptions.AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user, validated_token
+
+
+async def token_authenticate(authenticator, request):
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != authenticator.keyword.lower().encode():
+        return None
+    if len(auth) == 1:
+        raise exceptions.AuthenticationFailed(_("Invalid token header. No credentials provided."))
+    elif len(auth) > 2:
+        raise exceptions.AuthenticationFailed(_("Invalid token header. Token string should not contain spaces."))
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed(
+            _("Invalid token header. Token string should not contain invalid characters."))
+
+    cached = isinstance(authenticator, CachedTokenAuthentication)
+    if cached:
+        user_auth = token_cache.lookup(key)
+        if user_auth is not None:
+            return user_auth
+
+    model = authenticator.get_model()
+    try:
+        token = await model.objects.select_related("user").aget(key=key)
+    except model.DoesNotExist:
+        raise exceptions.AuthenticationFailed(_("Invalid token."))
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+    if cached:
+        token_cache.add(token)
+    return token.user, token
+
+
+async def session_authenticate(authenticator, request):
+    user = await request._request.auser()
+    if not user or not user.is_active:
+        return None
+    authenticator.enforce_csrf(request)
+    return user, None
+
+
+ASYNC_AUTHENTICATORS = {
+    JWTAuthentication: jwt_authenticate,
+    RoleClaimsJWTAuthentication: jwt_authenticate,
+    TokenAuthentication: token_authenticate,
+    CachedTokenAuthentication: token_authenticate,
+    SessionAuthentication: session_authenticate,
+}
@@ -0,0 +1,82 @@
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+# Shared helpers for the bench_* management commands
+
+
+@contextmanager
+def test_database():
+    # Run a benchmark against a throwaway test database, never db.sqlite3.
+    # DEBUG is switched off so the debug toolbar stays out of the numbers,
+    # and the API rate limits are switched off so they do not kick in part
+    # way through a run.
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    cache.clear()
+    try:
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["*"]), \
+                mock.patch("rest_framework.views.APIView.get_throttles", return_value=[]):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(fn, repeat=20, setup=None):
+    # Call fn() repeat times and return latency percentiles (ms) and the
+    # number of queries issued by the last call. setup() runs before every
+    # call and is not timed.
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        # The query log is capped, so a full log would count nothing
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = len(ctx.captured_queries)
+    timings.sort()
+    return {
+        "queries": queries,
+        "mean_ms": statistics.fmean(timings),
+        "req_per_s": 1000 / statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+    }
+
+
+def peak_memory(fn, setup=None):
+    # Peak Python memory allocated while fn() runs, in KiB. Tracing slows
+    # everything down, so this is kept apart from the timed calls.
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def write_table(stdout, rows, columns):
+    # Print a list of dicts as a fixed width table
+    widths = [max(len(column), *(len(_format(row[column])) for row in rows)) for column in columns]
+    stdout.write("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        stdout.write("  ".join(_format(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def _format(value):
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
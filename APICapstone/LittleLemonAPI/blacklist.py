@@ -0,0 +1,116 @@
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+# Process-local Bloom filter over the JTIs in the SimpleJWT blacklist. A
+# miss means the token is definitely not blacklisted and needs no query;
+# only a possible hit (a blacklisted token, or about one clean token in a
+# hundred) is looked up in BlacklistedToken. Tokens blacklisted in this
+# process are added straight away. Rows added by other processes are
+# picked up every BLACKLIST_SYNC_INTERVAL seconds by reading the rows past
+# the last id seen, which relies on ids committing in order as they do on
+# SQLite. The filter is rebuilt every BLACKLIST_REBUILD_INTERVAL seconds,
+# or when it fills up, so expired tokens drop out of it.
+SYNC_INTERVAL = getattr(settings, "LITTLELEMON_BLACKLIST_SYNC_INTERVAL", 5)
+REBUILD_INTERVAL = getattr(settings, "LITTLELEMON_BLACKLIST_REBUILD_INTERVAL", 60 * 60)
+ERROR_RATE = 0.01
+MIN_CAPACITY = 10000
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key):
+        # Double hashing over one 128 bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+
+class BlacklistIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        self._synced = 0
+        self._built = 0
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self._filter
+
+    def add(self, jti):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+    def sync(self):
+        now = time.monotonic()
+        if self._filter is not None and now - self._synced < SYNC_INTERVAL:
+            return
+        with self._lock:
+            if self._filter is None or now - self._built >= REBUILD_INTERVAL:
+                self._rebuild(now)
+            elif now - self._synced >= SYNC_INTERVAL:
+                self._catch_up(now)
+
+    def clear(self):
+        with self._lock:
+            self._filter = None
+
+    def _rebuild(self, now):
+        # Expired tokens are rejected before the blacklist is checked, so
+        # they need no place in the filter
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow())
+        self._filter = BloomFilter(max(MIN_CAPACITY, rows.count() * 2))
+        self._last_id = 0
+        self._built = now
+        self._catch_up(now, rows)
+
+    def _catch_up(self, now, rows=None):
+        rows = (BlacklistedToken.objects.all() if rows is None else rows).filter(id__gt=self._last_id).order_by("id").values_list("id", "token__jti")
+        for row_id, jti in rows.iterator(chunk_size=10000):
+            self._filter.add(jti)
+            self._last_id = row_id
+        self._synced = now
+        if self._filter.count > self._filter.capacity:
+            self._rebuild(now)
+
+
+blacklist_index = BlacklistIndex()
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def _token_blacklisted(sender, instance, created, **kwargs):
+    if created:
+        blacklist_index.add(instance.token.jti)
+
+
+class BlacklistIndexMixin:
+    # For SimpleJWT's BlacklistMixin tokens: only query the blacklist for
+    # tokens the index might have seen
+
+    def check_blacklist(self):
+        if blacklist_index.might_contain(self.payload[jwt_settings.JTI_CLAIM]):
+            super().check_blacklist()
@@ -0,0 +1,85 @@
+from collections import Counter
+from decimal import Decimal
+from django.db import connection
+from django.db.models import Count, Sum
+from .models import Cart, MenuItem
+from .writes import write_transaction
+
+# Cart writes add to the quantity of a line that is already in the cart
+# instead of failing on the (menuitem, user) unique constraint. Any number
+# of lines costs one IN query for the menu items and one upsert, with the
+# line price recomputed from the current menu price in SQL.
+UPSERT_SQL = """
+INSERT INTO {cart} (user_id, menuitem_id, quantity, unit_price, price)
+VALUES {values}
+ON CONFLICT (menuitem_id, user_id) DO UPDATE SET
+    quantity = {cart}.quantity + excluded.quantity,
+    unit_price = excluded.unit_price,
+    price = ROUND(({cart}.quantity + excluded.quantity) * excluded.unit_price, 2)
+RETURNING id, menuitem_id, quantity, unit_price, price
+"""
+BATCH_SIZE = 500
+
+
+def add_to_cart(user, lines):
+    # lines are (menuitem_id, quantity) pairs. Returns the saved Cart rows
+    # and the ids of menu items that do not exist; nothing is written
+    # unless every menu item exists.
+    quantities = Counter()
+    for menuitem_id, quantity in lines:
+        quantities[menuitem_id] += quantity
+
+    with write_transaction():
+        menuitems = MenuItem.objects.select_related("category").in_bulk(list(quantities))
+        missing = [menuitem_id for menuitem_id in quantities if menuitem_id not in menuitems]
+        if missing:
+            return [], missing
+
+        rows = []
+        pending = list(quantities.items())
+        with connection.cursor() as cursor:
+            for start in range(0, len(pending), BATCH_SIZE):
+                batch = pending[start:start + BATCH_SIZE]
+                params = []
+                for menuitem_id, quantity in batch:
+                    price = menuitems[menuitem_id].price
+                    params += [user.pk, menuitem_id, quantity, price, price * quantity]
+                sql = UPSERT_SQL.format(
+                    cart=connection.ops.quote_name(Cart._meta.db_table),
+                    values=", ".join(["(%s, %s, %s, %s, %s)"] * len(batch)),
+                )
+                cursor.execute(sql, params)
+                rows += cursor.fetchall()
+
+    field = Cart._meta.get_field("price")
+    cart_items = []
+    for cart_id, menuitem_id, quantity, unit_price, price in rows:
+        cart_item = Cart(id=cart_id, user=user, menuitem=menuitems[menuitem_id], quantity=quantity,
+                         unit_price=field.to_python(unit_price), price=field.to_python(price))
+        cart_item._state.adding = False
+        cart_items.append(cart_item)
+    return cart_items, []
+
+
+def summary_queryset(user):
+    # One grouped aggregate over the user's cart, a row per category
+    return (
+        Cart.objects.filter(user=user)
+        .values("menuitem__category_id", "menuitem__category__title")
+        .annotate(items=Sum("quantity"), lines=Count("id"), subtotal=Sum("price"))
+        .order_by("menuitem__category_id")
+    )
+
+
+def summarize(rows):
+    categories = [
+        {"id": row["menuitem__category_id"], "title": row["menuitem__category__title"],
+         "items": row["items"], "lines": row["lines"], "subtotal": row["subtotal"]}
+        for row in rows
+    ]
+    return {
+        "items": sum(category["items"] for category in categories),
+        "lines": sum(category["lines"] for category in categories),
+        "subtotal": sum((category["subtotal"] for category in categories), Decimal("0.00")),
+        "categories": categories,
+    }
@@ -0,0 +1,155 @@
+import hashlib
+import time
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.response import Response
+from .models import Category, MenuItem
+from .replicas import current_replica, sticky_seconds
+
+# The menu catalog is cached under a version that changes on every
+# MenuItem/Category write, so stale pages are never looked up again. The
+# pages are kept in the default cache of each process, and the version in
+# the "shared" cache, so that every worker process serves and validates
+# against the same version.
+VERSION_KEY = "littlelemon:menu-version"
+CATALOG_TIMEOUT = 60 * 60 * 24
+
+
+def new_version():
+    # Versions are clock readings rather than a counter: setting one is
+    # atomic on any cache backend, and ETags handed out before the cache
+    # was cleared never match a different menu afterwards
+    return time.time_ns()
+
+
+def get_version():
+    shared = caches["shared"]
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        shared.add(VERSION_KEY, new_version(), timeout=None)
+        version = shared.get(VERSION_KEY)
+    return version
+
+
+async def aget_version():
+    shared = caches["shared"]
+    version = await shared.aget(VERSION_KEY)
+    if version is None:
+        await shared.aadd(VERSION_KEY, new_version(), timeout=None)
+        version = await shared.aget(VERSION_KEY)
+    return version
+
+
+def catalog_timeout():
+    # A page read from a replica may be older than the version it is cached
+    # under, so it is only kept for as long as a replica may lag
+    if current_replica() is None:
+        return CATALOG_TIMEOUT
+    return sticky_seconds()
+
+
+def bump_version():
+    # Bump after commit, so readers never cache uncommitted data under the
+    # new version
+    def bump():
+        caches["shared"].set(VERSION_KEY, new_version(), timeout=None)
+    transaction.on_commit(bump)
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=Category)
+def _menu_changed(sender, **kwargs):
+    bump_version()
+
+
+class CatalogCacheMixin:
+    # Caches list pages and single items of a public, read-mostly viewset
+    # keyed by the menu version, path, query params and rendered media type.
+    # Answers If-None-Match with 304 before touching the database.
+    #
+    # A replica may lag behind the version, so pages read from one are
+    # cached apart from the primary's, and get no ETag: a client must never
+    # be able to revalidate stale data as the current version.
+
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(request, lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.catalog_response(request, lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs))
+
+    def catalog_key(self, request, version):
+        # Query params may hold spaces and be of any length, which Memcached
+        # rejects, so everything after the version is hashed
+        params = "&".join(f"{key}={value}" for key, values in sorted(request.query_params.lists()) for value in values)
+        variant = "%s%s?%s:%s:%s" % (
+            request.get_host(),
+            request.path,
+            params,
+            request.accepted_media_type,
+            current_replica() or "",
+        )
+        return "littlelemon:menu:%s:%s" % (version, hashlib.sha256(variant.encode()).hexdigest())
+
+    def catalog_etag(self, key):
+        return _etag(key) if current_replica() is None else None
+
+    def catalog_response(self, request, load):
+        key = self.catalog_key(request, get_version())
+        etag = self.catalog_etag(key)
+
+        # The ETag only depends on the key, so a client that already has
+        # this version needs neither the cache nor the database
+        if etag and etag in _parse_etags(request.headers.get("If-None-Match", "")):
+            return _not_modified(etag)
+
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = load()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, catalog_timeout())
+
+        if etag:
+            response["ETag"] = etag
+        return response
+
+    async def acatalog_response(self, request, aload):
+        # catalog_response for the async views
+        key = self.catalog_key(request, await aget_version())
+        etag = self.catalog_etag(key)
+
+        if etag and etag in _parse_etags(request.headers.get("If-None-Match", "")):
+            return _not_modified(etag)
+
+        data = await cache.aget(key)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = await aload()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            await cache.aset(key, response.data, catalog_timeout())
+
+        if etag:
+            response["ETag"] = etag
+        return response
+
+
+def _etag(key):
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def _not_modified(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response["ETag"] = etag
+    return response
+
+
+def _parse_etags(header):
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
@@ -0,0 +1,54 @@
+from datetime import date
+from .models import Cart, Order, OrderItem
+from .reports import add_orders
+from .writes import write_transaction
+
+
+def place_order(user):
+    # Turn the user's cart into an order using a fixed number of statements:
+    # one SELECT for the cart, one INSERT for the order, one bulk INSERT for
+    # the order items, three rollup upserts and one DELETE for the cart, all
+    # in a single transaction.
+    # Returns the new Order, or None when the cart is empty.
+    with write_transaction():
+
+        # Read every cart line in one query, without loading the menu items
+        lines = list(
+            Cart.objects.filter(user=user).values_list("id", "menuitem_id", "quantity", "unit_price", "price")
+        )
+
+        # If there are no items in cart, an order should not be created
+        if not lines:
+            return None
+
+        # Order total is the sum of the line prices (quantity * unit_price)
+        total = sum(price for _, _, _, _, price in lines)
+
+        # Insert the order once, with its final total
+        order = Order.objects.create(
+            user=user,
+            delivery_crew=None,
+            status=False,
+            total=total,
+            date=date.today(),
+        )
+
+        # Make every OrderItem in a single bulk insert
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menuitem_id=menuitem_id,
+                quantity=quantity,
+                unit_price=unit_price,
+            )
+            for _, menuitem_id, quantity, unit_price, _ in lines
+        ])
+
+        # Count the new order in the daily sales rollups
+        add_orders([order.id])
+
+        # Delete the cart lines that went into the order, and only those: a
+        # line added since the SELECT stays in the cart
+        Cart.objects.filter(id__in=[line[0] for line in lines]).delete()
+
+    return order
@@ -0,0 +1,164 @@
+from datetime import date
+from decimal import Decimal
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.manager import BaseManager
+from rest_framework import fields, relations, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+# Compiled read path for the serializers of the hot list endpoints. The
+# first time a serializer class is listed, its readable fields (and those
+# of its nested serializers) are turned into the source of one plain
+# function per serializer that reads the attributes and builds the dict
+# directly. Plain model fields of the common types are converted inline;
+# anything else, and any value that is not of the expected type, goes
+# through the field's own get_attribute() and to_representation(), so the
+# output is the same as Serializer.to_representation(), key for key.
+#
+# The generated code only depends on the serializer class. The bound field
+# objects of the serializer being rendered are passed in each time, so
+# fields keep their own context.
+_factories = {}
+
+
+def compile_serializer(serializer):
+    # Returns a function turning one instance into the serializer's dict
+    factory, collect = _factories.get(type(serializer)) or _compile(type(serializer), serializer)
+    return factory(*collect(serializer))
+
+
+def _compile(serializer_class, serializer):
+    lines = []
+    paths = []
+    entry = _emit(serializer, (), lines, paths, [0])
+    args = ", ".join(f"f{i}" for i in range(len(paths)))
+    source = f"def factory({args}):\n" + "".join(f"    {line}\n" for line in lines) + f"    return {entry}\n"
+    namespace = {
+        "BaseManager": BaseManager, "Decimal": Decimal, "PKOnlyObject": PKOnlyObject, "SkipField": SkipField, "date": date,
+    }
+    exec(compile(source, f"<compiled {serializer_class.__name__}>", "exec"), namespace)
+
+    def collect(serializer):
+        # The bound fields to pass to the factory, in the order they were emitted
+        bound = []
+        for path in paths:
+            field = serializer
+            for name in path:
+                field = getattr(field, "child", field).fields[name]
+            bound.append(field)
+        return bound
+
+    _factories[serializer_class] = namespace["factory"], collect
+    return _factories[serializer_class]
+
+
+def _emit(serializer, path, lines, paths, counter):
+    # Emit the function for one serializer and return its name
+    name = f"row{counter[0]}"
+    counter[0] += 1
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    body = ["ret = {}"]
+    for field in serializer._readable_fields:
+        index = len(paths)
+        paths.append(path + (field.field_name,))
+        ref = f"f{index}"
+        key = repr(field.field_name)
+
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        nested = None
+        if isinstance(child, serializers.Serializer):
+            nested = _emit(child, path + (field.field_name,), lines, paths, counter)
+
+        getter = _getter(field, model)
+        if getter is None:
+            # Field.get_attribute() may skip the field altogether
+            body.append("try:")
+            body.append(f"    v = {ref}.get_attribute(obj)")
+            body.append("except SkipField:")
+            body.append("    pass")
+            body.append("else:")
+            indent = "    "
+        else:
+            body.append(f"v = {getter}")
+            indent = ""
+
+        if isinstance(field, serializers.ListSerializer):
+            value = f"[{nested}(item) for item in (v.all() if isinstance(v, BaseManager) else v)]"
+        elif nested is not None:
+            value = f"{nested}(v)"
+        else:
+            value = _converter(field, ref, getter is not None)
+        check = "v"
+        if getter is None and isinstance(field, relations.RelatedField):
+            check = "(v.pk if isinstance(v, PKOnlyObject) else v)"
+        body.append(f"{indent}ret[{key}] = None if {check} is None else {value}")
+
+    body.append("return ret")
+    lines.append(f"def {name}(obj):")
+    lines.extend(f"    {line}" for line in body)
+    return name
+
+
+def _getter(field, model):
+    # Inline attribute access for single attribute sources on model fields,
+    # or None to go through field.get_attribute()
+    if model is None or len(field.source_attrs) != 1:
+        return None
+    attr = field.source_attrs[0]
+    try:
+        model_field = model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        # Reverse relations are reached through their accessor
+        related = [rel for rel in model._meta.related_objects if rel.get_accessor_name() == attr]
+        return "obj." + attr if related and isinstance(field, serializers.ListSerializer) else None
+    if model_field.is_relation and model_field.many_to_one:
+        if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+            # What the pk only optimization would read
+            return "obj." + model_field.attname
+        if isinstance(field, serializers.Serializer):
+            return "obj." + attr
+        return None
+    if model_field.is_relation:
+        return None
+    return "obj." + attr
+
+
+def _converter(field, ref, inline):
+    # Expression turning v (not None) into the field's representation.
+    # inline tells whether v was read by the code from _getter().
+    kind = type(field)
+    if kind is fields.IntegerField:
+        return "int(v)"
+    if kind is fields.CharField:
+        return "str(v)"
+    if kind is fields.BooleanField:
+        return f"v if v is True or v is False else {ref}.to_representation(v)"
+    if kind is relations.PrimaryKeyRelatedField and inline:
+        # _getter() read the pk itself
+        return "v"
+    if kind is fields.ReadOnlyField:
+        return "v"
+    if kind is fields.DecimalField and field.decimal_places is not None and not field.localize \
+            and not field.normalize_output \
+            and getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING):
+        # Values already at the field's precision need no quantizing
+        return (f"format(v, 'f') if type(v) is Decimal and v.as_tuple().exponent == {-field.decimal_places} "
+                f"else {ref}.to_representation(v)")
+    if kind is fields.DateField and getattr(field, "format", api_settings.DATE_FORMAT) == api_settings.DATE_FORMAT \
+            and api_settings.DATE_FORMAT.lower() == "iso-8601":
+        return f"v.isoformat() if type(v) is date else {ref}.to_representation(v)"
+    return f"{ref}.to_representation(v)"
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    # List serializer rendering its rows with the compiled function of its
+    # child. Writes and single objects still go through DRF.
+
+    def to_representation(self, data):
+        if not getattr(settings, "LITTLELEMON_COMPILED_SERIALIZERS", True):
+            return super().to_representation(data)
+        row = compile_serializer(self.child)
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        return [row(item) for item in iterable]
@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from .models import OrderItem
+
+# Streaming order export for managers. Orders are read in id order in
+# keyset chunks, each followed by one query for the chunk's items, so
+# memory stays flat however many orders are exported and no read
+# transaction is held open between chunks. The first chunk is small so
+# the first bytes go out right away.
+FIRST_CHUNK_SIZE = 50
+CHUNK_SIZE = 2000
+
+ORDER_FIELDS = ["id", "user_id", "user__username", "delivery_crew_id", "status", "total", "date"]
+CSV_HEADER = [
+    "order_id", "date", "user_id", "user", "delivery_crew_id", "status", "total",
+    "menuitem_id", "menuitem", "quantity", "unit_price",
+]
+
+
+def iter_chunks(queryset):
+    # Yield lists of (order, items) pairs as plain dicts and tuples
+    last_id = 0
+    chunk_size = FIRST_CHUNK_SIZE
+    while True:
+        orders = list(queryset.filter(id__gt=last_id).order_by("id").values(*ORDER_FIELDS)[:chunk_size])
+        if not orders:
+            return
+
+        items = defaultdict(list)
+        for order_id, *item in OrderItem.objects.using(queryset.db).filter(order_id__in=[order["id"] for order in orders]).order_by(
+                "order_id", "id").values_list("order_id", "menuitem_id", "menuitem__title", "quantity", "unit_price"):
+            items[order_id].append(item)
+
+        yield [(order, items[order["id"]]) for order in orders]
+        last_id = orders[-1]["id"]
+        chunk_size = min(chunk_size * 4, CHUNK_SIZE)
+
+
+def ndjson_lines(queryset):
+    # One JSON document per order and line, written out a chunk at a time
+    for chunk in iter_chunks(queryset):
+        yield "".join(ndjson_line(order, items) for order, items in chunk)
+
+
+def ndjson_line(order, items):
+    return json.dumps({
+        "id": order["id"],
+        "user_id": order["user_id"],
+        "user": order["user__username"],
+        "delivery_crew_id": order["delivery_crew_id"],
+        "status": order["status"],
+        "total": str(order["total"]),
+        "date": order["date"].isoformat(),
+        "items": [
+            {"menuitem_id": menuitem_id, "menuitem": title, "quantity": quantity, "unit_price": str(unit_price)}
+            for menuitem_id, title, quantity, unit_price in items
+        ],
+    }) + "\n"
+
+
+def csv_lines(queryset):
+    # One row per order item; orders without items get one row with empty
+    # item columns. The header goes out on its own, before the first query,
+    # so an export without orders still has it.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for chunk in iter_chunks(queryset):
+        for order, items in chunk:
+            head = [
+                order["id"], order["date"].isoformat(), order["user_id"], order["user__username"],
+                order["delivery_crew_id"] or "", int(order["status"]), order["total"],
+            ]
+            writer.writerows(head + list(item) for item in items or [("", "", "", "")])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv"),
+}
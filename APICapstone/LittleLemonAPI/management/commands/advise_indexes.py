@@ -0,0 +1,139 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.db.migrations import AddIndex, Migration
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from LittleLemonAPI.bench import test_database, write_table
+from LittleLemonAPI.management.commands.bench_routes import Command as RoutesCommand, SCALES, send
+from LittleLemonAPI.query_plans import (
+    EXPLAINED, QueryRecorder, best_time, candidate_columns, explain, plan_tables, problems,
+)
+
+APP_LABEL = "LittleLemonAPI"
+
+
+class Command(BaseCommand):
+    help = (
+        "Record the queries of every route on a seeded dataset, report the full scans and sorts in their SQLite "
+        "query plans, and propose the composite indexes that measurably speed them up"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, default="tiny")
+        parser.add_argument("--min-speedup", type=float, default=1.5,
+                            help="propose an index only if the query gets at least this much faster")
+        parser.add_argument("--migration", metavar="NAME",
+                            help="write the proposed indexes to a new LittleLemonAPI migration called NAME")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("advise_indexes reads SQLite query plans and needs a SQLite database")
+        with test_database():
+            shapes = self.record(options["scale"])
+            findings, proposals = self.advise(shapes, options["min_speedup"])
+
+        self.stdout.write(f"{len(shapes)} query shapes recorded, {len(findings)} with full scans or sorts\n")
+        write_table(self.stdout, findings, ["routes", "calls", "total_ms", "problem", "table"])
+        self.stdout.write("")
+        if not proposals:
+            self.stdout.write("No index proposals")
+            return
+        write_table(self.stdout, proposals, ["model", "fields", "routes", "before_ms", "after_ms", "speedup", "plan"])
+        if options["migration"]:
+            path = self.write_migration(options["migration"], proposals)
+            self.stdout.write(f"\nWrote {path}")
+
+    def record(self, scale):
+        # Run every benchmark case once, recording its queries, then keep
+        # the queries that have a plan
+        routes = RoutesCommand()
+        cases = routes.cases(routes.seed(*SCALES[scale]))
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for case in cases:
+                if case["setup"] is not None:
+                    case["setup"]()
+                recorder.route = f"{case['method'].upper()} {case['route']}"
+                send(case)
+                recorder.route = None
+        return [shape for shape in recorder.shapes.values() if shape.sql.lstrip().upper().startswith(EXPLAINED)]
+
+    def advise(self, shapes, min_speedup):
+        tables = {model._meta.db_table: model for model in apps.get_app_config(APP_LABEL).get_models()}
+        findings = []
+        best = {}
+        for shape in shapes:
+            plan = explain(connection, shape.sql, shape.params)
+            found = problems(plan)
+            read = [table for table in plan_tables(plan) if table in tables]
+            if not found or not read:
+                continue
+            routes = ", ".join(sorted(shape.routes))
+            for problem, table in found:
+                findings.append({
+                    "routes": routes, "calls": shape.count, "total_ms": shape.seconds * 1000,
+                    "problem": problem, "table": table or ", ".join(read),
+                })
+
+            # A scan can only be fixed on its own table, a sort on any of them
+            targets = read if any(table is None for _, table in found) else [table for _, table in found]
+            for table in dict.fromkeys(targets):
+                columns = candidate_columns(shape.sql, table)
+                if table not in tables or not columns or self.indexed(table, columns):
+                    continue
+                result = self.try_index(table, columns, shape, plan)
+                key = (table, tuple(columns))
+                if result["speedup"] >= min_speedup and result["speedup"] > best.get(key, {}).get("speedup", 0):
+                    best[key] = {**result, "routes": routes}
+
+        proposals = []
+        for (table, columns), result in sorted(best.items()):
+            model = tables[table]
+            fields = [field.name for column in columns for field in model._meta.concrete_fields if field.column == column]
+            proposals.append({"model": model.__name__, "fields": ", ".join(fields), "field_names": fields, **result})
+        return findings, proposals
+
+    def indexed(self, table, columns):
+        # Whether an existing index already starts with these columns
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        return any(
+            (constraint["index"] or constraint["primary_key"]) and constraint["columns"][:len(columns)] == columns
+            for constraint in constraints.values()
+        )
+
+    def try_index(self, table, columns, shape, plan):
+        # Time the query, add the index, time it again and drop the index
+        quote = connection.ops.quote_name
+        before = best_time(connection, shape.sql, shape.params)
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE INDEX %s ON %s (%s)" % (
+                quote("advise_indexes_candidate"), quote(table), ", ".join(quote(column) for column in columns)))
+            try:
+                after_plan = explain(connection, shape.sql, shape.params)
+                after = best_time(connection, shape.sql, shape.params)
+            finally:
+                cursor.execute("DROP INDEX %s" % quote("advise_indexes_candidate"))
+        changed = [detail for detail in after_plan if detail not in plan]
+        return {
+            "before_ms": before * 1000, "after_ms": after * 1000, "speedup": before / after,
+            "plan": "; ".join(changed) or "unchanged",
+        }
+
+    def write_migration(self, name, proposals):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        leaf = loader.graph.leaf_nodes(APP_LABEL)
+        operations = []
+        for proposal in proposals:
+            model = apps.get_model(APP_LABEL, proposal["model"])
+            index = models.Index(fields=proposal["field_names"])
+            index.set_name_with_model(model)
+            operations.append(AddIndex(model_name=model._meta.model_name, index=index))
+        migration = type("Migration", (Migration,), {"dependencies": leaf, "operations": operations})(name, APP_LABEL)
+        number = int(leaf[0][1].split("_", 1)[0]) + 1 if leaf else 1
+        migration.name = f"{number:04d}_{name}"
+        writer = MigrationWriter(migration)
+        with open(writer.path, "w") as f:
+            f.write(writer.as_string())
+        return writer.path
@@ -0,0 +1,57 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Order
+from LittleLemonAPI.roles import MANAGER, DELIVERY_CREW
+
+
+class Command(BaseCommand):
+    help = "Benchmark assigning open orders to the delivery crew one PATCH at a time and in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+        parser.add_argument("--crew", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["sizes"], options["crew"], options["repeat"])
+        write_table(self.stdout, rows, ["case", "orders", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, sizes, crew_size, repeat):
+        crew_group = Group.objects.create(name=DELIVERY_CREW)
+        crew = User.objects.bulk_create([User(username=f"bench-crew-{i}") for i in range(crew_size)])
+        crew_group.user_set.add(*crew)
+        manager = User.objects.create_user("bench-manager")
+        manager.groups.add(Group.objects.create(name=MANAGER))
+        customer = User.objects.create_user("bench-customer")
+        client = APIClient()
+        client.force_authenticate(manager)
+
+        rows = []
+        for size in sizes:
+            Order.objects.all().delete()
+            orders = Order.objects.bulk_create([
+                Order(user=customer, total=Decimal("9.00"), date=date.today()) for _ in range(size)
+            ])
+
+            def unassign():
+                Order.objects.update(delivery_crew=None)
+
+            def one_by_one():
+                for i, order in enumerate(orders):
+                    response = client.patch(reverse("order-single", args=[order.id]),
+                                            {"delivery_crew_id": crew[i % crew_size].id}, format="json")
+                    assert response.status_code == 200, response.content
+
+            def bulk():
+                response = client.post(reverse("order-assign"), format="json")
+                assert response.status_code == 200 and response.data["assigned"] == size, response.content
+
+            rows.append({"case": "PATCH per order", "orders": size, **measure(one_by_one, repeat, setup=unassign)})
+            rows.append({"case": "POST orders/assign", "orders": size, **measure(bulk, repeat, setup=unassign)})
+        return rows
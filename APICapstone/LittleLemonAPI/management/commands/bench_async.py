@@ -0,0 +1,115 @@
+import asyncio
+import statistics
+import time
+import types
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import include, path
+from rest_framework.authtoken.models import Token
+from LittleLemonAPI import async_views, urls
+from LittleLemonAPI.bench import test_database, write_table
+from LittleLemonAPI.models import Category, MenuItem, Cart, Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = "Benchmark the sync and async views under ASGI with many concurrent clients"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=500)
+        parser.add_argument("--requests", type=int, default=4, help="requests per client and endpoint")
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["clients"], options["requests"])
+        write_table(self.stdout, rows, ["mode", "requests", "errors", "req_per_s", "p50_ms", "p95_ms", "p99_ms"])
+
+    def run_benchmark(self, clients, per_client):
+        keys = self.seed(clients)
+        sync_patterns = [pattern for pattern in urls.urlpatterns if pattern not in async_views.urlpatterns]
+        rows = []
+        for mode, patterns in [("sync", sync_patterns), ("async", async_views.urlpatterns + sync_patterns)]:
+            urlconf = types.ModuleType(f"bench_{mode}_urls")
+            urlconf.urlpatterns = [path("api/", include(patterns))]
+            with override_settings(ROOT_URLCONF=urlconf):
+                rows.append({"mode": mode, **asyncio.run(self.drive(ASGIHandler(), keys, per_client))})
+        return rows
+
+    def seed(self, clients):
+        category = Category.objects.create(slug="bench", title="Bench")
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("3.00"), featured=False, category=category)
+            for i in range(20)
+        ])
+        users = User.objects.bulk_create([User(username=f"bench-{i}") for i in range(clients)])
+        tokens = Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+        Cart.objects.bulk_create([
+            Cart(user=user, menuitem=item, quantity=1, unit_price=item.price, price=item.price)
+            for user in users for item in items[:3]
+        ])
+        orders = Order.objects.bulk_create([
+            Order(user=user, total=Decimal("9.00"), date=date.today()) for user in users
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menuitem=item, quantity=1, unit_price=item.price)
+            for order in orders for item in items[:3]
+        ])
+        return [(token.key, order.id) for token, order in zip(tokens, orders)]
+
+    async def drive(self, app, keys, per_client):
+        async def client(key, order_id):
+            timings, errors = [], 0
+            for _ in range(per_client):
+                for url in ["/api/menu-items", "/api/cart/menu-items", "/api/orders", f"/api/orders/{order_id}"]:
+                    start = time.perf_counter()
+                    status = await request(app, url, key)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    errors += status != 200
+            return timings, errors
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(client(key, order_id) for key, order_id in keys))
+        elapsed = time.perf_counter() - start
+
+        timings = sorted(timing for result in results for timing in result[0])
+        quantiles = statistics.quantiles(timings, n=100)
+        return {
+            "requests": len(timings),
+            "errors": sum(result[1] for result in results),
+            "req_per_s": len(timings) / elapsed,
+            "p50_ms": quantiles[49],
+            "p95_ms": quantiles[94],
+            "p99_ms": quantiles[98],
+        }
+
+
+async def request(app, url, key):
+    # Drive one GET through the ASGI application the way a server would
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+        "method": "GET", "path": url, "raw_path": url.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"testserver"), (b"authorization", f"Token {key}".encode())],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    disconnected = asyncio.Event()
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            disconnected.set()
+
+    await app(scope, receive, send)
+    return status
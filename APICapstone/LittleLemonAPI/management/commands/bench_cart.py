@@ -0,0 +1,59 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Category, MenuItem, Cart
+
+
+class Command(BaseCommand):
+    help = "Benchmark POST /api/cart/menu-items for new lines, existing lines and batches, and reading the cart back"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200])
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["sizes"], options["repeat"])
+        write_table(self.stdout, rows, ["case", "lines", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, sizes, repeat):
+        category = Category.objects.create(slug="bench", title="Bench")
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("1.25"), featured=False, category=category)
+            for i in range(max(sizes))
+        ])
+        customer = User.objects.create_user("bench-customer")
+        client = APIClient()
+        client.force_authenticate(customer)
+        url = reverse("cart")
+
+        def empty_cart():
+            Cart.objects.filter(user=customer).delete()
+
+        def post(body):
+            def request():
+                response = client.post(url, body, format="json")
+                assert response.status_code == 201, response.content
+            return request
+
+        def get(read_url):
+            def request():
+                response = client.get(read_url, {"page_size": 100})
+                assert response.status_code == 200, response.content
+            return request
+
+        line = {"menuitem_id": items[0].id, "quantity": 1}
+        rows = [
+            {"case": "new line", "lines": 1, **measure(post(line), repeat, setup=empty_cart)},
+            {"case": "line already in cart", "lines": 1, **measure(post(line), repeat)},
+        ]
+        for size in sizes:
+            batch = [{"menuitem_id": item.id, "quantity": 2} for item in items[:size]]
+            rows.append({"case": "batch, new lines", "lines": size, **measure(post(batch), repeat, setup=empty_cart)})
+            rows.append({"case": "batch, lines in cart", "lines": size, **measure(post(batch), repeat)})
+            for case, read_url in [("GET cart lines", url), ("GET cart summary", reverse("cart-summary"))]:
+                rows.append({"case": case, "lines": size, **measure(get(read_url), repeat)})
+        return rows
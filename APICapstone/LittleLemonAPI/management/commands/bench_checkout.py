@@ -0,0 +1,47 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Category, MenuItem, Cart, Order
+
+
+class Command(BaseCommand):
+    help = "Benchmark POST /api/orders (checkout) for carts of different sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 20, 500])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["sizes"], options["repeat"])
+        write_table(self.stdout, rows, ["lines", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, sizes, repeat):
+        category = Category.objects.create(slug="bench", title="Bench")
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("1.00"), featured=False, category=category)
+            for i in range(max(sizes))
+        ])
+        customer = User.objects.create_user("bench-customer")
+        client = APIClient()
+        client.force_authenticate(customer)
+        url = reverse("order-collection")
+
+        rows = []
+        for size in sizes:
+            def fill_cart():
+                Cart.objects.bulk_create([
+                    Cart(user=customer, menuitem=item, quantity=1, unit_price=item.price, price=item.price)
+                    for item in items[:size]
+                ])
+
+            def checkout():
+                response = client.post(url)
+                assert response.status_code == 201, response.content
+
+            rows.append({"lines": size, **measure(checkout, repeat, setup=fill_cart)})
+            Order.objects.all().delete()
+        return rows
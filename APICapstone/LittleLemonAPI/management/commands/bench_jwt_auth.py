@@ -0,0 +1,57 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Category, MenuItem, Cart, Order
+from LittleLemonAPI.roles import MANAGER, role_cache
+
+
+class Command(BaseCommand):
+    help = "Benchmark JWT requests authenticated by user lookup against the role claims fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["repeat"])
+        write_table(self.stdout, rows, ["auth", "user", "endpoint", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, repeat):
+        category = Category.objects.create(slug="bench", title="Bench")
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("3.00"), featured=False, category=category)
+            for i in range(5)
+        ])
+        customer = User.objects.create_user("bench-customer", password="bench-password")
+        manager = User.objects.create_user("bench-manager", password="bench-password")
+        manager.groups.add(Group.objects.get_or_create(name=MANAGER)[0])
+        Cart.objects.bulk_create([
+            Cart(user=customer, menuitem=item, quantity=1, unit_price=item.price, price=item.price) for item in items
+        ])
+        Order.objects.create(user=customer, total=Decimal("15.00"), date=date.today())
+
+        rows = []
+        for auth, enabled in [("user lookup", False), ("role claims", True)]:
+            with override_settings(LITTLELEMON_JWT_ROLE_CLAIMS=enabled):
+                for user, endpoints in [
+                    (customer, ["/api/menu-items", "/api/cart/menu-items", "/api/orders"]),
+                    (manager, ["/api/orders", "/api/groups/manager/users"]),
+                ]:
+                    client = APIClient()
+                    response = client.post("/jwt/create/", {"username": user.username, "password": "bench-password"})
+                    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+                    for endpoint in endpoints:
+                        def request():
+                            # Cold role cache, as for the first request a
+                            # worker sees from a user
+                            role_cache.clear()
+                            response = client.get(endpoint)
+                            assert response.status_code == 200, response.content
+
+                        rows.append({"auth": auth, "user": user.username, "endpoint": endpoint,
+                                     **measure(request, repeat)})
+        return rows
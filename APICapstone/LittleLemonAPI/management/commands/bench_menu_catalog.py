@@ -0,0 +1,44 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Category, MenuItem
+
+
+class Command(BaseCommand):
+    help = "Benchmark GET /api/menu-items cold, warm and with If-None-Match (304)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["items"], options["repeat"])
+        write_table(self.stdout, rows, ["mode", "status", "queries", "req_per_s", "mean_ms", "p95_ms"])
+
+    def run_benchmark(self, count, repeat):
+        categories = Category.objects.bulk_create([
+            Category(slug=f"category-{i}", title=f"Category {i}") for i in range(10)
+        ])
+        MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("9.99"), featured=i % 7 == 0, category=categories[i % 10])
+            for i in range(count)
+        ])
+        client = APIClient()
+        url = reverse("menu-collection") + "?page=2&ordering=price"
+
+        rows = []
+        for mode, setup in [("cold", cache.clear), ("warm", None), ("304", None)]:
+            result = {}
+            headers = {}
+            if mode == "304":
+                headers["HTTP_IF_NONE_MATCH"] = client.get(url)["ETag"]
+
+            def request():
+                result["status"] = client.get(url, **headers).status_code
+
+            rows.append({"mode": mode, **measure(request, repeat, setup=setup), **result})
+        return rows
@@ -0,0 +1,65 @@
+import time
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, write_table
+from LittleLemonAPI.models import Category, MenuItem
+from LittleLemonAPI.roles import MANAGER
+
+
+class Command(BaseCommand):
+    help = "Benchmark loading a menu with one POST per item against POST /api/menu-items/import"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=10000)
+        parser.add_argument("--single", type=int, default=500, help="items to load one POST at a time")
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["items"], options["single"])
+        write_table(self.stdout, rows, ["mode", "items", "queries", "seconds", "items_per_s"])
+
+    def run_benchmark(self, count, single):
+        categories = Category.objects.bulk_create([
+            Category(slug=f"category-{i}", title=f"Category {i}") for i in range(10)
+        ])
+        manager = User.objects.create_user("bench-manager")
+        manager.groups.add(Group.objects.get_or_create(name=MANAGER)[0])
+        client = APIClient()
+        client.force_authenticate(manager)
+
+        def payload(prefix, size):
+            return [
+                {"title": f"{prefix} {i}", "price": "4.50", "featured": i % 7 == 0,
+                 "category_id": categories[i % 10].id}
+                for i in range(size)
+            ]
+
+        def one_by_one(items):
+            for item in items:
+                response = client.post(reverse("menu-collection"), item, format="json")
+                assert response.status_code == 201, response.content
+
+        def bulk(items):
+            response = client.post(reverse("menu-import"), items, format="json")
+            assert response.status_code == 200, response.content
+
+        rows = []
+        for mode, load, items in [
+            ("POST per item", one_by_one, payload("Single", single)),
+            ("import (insert)", bulk, payload("Bulk", count)),
+            ("import (update)", bulk, payload("Bulk", count)),
+        ]:
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                load(items)
+                elapsed = time.perf_counter() - start
+            rows.append({
+                "mode": mode, "items": len(items), "queries": len(ctx.captured_queries),
+                "seconds": elapsed, "items_per_s": len(items) / elapsed,
+            })
+        assert MenuItem.objects.count() == single + count
+        return rows
@@ -0,0 +1,77 @@
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.metrics import MetricsMiddleware, MetricsRegistry, registry
+from LittleLemonAPI.models import Category, MenuItem
+
+
+class Command(BaseCommand):
+    help = "Measure the per request overhead of MetricsMiddleware and the cost of rendering /metrics"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=100000)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["calls"], options["repeat"])
+        write_table(self.stdout, rows, ["case", "us_per_call"])
+
+    def run_benchmark(self, calls, repeat):
+        request = RequestFactory().get("/api/menu-items")
+        request.resolver_match = None
+        response = HttpResponse(b"x" * 2000)
+
+        def view(request):
+            return response
+
+        def query_view(request):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return response
+
+        rows = []
+        for case, get_response in [("no queries", view), ("one query", query_view)]:
+            bare = per_call(lambda: get_response(request), calls)
+            middleware = MetricsMiddleware(get_response)
+            wrapped = per_call(lambda: middleware(request), calls)
+            rows.append({"case": f"middleware overhead, {case}", "us_per_call": wrapped - bare})
+
+        # A full scrape after every route has been hit with a few statuses
+        full = MetricsRegistry()
+        for route in range(40):
+            for status in (200, 400, 404):
+                full.record(f"route-{route}", "GET", status, 0.01, 3, 0.001, 1000)
+        rows.append({"case": "render /metrics, 120 series", "us_per_call": per_call(full.render, 1000)})
+
+        # End to end, through the test client, with and without the middleware
+        category = Category.objects.create(slug="bench", title="Bench")
+        MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("3.00"), featured=False, category=category) for i in range(50)
+        ])
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("bench-customer"))
+        url = reverse("menu-collection")
+        from django.conf import settings
+        without = [name for name in settings.MIDDLEWARE if name != "LittleLemonAPI.metrics.MetricsMiddleware"]
+        for case, middleware in [("GET menu-items, with metrics", settings.MIDDLEWARE),
+                                 ("GET menu-items, without metrics", without)]:
+            with override_settings(MIDDLEWARE=middleware):
+                rows.append({"case": case, "us_per_call": measure(lambda: client.get(url), repeat)["p50_ms"] * 1000})
+        registry.clear()
+        return rows
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
@@ -0,0 +1,63 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+from LittleLemonAPI.roles import DELIVERY_CREW
+
+
+class Command(BaseCommand):
+    help = "Benchmark delivery crew marking orders delivered one PATCH at a time and in one batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["sizes"], options["repeat"])
+        write_table(self.stdout, rows, ["case", "orders", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, sizes, repeat):
+        category = Category.objects.create(slug="bench", title="Bench")
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("3.00"), featured=False, category=category)
+            for i in range(3)
+        ])
+        crew = User.objects.create_user("bench-crew")
+        crew.groups.add(Group.objects.create(name=DELIVERY_CREW))
+        customer = User.objects.create_user("bench-customer")
+        client = APIClient()
+        client.force_authenticate(crew)
+
+        rows = []
+        for size in sizes:
+            Order.objects.all().delete()
+            orders = Order.objects.bulk_create([
+                Order(user=customer, delivery_crew=crew, total=Decimal("9.00"), date=date.today())
+                for _ in range(size)
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, menuitem=item, quantity=1, unit_price=item.price)
+                for order in orders for item in items
+            ])
+
+            def reopen():
+                Order.objects.update(status=False)
+
+            def one_by_one():
+                for order in orders:
+                    response = client.patch(reverse("order-single", args=[order.id]), {"status": True}, format="json")
+                    assert response.status_code == 200, response.content
+
+            def batch():
+                response = client.patch(reverse("order-status"), {"ids": [order.id for order in orders], "status": True},
+                                        format="json")
+                assert response.status_code == 200 and response.data["updated"] == size, response.content
+
+            rows.append({"case": "PATCH per order", "orders": size, **measure(one_by_one, repeat, setup=reopen)})
+            rows.append({"case": "PATCH orders/status", "orders": size, **measure(batch, repeat, setup=reopen)})
+        return rows
@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Order
+from LittleLemonAPI.pagination import encode_cursor
+
+
+class Command(BaseCommand):
+    help = "Benchmark page number against keyset pagination of /api/orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1000000)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["orders"], options["page_size"], options["repeat"])
+        write_table(self.stdout, rows, ["mode", "page", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, count, page_size, repeat):
+        customer = User.objects.create_user("bench-customer")
+        start = date(2020, 1, 1)
+        batch = 10000
+        for offset in range(0, count, batch):
+            Order.objects.bulk_create([
+                Order(user=customer, total=Decimal("10.00"), date=start + timedelta(days=i // 500))
+                for i in range(offset, min(offset + batch, count))
+            ])
+
+        client = APIClient()
+        client.force_authenticate(customer)
+        url = reverse("order-collection")
+        pages = count // page_size
+        rows = []
+
+        for page in [1, pages // 2, pages]:
+            def request():
+                assert client.get(url, {"page": page, "page_size": page_size}).status_code == 200
+            rows.append({"mode": "page number", "page": page, **measure(request, repeat)})
+
+        for page in [1, pages // 2, pages]:
+            cursor = self.cursor_for(page, page_size)
+
+            def request():
+                assert client.get(url, {"cursor": cursor, "page_size": page_size}).status_code == 200
+            rows.append({"mode": "keyset", "page": page, **measure(request, repeat)})
+        return rows
+
+    def cursor_for(self, page, page_size):
+        if page == 1:
+            return ""
+        # A keyset page starts after the last row of the previous page
+        previous = Order.objects.order_by("-date", "-id")[(page - 1) * page_size - 1]
+        return encode_cursor(["-date", "-id"], [previous.date, previous.id])
@@ -0,0 +1,85 @@
+import time
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from rest_framework_xml.renderers import XMLRenderer
+from LittleLemonAPI.bench import test_database, peak_memory, write_table
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+from LittleLemonAPI.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from LittleLemonAPI.serializers import ManagerOrderSerializer
+
+
+class Command(BaseCommand):
+    help = "Benchmark encoding an order list with each renderer, whole and streamed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with test_database():
+            data = self.order_data(options["orders"])
+        renderers = [JSONRenderer(), FastJSONRenderer(), XMLRenderer()]
+        if msgpack is not None:
+            renderers.append(MessagePackRenderer())
+
+        rows = []
+        for renderer in renderers:
+            size = len(renderer.render(data, renderer.media_type, {}))
+            modes = [("whole", whole(renderer, data))]
+            if hasattr(renderer, "render_iter"):
+                modes.append(("streamed", streamed(renderer, data)))
+            for mode, fn in modes:
+                seconds = best_time(fn, options["repeat"])
+                rows.append({
+                    "renderer": type(renderer).__name__, "mode": mode, "orders": len(data), "bytes": size,
+                    "ms": seconds * 1000, "mb_per_s": size / seconds / 1e6, "peak_kib": peak_memory(fn),
+                })
+        write_table(self.stdout, rows, ["renderer", "mode", "orders", "bytes", "ms", "mb_per_s", "peak_kib"])
+
+    def order_data(self, size):
+        # What the manager order list hands to the renderer
+        categories = Category.objects.bulk_create([Category(slug=f"c{i}", title=f"Category {i}") for i in range(5)])
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("4.25"), featured=False, category=categories[i % 5])
+            for i in range(50)
+        ])
+        customer = User.objects.create_user("bench-customer")
+        crew = User.objects.create_user("bench-crew")
+        orders = Order.objects.bulk_create([
+            Order(user=customer, delivery_crew=crew, total=Decimal("21.25"), date=date.today()) for _ in range(size)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menuitem=items[(order.id + i) % 50], quantity=1, unit_price=Decimal("4.25"))
+            for order in orders for i in range(5)
+        ])
+        queryset = Order.objects.select_related("user", "delivery_crew").prefetch_related(
+            Prefetch("orderitem_set", queryset=OrderItem.objects.select_related("menuitem__category"))
+        )
+        return ManagerOrderSerializer(queryset, many=True).data
+
+
+def whole(renderer, data):
+    return lambda: renderer.render(data, renderer.media_type, {})
+
+
+def streamed(renderer, data):
+    # Chunks are dropped as soon as they are produced, as a server would
+    # after writing them out
+    def fn():
+        for _ in renderer.render_iter(data, renderer.media_type, {}):
+            pass
+    return fn
+
+
+def best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
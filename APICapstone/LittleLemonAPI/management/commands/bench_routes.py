@@ -0,0 +1,295 @@
+import io
+import itertools
+import json
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User, Group
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import URLPattern, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from LittleLemonAPI import urls
+from LittleLemonAPI.bench import test_database, measure, peak_memory, write_table
+from LittleLemonAPI.cart import add_to_cart
+from LittleLemonAPI.checkout import place_order
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+from LittleLemonAPI.roles import MANAGER, DELIVERY_CREW, get_group, invalidate_roles
+
+# Dataset sizes as (menu items, users, orders). Every order has
+# ITEMS_PER_ORDER items, so "full" is 1M orders and 5M order items.
+SCALES = {
+    "tiny": (500, 2000, 10000),
+    "small": (2000, 20000, 100000),
+    "full": (10000, 100000, 1000000),
+}
+ITEMS_PER_ORDER = 5
+CATEGORIES = 20
+CREW_SIZE = 50
+DAYS = 365
+BATCH_SIZE = 50000
+
+COLUMNS = ["case", "method", "route", "queries", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "peak_kib"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset and benchmark every route in LittleLemonAPI/urls.py through the test client, "
+        "optionally writing the results as JSON and comparing them against a stored baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, default="tiny")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--output", help="write the results to this JSON file")
+        parser.add_argument("--baseline", help="compare against the results in this JSON file")
+        parser.add_argument("--tolerance", type=float, default=0.5,
+                            help="allowed p50 slowdown against the baseline, as a fraction")
+
+    def handle(self, *args, **options):
+        with test_database():
+            dataset = self.seed(*SCALES[options["scale"]])
+            cases = self.cases(dataset)
+            self.check_coverage(cases)
+            rows = [self.run_case(case, options["repeat"]) for case in cases]
+
+        columns = COLUMNS
+        regressions = []
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            regressions = compare(rows, baseline["results"], options["tolerance"])
+            columns = COLUMNS + ["baseline"]
+        write_table(self.stdout, rows, columns)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"scale": options["scale"], "dataset": dataset["counts"], "results": rows}, f, indent=2)
+        if regressions:
+            raise CommandError(f"{len(regressions)} regressions against the baseline: {', '.join(regressions)}")
+
+    def check_coverage(self, cases):
+        # Every route must be benchmarked, so new routes cannot slip by
+        covered = {case["route"] for case in cases}
+        missing = [
+            str(pattern.pattern) for pattern in urls.urlpatterns
+            if isinstance(pattern, URLPattern) and str(pattern.pattern) not in covered
+        ]
+        if missing:
+            raise CommandError(f"No benchmark case for: {', '.join(missing)}")
+
+    def run_case(self, case, repeat):
+        def call():
+            send(case)
+
+        stats = measure(call, repeat, setup=case["setup"])
+        return {
+            "case": case["name"],
+            "method": case["method"].upper(),
+            "route": case["route"],
+            **{column: stats[column] for column in ["queries", "mean_ms", "p50_ms", "p95_ms", "p99_ms"]},
+            "peak_kib": peak_memory(call, setup=case["setup"]),
+        }
+
+    def seed(self, menu_size, user_count, order_count):
+        rng = random.Random(0)
+        categories = Category.objects.bulk_create([
+            Category(slug=f"category-{i}", title=f"Category {i}") for i in range(CATEGORIES)
+        ])
+        menu = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal(f"{2 + i % 17}.{i % 4 * 25:02d}"), featured=i % 10 == 0,
+                     category=categories[i % CATEGORIES])
+            for i in range(menu_size)
+        ], batch_size=BATCH_SIZE)
+        users = User.objects.bulk_create([
+            User(username=f"user-{i}", password="!") for i in range(user_count)
+        ], batch_size=BATCH_SIZE)
+        crew, customers = users[:CREW_SIZE], users[CREW_SIZE:]
+        Group.objects.create(name=DELIVERY_CREW).user_set.add(*crew)
+        manager = User.objects.create_user("bench-manager")
+        manager.groups.add(Group.objects.create(name=MANAGER))
+
+        # Orders and items go in with executemany; building millions of
+        # model instances would take longer than the benchmark itself
+        prices = [(item.id, item.price) for item in menu]
+        first_day = date.today() - timedelta(days=DAYS - 1)
+        order_rows, item_rows = [], []
+        for order_id in range(1, order_count + 1):
+            crew_member = rng.choice(crew).id if rng.random() < 0.7 else None
+            picks = [prices[(order_id * 7 + k * 131) % menu_size] for k in range(ITEMS_PER_ORDER)]
+            quantities = [rng.randint(1, 3) for _ in picks]
+            total = sum(price * quantity for (_, price), quantity in zip(picks, quantities))
+            order_rows.append((
+                order_id, rng.choice(customers).id, crew_member, crew_member is not None and rng.random() < 0.8,
+                str(total), (first_day + timedelta(days=rng.randrange(DAYS))).isoformat(),
+            ))
+            item_rows.extend(
+                (order_id, menuitem_id, quantity, str(price)) for (menuitem_id, price), quantity in zip(picks, quantities)
+            )
+            if len(order_rows) == BATCH_SIZE or order_id == order_count:
+                insert(Order, ["id", "user_id", "delivery_crew_id", "status", "total", "date"], order_rows)
+                insert(OrderItem, ["order_id", "menuitem_id", "quantity", "unit_price"], item_rows)
+                order_rows, item_rows = [], []
+        call_command("backfill_sales_rollups", stdout=io.StringIO())
+
+        customer = customers[0]
+        add_to_cart(customer, [(item.id, 1) for item in menu[:10]])
+        return {
+            "counts": {
+                "menu_items": menu_size, "users": User.objects.count(),
+                "orders": order_count, "order_items": order_count * ITEMS_PER_ORDER,
+            },
+            "categories": categories, "menu": menu, "crew": crew, "customers": customers,
+            "customer": customer, "manager": manager,
+            "customer_order": Order.objects.filter(user=customer).values_list("id", flat=True).first(),
+            "crew_orders": list(Order.objects.filter(delivery_crew=crew[0]).values_list("id", flat=True)[:100]),
+        }
+
+    def cases(self, dataset):
+        customer, manager, crew = dataset["customer"], dataset["manager"], dataset["crew"][0]
+        clients = {user: token_client(user) for user in (customer, manager, crew)}
+        menu, categories, customers = dataset["menu"], dataset["categories"], dataset["customers"]
+        counter = itertools.count()
+        state = {}
+
+        def case(name, route, method, user, url, data=None, status=200, setup=None):
+            return {"name": name, "route": route, "method": method, "client": clients[user], "url": url,
+                    "data": data, "status": status, "setup": setup}
+
+        def new_menu_item():
+            state["menuitem"] = MenuItem.objects.create(
+                title=f"Bench {next(counter)}", price=Decimal("4.50"), featured=False, category=categories[0])
+
+        def fill_cart():
+            add_to_cart(customer, [(item.id, 1) for item in menu[:10]])
+
+        def new_order():
+            fill_cart()
+            state["order"] = place_order(customer)
+
+        def set_group(name, member):
+            def setup():
+                user = customers[1]
+                if member:
+                    user.groups.add(get_group(name))
+                else:
+                    user.groups.remove(get_group(name))
+                invalidate_roles(user)
+            return setup
+
+        def flip():
+            state["status"] = not state.get("status", False)
+            return state["status"]
+
+        today = date.today()
+        export_filters = {"date_from": (today - timedelta(days=6)).isoformat()}
+        import_rows = [
+            {"title": item.title, "price": "3.75", "featured": False, "category_id": item.category_id}
+            for item in menu[:100]
+        ]
+        return [
+            case("menu list", "menu-items", "get", customer, reverse("menu-collection")),
+            case("menu search", "menu-items", "get", customer, reverse("menu-collection"), {"search": "Item 12"}),
+            case("menu by price", "menu-items", "get", customer, reverse("menu-collection"), {"ordering": "price"}),
+            case("menu by category", "menu-items", "get", customer, reverse("menu-collection"),
+                 {"category": categories[3].id}),
+            case("menu by category and price", "menu-items", "get", customer, reverse("menu-collection"),
+                 {"category": categories[3].id, "ordering": "price"}),
+            case("menu create", "menu-items", "post", manager, reverse("menu-collection"), lambda: {
+                "title": f"Bench {next(counter)}", "price": "4.50", "featured": False, "category_id": categories[0].id,
+            }, status=201),
+            case("menu import 100", "menu-items/import", "post", manager, reverse("menu-import"), import_rows),
+            case("menu item", "menu-items/<int:pk>", "get", customer, reverse("menu-single", args=[menu[0].id])),
+            case("menu item update", "menu-items/<int:pk>", "patch", manager,
+                 reverse("menu-single", args=[menu[0].id]), {"price": "5.25"}),
+            case("menu item delete", "menu-items/<int:pk>", "delete", manager,
+                 lambda: reverse("menu-single", args=[state["menuitem"].id]), status=204, setup=new_menu_item),
+            case("managers", "groups/manager/users", "get", manager, "/api/groups/manager/users"),
+            case("manager add", "groups/manager/users", "post", manager, "/api/groups/manager/users",
+                 {"user_id": customers[1].id}, status=201, setup=set_group(MANAGER, False)),
+            case("manager remove", "groups/manager/users/<int:pk>", "delete", manager,
+                 f"/api/groups/manager/users/{customers[1].id}", setup=set_group(MANAGER, True)),
+            case("delivery crew", "groups/delivery-crew/users", "get", manager, "/api/groups/delivery-crew/users"),
+            case("delivery crew add", "groups/delivery-crew/users", "post", manager,
+                 "/api/groups/delivery-crew/users", {"user_id": customers[1].id}, status=201,
+                 setup=set_group(DELIVERY_CREW, False)),
+            case("delivery crew remove", "groups/delivery-crew/users/<int:pk>", "delete", manager,
+                 f"/api/groups/delivery-crew/users/{customers[1].id}", setup=set_group(DELIVERY_CREW, True)),
+            case("cart", "cart/menu-items", "get", customer, reverse("cart")),
+            case("cart add", "cart/menu-items", "post", customer, reverse("cart"),
+                 {"menuitem_id": menu[0].id, "quantity": 1}, status=201),
+            case("cart clear", "cart/menu-items", "delete", customer, reverse("cart"), status=204, setup=fill_cart),
+            case("cart summary", "cart/summary", "get", customer, reverse("cart-summary")),
+            case("orders (customer)", "orders", "get", customer, reverse("order-collection")),
+            case("orders (delivery crew)", "orders", "get", crew, reverse("order-collection")),
+            case("orders (manager)", "orders", "get", manager, reverse("order-collection")),
+            case("checkout 10 lines", "orders", "post", customer, reverse("order-collection"), status=201,
+                 setup=fill_cart),
+            case("export csv, 7 days", "orders/export.<str:export_format>", "get", manager,
+                 reverse("order-export", args=["csv"]), export_filters),
+            case("export ndjson, 7 days", "orders/export.<str:export_format>", "get", manager,
+                 reverse("order-export", args=["ndjson"]), export_filters),
+            case("assign 100", "orders/assign", "post", manager, reverse("order-assign"), {"limit": 100}),
+            case("status 100", "orders/status", "patch", crew, reverse("order-status"),
+                 lambda: {"ids": dataset["crew_orders"], "status": flip()}),
+            case("order", "orders/<int:pk>", "get", customer,
+                 reverse("order-single", args=[dataset["customer_order"]])),
+            case("order update", "orders/<int:pk>", "patch", manager,
+                 reverse("order-single", args=[dataset["customer_order"]]), lambda: {"status": flip()}),
+            case("order delete", "orders/<int:pk>", "delete", manager,
+                 lambda: reverse("order-single", args=[state["order"].id]), status=204, setup=new_order),
+            case("sales by day", "reports/sales/daily", "get", manager, reverse("sales-daily")),
+            case("sales by menu item", "reports/sales/menu-items", "get", manager, reverse("sales-menu-items")),
+            case("sales by category", "reports/sales/categories", "get", manager, reverse("sales-categories")),
+            case("current user (djoser)", "users/me/", "get", customer, "/api/users/me/"),
+        ]
+
+
+def send(case):
+    # Make the case's request and read the whole response
+    client = case["client"]
+    data = case["data"]() if callable(case["data"]) else case["data"]
+    url = case["url"]() if callable(case["url"]) else case["url"]
+    if case["method"] == "get":
+        response = client.get(url, data)
+    else:
+        response = getattr(client, case["method"])(url, data, format="json")
+    assert response.status_code == case["status"], (case["name"], response.status_code, response.content)
+    if response.streaming:
+        b"".join(response.streaming_content)
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+    return client
+
+
+def insert(model, columns, rows):
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})", rows
+        )
+
+
+def compare(rows, baseline, tolerance):
+    # Mark each row against the baseline run and return the regressed cases:
+    # more queries, or a p50 more than tolerance slower (and at least 1 ms,
+    # so sub-millisecond noise does not count)
+    previous = {row["case"]: row for row in baseline}
+    regressions = []
+    for row in rows:
+        base = previous.get(row["case"])
+        if base is None:
+            row["baseline"] = "new"
+            continue
+        change = row["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0
+        row["baseline"] = f"{change:+.0%}"
+        slower = change > tolerance and row["p50_ms"] - base["p50_ms"] > 1
+        if slower or row["queries"] > base["queries"]:
+            row["baseline"] += f" REGRESSION ({base['queries']} queries, {base['p50_ms']:.3f} ms)"
+            regressions.append(row["case"])
+    return regressions
@@ -0,0 +1,83 @@
+import io
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User, Group
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+from LittleLemonAPI.roles import MANAGER
+
+
+class Command(BaseCommand):
+    help = "Benchmark the manager sales reports over a year of orders, from the rollups and from the orders themselves"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["orders"], options["days"], options["repeat"])
+        write_table(self.stdout, rows, ["report", "source", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, orders, days, repeat):
+        self.seed(orders, days)
+        start = time.perf_counter()
+        call_command("backfill_sales_rollups", stdout=io.StringIO())
+        self.stdout.write(f"Backfilled {orders} orders in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        manager = User.objects.create_user("bench-manager")
+        manager.groups.add(Group.objects.get_or_create(name=MANAGER)[0])
+        client = APIClient()
+        client.force_authenticate(manager)
+
+        def get(url):
+            def request():
+                response = client.get(url)
+                assert response.status_code == 200, response.content
+            return request
+
+        items = OrderItem.objects.annotate(revenue=F("quantity") * F("unit_price"))
+        direct = {
+            "daily": lambda: list(items.values("order__date").annotate(
+                orders=Count("order_id", distinct=True), items=Sum("quantity"), total=Sum("revenue")).order_by("order__date")),
+            "menu-items": lambda: list(items.values("menuitem_id", "menuitem__title").annotate(
+                quantity=Sum("quantity"), total=Sum("revenue")).order_by("-total")),
+            "categories": lambda: list(items.values("menuitem__category_id", "menuitem__category__title").annotate(
+                quantity=Sum("quantity"), total=Sum("revenue")).order_by("-total")),
+        }
+        rows = []
+        for report, name in [("daily", "sales-daily"), ("menu-items", "sales-menu-items"), ("categories", "sales-categories")]:
+            rows.append({"report": report, "source": "rollups (API)", **measure(get(reverse(name)), repeat)})
+            rows.append({"report": report, "source": "orders (ORM)", **measure(direct[report], max(1, repeat // 4))})
+        return rows
+
+    def seed(self, orders, days):
+        random.seed(0)
+        categories = Category.objects.bulk_create([Category(slug=f"c{i}", title=f"Category {i}") for i in range(8)])
+        menu = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal(f"{2 + i % 13}.50"), featured=False, category=categories[i % 8])
+            for i in range(120)
+        ])
+        customers = User.objects.bulk_create([User(username=f"bench-{i}") for i in range(500)])
+        first_day = date.today() - timedelta(days=days - 1)
+        for start in range(0, orders, 5000):
+            batch = []
+            for _ in range(min(5000, orders - start)):
+                lines = [(item, random.randint(1, 3)) for item in random.sample(menu, 3)]
+                order = Order(user=random.choice(customers), status=random.random() < 0.8,
+                              total=sum(item.price * quantity for item, quantity in lines),
+                              date=first_day + timedelta(days=random.randrange(days)))
+                batch.append((order, lines))
+            Order.objects.bulk_create([order for order, _ in batch])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, menuitem=item, quantity=quantity, unit_price=item.price)
+                for order, lines in batch for item, quantity in lines
+            ])
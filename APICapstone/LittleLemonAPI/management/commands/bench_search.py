@@ -0,0 +1,69 @@
+import random
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Category, MenuItem
+from LittleLemonAPI.views import MenuItemsViewSet
+
+WORDS = [
+    "lemon", "greek", "salad", "bruschetta", "grilled", "fish", "pasta", "dessert", "olive", "feta",
+    "tomato", "basil", "garlic", "lamb", "chicken", "rice", "spicy", "sweet", "roasted", "fresh",
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark ?search= on /api/menu-items, FTS5 index against SearchFilter"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=100000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["items"], options["repeat"])
+        write_table(self.stdout, rows, ["backend", "search", "count", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, count, repeat):
+        rng = random.Random(0)
+        categories = Category.objects.bulk_create([
+            Category(slug=f"category-{i}", title=f"Category {i}") for i in range(10)
+        ])
+        for offset in range(0, count, 10000):
+            MenuItem.objects.bulk_create([
+                MenuItem(
+                    title=" ".join(rng.sample(WORDS, 3)) + f" {i}",
+                    price=Decimal(rng.randrange(100, 10000)) / 100,
+                    featured=i % 7 == 0,
+                    category=categories[i % 10],
+                )
+                for i in range(offset, min(offset + 10000, count))
+            ])
+
+        client = APIClient()
+        url = reverse("menu-collection")
+        rows = []
+        legacy = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+        for backend, patch in [
+            ("SearchFilter", mock.patch.object(MenuItemsViewSet, "filter_backends", legacy)),
+            ("FTS5", mock.patch.object(MenuItemsViewSet, "filter_backends", MenuItemsViewSet.filter_backends)),
+        ]:
+            with patch:
+                for search in ["lemon", "gril", "lemon salad", "nothing"]:
+                    result = {}
+
+                    def request():
+                        response = client.get(url, {"search": search})
+                        result["count"] = response.data["count"]
+
+                    # The catalog cache is cleared so every request searches
+                    rows.append({
+                        "backend": backend, "search": search,
+                        **measure(request, repeat, setup=cache.clear), **result,
+                    })
+        return rows
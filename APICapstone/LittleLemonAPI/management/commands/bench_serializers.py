@@ -0,0 +1,79 @@
+import time
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from django.test.utils import override_settings
+from LittleLemonAPI.bench import test_database, write_table
+from LittleLemonAPI.models import Category, MenuItem, Cart, Order, OrderItem
+from LittleLemonAPI.serializers import (
+    MenuItemSerializer, CartSerializer, OrderSerializer, ManagerOrderSerializer, DeliveryCrewOrderSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark rendering rows with the DRF serializers and with their compiled versions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["rows"], options["repeat"])
+        write_table(self.stdout, rows, ["serializer", "rows", "drf_rows_per_s", "compiled_rows_per_s", "speedup"])
+
+    def run_benchmark(self, size, repeat):
+        categories = Category.objects.bulk_create([Category(slug=f"c{i}", title=f"Category {i}") for i in range(5)])
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("4.25"), featured=i % 3 == 0, category=categories[i % 5])
+            for i in range(size)
+        ])
+        customer = User.objects.create_user("bench-customer")
+        crew = User.objects.create_user("bench-crew")
+        Cart.objects.bulk_create([
+            Cart(user=customer, menuitem=item, quantity=2, unit_price=item.price, price=item.price * 2)
+            for item in items
+        ])
+        orders = Order.objects.bulk_create([
+            Order(user=customer, delivery_crew=crew, total=Decimal("21.25"), date=date.today()) for _ in range(size)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menuitem=item, quantity=1, unit_price=item.price)
+            for order in orders for item in items[:5]
+        ])
+
+        # Load everything once; only the rendering is timed
+        menu = list(MenuItem.objects.select_related("category"))
+        cart = list(Cart.objects.select_related("menuitem__category"))
+        order_rows = list(Order.objects.select_related("user", "delivery_crew").prefetch_related(
+            Prefetch("orderitem_set", queryset=OrderItem.objects.select_related("menuitem__category"))
+        ))
+
+        rows = []
+        for serializer_class, instances in [
+            (MenuItemSerializer, menu),
+            (CartSerializer, cart),
+            (OrderSerializer, order_rows),
+            (ManagerOrderSerializer, order_rows),
+            (DeliveryCrewOrderSerializer, order_rows),
+        ]:
+            with override_settings(LITTLELEMON_COMPILED_SERIALIZERS=False):
+                drf = rows_per_second(serializer_class, instances, repeat)
+            compiled = rows_per_second(serializer_class, instances, repeat)
+            rows.append({
+                "serializer": serializer_class.__name__, "rows": len(instances),
+                "drf_rows_per_s": drf, "compiled_rows_per_s": compiled, "speedup": compiled / drf,
+            })
+        return rows
+
+
+def rows_per_second(serializer_class, instances, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        serializer_class(instances, many=True).data
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(instances) / best
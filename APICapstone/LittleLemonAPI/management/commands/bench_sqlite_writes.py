@@ -0,0 +1,138 @@
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from LittleLemonAPI.bench import write_table
+from LittleLemonAPI.models import Category, MenuItem
+
+# Database settings compared: Django's stock SQLite setup (rollback journal,
+# deferred transactions, a connection per request), the tuned settings from
+# settings.py without the write queue, and the full production profile.
+PROFILES = [
+    ("stock", {}, 0, False),
+    ("wal", settings.DATABASES["default"].get("OPTIONS", {}), settings.DATABASES["default"].get("CONN_MAX_AGE", 0), False),
+    ("production", settings.DATABASES["default"].get("OPTIONS", {}), settings.DATABASES["default"].get("CONN_MAX_AGE", 0), True),
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent checkouts and reads against a SQLite file with each database profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        # Concurrency needs a real database file, so this uses its own
+        # throwaway files rather than the in-memory test database
+        settings_dict = connections.settings[connection.alias]
+        saved = {key: settings_dict.get(key) for key in ["NAME", "OPTIONS", "CONN_MAX_AGE"]}
+        rows = []
+        try:
+            with tempfile.TemporaryDirectory() as directory, \
+                    override_settings(DEBUG=False, ALLOWED_HOSTS=["*"]), \
+                    mock.patch("rest_framework.views.APIView.get_throttles", return_value=[]):
+                for name, db_options, max_age, queue in PROFILES:
+                    connection.close()
+                    settings_dict.update(NAME=str(Path(directory) / f"{name}.sqlite3"), OPTIONS=dict(db_options),
+                                         CONN_MAX_AGE=max_age)
+                    call_command("migrate", verbosity=0, interactive=False)
+                    cache.clear()
+                    with override_settings(LITTLELEMON_SQLITE_WRITE_QUEUE=queue):
+                        result = self.run_profile(options["writers"], options["readers"], options["seconds"])
+                    rows.append({"profile": name, **result})
+        finally:
+            connection.close()
+            settings_dict.update(saved)
+        write_table(self.stdout, rows, [
+            "profile", "checkouts", "checkouts_per_s", "write_p95_ms", "locked_errors", "reads_per_s", "read_p95_ms",
+        ])
+
+    def run_profile(self, writers, readers, seconds):
+        category = Category.objects.create(slug="bench", title="Bench")
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("2.50"), featured=False, category=category)
+            for i in range(20)
+        ])
+        users = [User.objects.create_user(f"bench-{i}") for i in range(writers + readers)]
+        connection.close()
+
+        stop = threading.Event()
+        results = {"write": [], "read": [], "errors": 0}
+        lock = threading.Lock()
+
+        def write(client, n):
+            # Add three lines to the cart, then check out
+            response = client.post(reverse("cart"), [
+                {"menuitem_id": items[(n + i) % len(items)].id, "quantity": 1} for i in range(3)
+            ], format="json")
+            if response.status_code == 201:
+                response = client.post(reverse("order-collection"))
+            return response.status_code == 201
+
+        def read(client, n):
+            return client.get(reverse("order-collection")).status_code == 200
+
+        def worker(user, action, timings):
+            client = APIClient()
+            client.force_authenticate(user)
+            n = 0
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        ok = action(client, n)
+                    except Exception as exc:
+                        # "database is locked" surfaces as OperationalError
+                        ok = False
+                        if "locked" not in str(exc):
+                            raise
+                    elapsed = (time.perf_counter() - start) * 1000
+                    with lock:
+                        if ok:
+                            timings.append(elapsed)
+                        else:
+                            results["errors"] += 1
+                    n += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(user, write, results["write"])) for user in users[:writers]
+        ] + [
+            threading.Thread(target=worker, args=(user, read, results["read"])) for user in users[writers:]
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        return {
+            "checkouts": len(results["write"]),
+            "checkouts_per_s": len(results["write"]) / seconds,
+            "write_p95_ms": percentile(results["write"], 95),
+            "locked_errors": results["errors"],
+            "reads_per_s": len(results["read"]) / seconds,
+            "read_p95_ms": percentile(results["read"], 95),
+        }
+
+
+def percentile(timings, n):
+    if len(timings) < 2:
+        return timings[0] if timings else 0.0
+    return statistics.quantiles(timings, n=100)[n - 1]
@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.throttling import UserRateThrottle
+from LittleLemonAPI import throttling
+from LittleLemonAPI.bench import write_table
+from LittleLemonAPI.throttling import UserBucketThrottle
+
+RATE = "1000/hour"
+
+
+class Command(BaseCommand):
+    help = "Benchmark the shared token bucket throttle against DRF's cache throttle with several worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=5000, help="requests per worker")
+
+    def handle(self, *args, **options):
+        rows = []
+        with tempfile.TemporaryDirectory() as directory:
+            store = os.path.join(directory, "throttle.sqlite3")
+            for name, throttle_class in [("UserRateThrottle", UserRateThrottle), ("UserBucketThrottle", UserBucketThrottle)]:
+                rows.append(run(name, throttle_class, store, options["workers"], options["requests"]))
+        write_table(self.stdout, rows, ["throttle", "workers", "requests", "allowed", "limit", "us_per_check"])
+
+
+def run(name, throttle_class, store, workers, requests):
+    # Fork the workers the way gunicorn does; each one starts with an empty
+    # process cache and hammers the same user
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        results = pool.starmap(worker, [(throttle_class, store, requests)] * workers)
+    return {
+        "throttle": name,
+        "workers": workers,
+        "requests": workers * requests,
+        "allowed": sum(allowed for allowed, _ in results),
+        "limit": int(RATE.split("/")[0]),
+        "us_per_check": sum(elapsed for _, elapsed in results) / (workers * requests) * 1e6,
+    }
+
+
+def worker(throttle_class, store, requests):
+    cache.clear()
+    throttling._store = throttling.BucketStore(store)
+    request = SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=1), META={})
+    view = SimpleNamespace(action="list")
+    with mock.patch.object(throttle_class, "rate", RATE, create=True):
+        allowed = 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            allowed += throttle_class().allow_request(request, view)
+        return allowed, time.perf_counter() - start
@@ -0,0 +1,59 @@
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from LittleLemonAPI.authentication import CachedTokenAuthentication, token_cache
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.models import Category, MenuItem, Cart
+
+
+class Command(BaseCommand):
+    help = "Benchmark a sustained POS session on djoser authtokens with TokenAuthentication and CachedTokenAuthentication"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--terminals", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=200, help="requests per terminal")
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["terminals"], options["requests"])
+        write_table(self.stdout, rows, ["auth", "requests", "hit_rate", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, terminals, requests):
+        category = Category.objects.create(slug="bench", title="Bench")
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("3.00"), featured=False, category=category)
+            for i in range(5)
+        ])
+        clients = []
+        for i in range(terminals):
+            user = User.objects.create_user(f"bench-terminal-{i}")
+            Cart.objects.bulk_create([
+                Cart(user=user, menuitem=item, quantity=1, unit_price=item.price, price=item.price) for item in items
+            ])
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+            clients.append(client)
+
+        rows = []
+        for auth, authentication_class in [("TokenAuthentication", TokenAuthentication),
+                                           ("CachedTokenAuthentication", CachedTokenAuthentication)]:
+            token_cache.clear()
+            turn = iter(range(terminals * requests))
+
+            def request():
+                # Terminals take turns, each polling its cart
+                client = clients[next(turn) % terminals]
+                response = client.get("/api/cart/menu-items")
+                assert response.status_code == 200, response.content
+
+            with mock.patch("rest_framework.views.APIView.get_authenticators",
+                            lambda view: [authentication_class()]):
+                result = measure(request, terminals * requests)
+            lookups = token_cache.hits + token_cache.misses
+            rows.append({"auth": auth, "requests": terminals * requests,
+                         "hit_rate": token_cache.hits / lookups if lookups else 0.0, **result})
+        return rows
@@ -0,0 +1,70 @@
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from LittleLemonAPI.bench import test_database, measure, write_table
+from LittleLemonAPI.blacklist import BlacklistIndexMixin, blacklist_index
+
+
+class Command(BaseCommand):
+    help = "Benchmark /jwt/refresh/ with and without the blacklist index, and purge_expired_tokens"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--blacklisted", type=int, default=100000)
+        parser.add_argument("--expired", type=int, default=200000)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with test_database():
+            rows = self.run_benchmark(options["blacklisted"], options["expired"], options["repeat"])
+        write_table(self.stdout, rows, ["case", "queries", "mean_ms", "p50_ms", "p95_ms"])
+
+    def run_benchmark(self, blacklisted, expired, repeat):
+        user = User.objects.create_user("bench-customer", password="bench-password")
+        now = aware_utcnow()
+        for offset in range(0, blacklisted + expired, 10000):
+            tokens = OutstandingToken.objects.bulk_create([
+                OutstandingToken(user=user, jti=uuid.uuid4().hex, token="",
+                                 expires_at=now + timedelta(days=1) if i < blacklisted else now - timedelta(days=1))
+                for i in range(offset, min(offset + 10000, blacklisted + expired))
+            ])
+            BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens])
+        blacklist_index.clear()
+
+        client = APIClient()
+        refresh = client.post("/jwt/create/", {"username": user.username, "password": "bench-password"}).json()["refresh"]
+
+        def request():
+            response = client.post("/jwt/refresh/", {"refresh": refresh})
+            assert response.status_code == 200, response.content
+
+        rows = []
+        with mock.patch.object(BlacklistIndexMixin, "check_blacklist", lambda self: super(BlacklistIndexMixin, self).check_blacklist()):
+            rows.append({"case": "refresh, blacklist query", **measure(request, repeat)})
+        rows.append({"case": "refresh, blacklist index", **measure(request, repeat)})
+
+        blacklist_index.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            blacklist_index.sync()
+            elapsed = (time.perf_counter() - start) * 1000
+        rows.append({"case": f"index rebuild ({blacklisted} live of {blacklisted + expired})",
+                     "queries": len(ctx.captured_queries),
+                     "mean_ms": elapsed, "p50_ms": elapsed, "p95_ms": elapsed})
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            call_command("purge_expired_tokens", stdout=open("/dev/null", "w"))
+            elapsed = (time.perf_counter() - start) * 1000
+        assert OutstandingToken.objects.count() == blacklisted + 1
+        rows.append({"case": f"purge_expired_tokens ({expired} rows)", "queries": len(ctx.captured_queries),
+                     "mean_ms": elapsed, "p50_ms": elapsed, "p95_ms": elapsed})
+        return rows
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted JWTs in batches; run it periodically, e.g. from cron"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # flushexpiredtokens loads every expired token to cascade the delete.
+        # Delete them in SQL instead, one short transaction per batch, so
+        # other writers are only held up for a moment at a time.
+        expired = (
+            f"SELECT id FROM {OutstandingToken._meta.db_table} "
+            f"WHERE expires_at <= %s ORDER BY id LIMIT %s"
+        )
+        params = [aware_utcnow(), options["batch_size"]]
+        deleted = 0
+        with connection.cursor() as cursor:
+            while True:
+                with transaction.atomic():
+                    cursor.execute(f"DELETE FROM {BlacklistedToken._meta.db_table} WHERE token_id IN ({expired})", params)
+                    cursor.execute(f"DELETE FROM {OutstandingToken._meta.db_table} WHERE id IN ({expired})", params)
+                    if not cursor.rowcount:
+                        break
+                    deleted += cursor.rowcount
+        self.stdout.write(f"Deleted {deleted} expired tokens")
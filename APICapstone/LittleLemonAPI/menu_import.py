@@ -0,0 +1,108 @@
+import codecs
+import csv
+import io
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import BaseParser
+from . import catalog
+from .models import Category, MenuItem
+from .serializers import MenuItemImportSerializer
+from .writes import write_transaction
+
+# Bulk menu import. A whole batch is validated with a handful of queries
+# (the categories and the existing titles, looked up BATCH_SIZE values at a
+# time to stay under SQLite's bound parameter limit) and written with a
+# single upsert, so loading a seasonal menu costs a few statements whether
+# it has ten items or ten thousand. Rows are matched on (title, category);
+# existing items get their price and featured flag updated. If any row is
+# invalid nothing is written.
+UPDATE_FIELDS = ["price", "featured"]
+BATCH_SIZE = 500
+
+
+class CSVParser(BaseParser):
+    # text/csv request body with a header row, parsed into a list of dicts
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        # Spreadsheet exports often start with a BOM, which plain utf-8
+        # would leave glued to the first column name
+        if codecs.lookup(encoding).name == "utf-8":
+            encoding = "utf-8-sig"
+        try:
+            return read_csv(codecs.getreader(encoding)(stream))
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ParseError(f"CSV parse error - {exc}")
+
+
+def read_csv(text):
+    return list(csv.DictReader(text))
+
+
+def batches(values):
+    values = list(values)
+    for start in range(0, len(values), BATCH_SIZE):
+        yield values[start:start + BATCH_SIZE]
+
+
+def import_rows(data):
+    # Accept a JSON list, a text/csv body or a multipart upload in "file"
+    if hasattr(data, "get") and data.get("file") is not None:
+        try:
+            return read_csv(io.TextIOWrapper(data["file"], encoding="utf-8-sig"))
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ParseError(f"CSV parse error - {exc}")
+    if not isinstance(data, list):
+        raise ParseError("Expected a list of menu items or a CSV file.")
+    return data
+
+
+def import_menu_items(rows):
+    # Returns ({"created": n, "updated": n}, None) or (None, errors) where
+    # errors maps row numbers (0 based) to that row's validation errors
+    serializer = MenuItemImportSerializer()
+    valid, errors = {}, {}
+    for index, row in enumerate(rows):
+        try:
+            valid[index] = serializer.run_validation(row)
+        except ValidationError as exc:
+            errors[index] = exc.detail
+
+    # Resolve the categories with one IN query per batch
+    category_ids = {row["category_id"] for row in valid.values()}
+    categories = set()
+    for batch in batches(category_ids):
+        categories.update(Category.objects.filter(id__in=batch).values_list("id", flat=True))
+
+    seen = {}
+    for index, row in valid.items():
+        key = (row["title"], row["category_id"])
+        if row["category_id"] not in categories:
+            errors[index] = {"category_id": [f'Invalid pk "{row["category_id"]}" - object does not exist.']}
+        elif key in seen:
+            errors[index] = {"non_field_errors": [f"Duplicate of row {seen[key]}."]}
+        else:
+            seen[key] = index
+    if errors:
+        return None, dict(sorted(errors.items()))
+
+    with write_transaction():
+        # Look up the (title, category) pairs that already exist, so the
+        # response can tell created and updated rows apart
+        titles = {title for title, _ in seen}
+        existing = set()
+        for batch in batches(titles):
+            existing.update(
+                pair for pair in MenuItem.objects.filter(title__in=batch).values_list("title", "category_id")
+                if pair in seen
+            )
+        MenuItem.objects.bulk_create(
+            [MenuItem(**valid[index]) for index in seen.values()],
+            update_conflicts=True,
+            unique_fields=["title", "category"],
+            update_fields=UPDATE_FIELDS,
+        )
+        # bulk_create sends no post_save signals
+        catalog.bump_version()
+
+    return {"created": len(seen) - len(existing), "updated": len(existing)}, None
@@ -0,0 +1,226 @@
+import bisect
+import hmac
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_started
+from django.db import connections
+from django.http import HttpResponse
+
+# Request metrics for production: per URL name, method and status, a
+# latency histogram, a response size histogram, and the number and time of
+# SQL queries. Every thread records into its own buffer, so the request
+# path takes no locks; /metrics adds the buffers of all threads up when it
+# is scraped. Numbers are per worker process, so scrape each worker.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Positions in a series: the totals, then one count per latency bucket
+# (+Inf last), then one count per size bucket
+COUNT, LATENCY_SUM, QUERIES, QUERY_SECONDS, SIZE_COUNT, SIZE_SUM = range(6)
+LATENCY_COUNTS = 6
+SIZE_COUNTS = LATENCY_COUNTS + len(LATENCY_BUCKETS) + 1
+WIDTH = SIZE_COUNTS + len(SIZE_BUCKETS) + 1
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._local = threading.local()
+        self._buffers = []
+        # Only taken the first time a thread records
+        self._lock = threading.Lock()
+
+    def _buffer(self):
+        try:
+            return self._local.buffer
+        except AttributeError:
+            buffer = self._local.buffer = {}
+            with self._lock:
+                self._buffers.append(buffer)
+            return buffer
+
+    def record(self, route, method, status, seconds, queries, query_seconds, size):
+        buffer = self._buffer()
+        key = (route, method, status)
+        series = buffer.get(key)
+        if series is None:
+            series = buffer[key] = [0] * WIDTH
+        series[COUNT] += 1
+        series[LATENCY_SUM] += seconds
+        series[LATENCY_COUNTS + bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        series[QUERIES] += queries
+        series[QUERY_SECONDS] += query_seconds
+        if size is not None:
+            series[SIZE_COUNT] += 1
+            series[SIZE_SUM] += size
+            series[SIZE_COUNTS + bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+
+    def collect(self):
+        # Sum every thread's series. Copying a dict is atomic, so a thread
+        # adding a series while this runs cannot break the iteration.
+        with self._lock:
+            buffers = list(self._buffers)
+        totals = {}
+        for buffer in buffers:
+            for key, series in buffer.copy().items():
+                total = totals.setdefault(key, [0] * WIDTH)
+                for i, value in enumerate(series):
+                    total[i] += value
+        return totals
+
+    def clear(self):
+        with self._lock:
+            for buffer in self._buffers:
+                buffer.clear()
+
+    def render(self):
+        # Prometheus text exposition format
+        totals = sorted(self.collect().items())
+        lines = []
+
+        def histogram(name, help_text, counts_at, buckets, count_at, sum_at):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, series in totals:
+                labels = _labels(key)
+                cumulative = 0
+                for i, bound in enumerate(buckets + ("+Inf",)):
+                    cumulative += series[counts_at + i]
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {series[sum_at]}")
+                lines.append(f"{name}_count{{{labels}}} {series[count_at]}")
+
+        def counter(name, help_text, at):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, series in totals:
+                lines.append(f"{name}{{{_labels(key)}}} {series[at]}")
+
+        histogram("littlelemon_http_request_duration_seconds", "Time spent handling requests.",
+                  LATENCY_COUNTS, LATENCY_BUCKETS, COUNT, LATENCY_SUM)
+        histogram("littlelemon_http_response_size_bytes", "Size of non-streaming response bodies.",
+                  SIZE_COUNTS, SIZE_BUCKETS, SIZE_COUNT, SIZE_SUM)
+        counter("littlelemon_db_queries_total", "SQL queries run while handling requests.", QUERIES)
+        counter("littlelemon_db_query_duration_seconds_total", "Time spent in SQL queries while handling requests.",
+                QUERY_SECONDS)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key):
+    route, method, status = key
+    return f'route="{_escape(route)}",method="{_escape(method)}",status="{status}"'
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+# The QueryTimer of the current request. Connections are per thread, and
+# under ASGI a request's queries run in sync_to_async threads rather than in
+# the thread of the middleware, so every connection that serves requests
+# gets one permanent wrapper, time_queries(), which hands its queries to
+# the timer in the context; sync_to_async copies the context along.
+_timer = ContextVar("littlelemon_query_timer", default=None)
+
+
+class QueryTimer:
+    # Counts and times the queries of one request
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def time_queries(execute, sql, params, many, context):
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timing(**kwargs):
+    # request_started receiver: it runs in the thread the request's
+    # queries run in, under WSGI and ASGI alike
+    for alias in connections:
+        wrappers = connections[alias].execute_wrappers
+        if time_queries not in wrappers:
+            wrappers.append(time_queries)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "LITTLELEMON_METRICS", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Time the queries of every thread that handles requests, and of this one
+        request_started.connect(install_query_timing, dispatch_uid="littlelemon.install_query_timing")
+        install_query_timing()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer = QueryTimer()
+        token = _timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        token = _timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    def record(self, request, response, seconds, timer):
+        match = request.resolver_match
+        if match is None:
+            route = "unmatched"
+        else:
+            route = match.url_name or match.route
+        size = None if response.streaming else len(response.content)
+        registry.record(route, request.method, response.status_code, seconds, timer.queries, timer.seconds, size)
+
+
+def metrics_view(request):
+    # Prometheus scrape endpoint. The scraper must send
+    # LITTLELEMON_METRICS_TOKEN as a bearer token; without a token the
+    # endpoint is closed unless LITTLELEMON_METRICS_PUBLIC opens it.
+    token = getattr(settings, "LITTLELEMON_METRICS_TOKEN", None)
+    if token:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse(status=401)
+    elif not getattr(settings, "LITTLELEMON_METRICS_PUBLIC", False):
+        return HttpResponse(status=403)
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
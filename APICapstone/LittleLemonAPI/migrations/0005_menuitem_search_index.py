@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# Full-text index over menu items, kept in sync by triggers so that bulk
+# writes are indexed too. Only created on SQLite builds that ship FTS5;
+# elsewhere menu search falls back to DRF's SearchFilter.
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE "LittleLemonAPI_menuitem_fts" USING fts5(title, price, featured, tokenize='unicode61')""",
+    """INSERT INTO "LittleLemonAPI_menuitem_fts" (rowid, title, price, featured)
+       SELECT id, title, printf('%.2f', price), featured FROM "LittleLemonAPI_menuitem\"""",
+    """CREATE TRIGGER "LittleLemonAPI_menuitem_fts_insert" AFTER INSERT ON "LittleLemonAPI_menuitem" BEGIN
+           INSERT INTO "LittleLemonAPI_menuitem_fts" (rowid, title, price, featured)
+           VALUES (new.id, new.title, printf('%.2f', new.price), new.featured);
+       END""",
+    """CREATE TRIGGER "LittleLemonAPI_menuitem_fts_update" AFTER UPDATE ON "LittleLemonAPI_menuitem" BEGIN
+           DELETE FROM "LittleLemonAPI_menuitem_fts" WHERE rowid = old.id;
+           INSERT INTO "LittleLemonAPI_menuitem_fts" (rowid, title, price, featured)
+           VALUES (new.id, new.title, printf('%.2f', new.price), new.featured);
+       END""",
+    """CREATE TRIGGER "LittleLemonAPI_menuitem_fts_delete" AFTER DELETE ON "LittleLemonAPI_menuitem" BEGIN
+           DELETE FROM "LittleLemonAPI_menuitem_fts" WHERE rowid = old.id;
+       END""",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS "LittleLemonAPI_menuitem_fts_insert"',
+    'DROP TRIGGER IF EXISTS "LittleLemonAPI_menuitem_fts_update"',
+    'DROP TRIGGER IF EXISTS "LittleLemonAPI_menuitem_fts_delete"',
+    'DROP TABLE IF EXISTS "LittleLemonAPI_menuitem_fts"',
+]
+
+
+def has_fts5(schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    if has_fts5(schema_editor):
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0004_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Fill the daily sales rollups created empty by 0006 from the orders placed
+# before them, so the reports do not start out blank. Rows written since
+# 0006 are cleared first and rebuilt with the rest, as backfill_sales_rollups
+# does. Plain SQL on the tables as 0006 created them, so later changes to
+# LittleLemonAPI.reports do not change what this migration does.
+CLEAR_SQL = [
+    'DELETE FROM "LittleLemonAPI_dailysales"',
+    'DELETE FROM "LittleLemonAPI_dailymenuitemsales"',
+    'DELETE FROM "LittleLemonAPI_dailycategorysales"',
+]
+
+BACKFILL_SQL = [
+    """INSERT INTO "LittleLemonAPI_dailysales" (date, status, orders, items, revenue)
+       SELECT o.date, o.status, COUNT(*),
+              COALESCE(SUM((SELECT SUM(i.quantity) FROM "LittleLemonAPI_orderitem" i WHERE i.order_id = o.id)), 0),
+              ROUND(SUM(o.total), 2)
+       FROM "LittleLemonAPI_order" o
+       GROUP BY o.date, o.status""",
+    """INSERT INTO "LittleLemonAPI_dailymenuitemsales" (date, status, menuitem_id, quantity, revenue)
+       SELECT o.date, o.status, i.menuitem_id, SUM(i.quantity), ROUND(SUM(i.quantity * i.unit_price), 2)
+       FROM "LittleLemonAPI_orderitem" i JOIN "LittleLemonAPI_order" o ON o.id = i.order_id
+       GROUP BY o.date, o.status, i.menuitem_id""",
+    """INSERT INTO "LittleLemonAPI_dailycategorysales" (date, status, category_id, quantity, revenue)
+       SELECT o.date, o.status, m.category_id, SUM(i.quantity), ROUND(SUM(i.quantity * i.unit_price), 2)
+       FROM "LittleLemonAPI_orderitem" i JOIN "LittleLemonAPI_order" o ON o.id = i.order_id
+            JOIN "LittleLemonAPI_menuitem" m ON m.id = i.menuitem_id
+       GROUP BY o.date, o.status, m.category_id""",
+]
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in CLEAR_SQL + BACKFILL_SQL:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0007_menuitem_category_price_index'),
+    ]
+
+    operations = [
+        # Reversing 0006 drops the tables, so there is nothing to undo here
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
@@ -18,6 +18,10 @@ class MenuItem(models.Model):
     
     class Meta:
         unique_together = ('title', 'category')
+        # The menu filtered by category and ordered by price, found by advise_indexes
+        indexes = [
+            models.Index(fields=['category', 'price']),
+        ]
     
     def __str__(self):
         return self.title
@@ -39,6 +43,13 @@ class Order(models.Model):
     total = models.DecimalField(max_digits=6, decimal_places=2)
     date = models.DateField(db_index=True)
     
+    class Meta:
+        # Keyset pagination walks a user's or crew's orders by (date, id)
+        indexes = [
+            models.Index(fields=['user', 'date', 'id']),
+            models.Index(fields=['delivery_crew', 'date', 'id']),
+        ]
+    
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
@@ -46,4 +57,42 @@ class OrderItem(models.Model):
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
     
     class Meta:
-        unique_together = ('order', 'menuitem')
\ No newline at end of file
+        unique_together = ('order', 'menuitem')
+
+# Daily sales rollups for manager reporting, kept up to date by reports.py
+class DailySales(models.Model):
+    date = models.DateField()
+    status = models.BooleanField()
+    orders = models.IntegerField(default=0)
+    items = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ('date', 'status')
+    
+class DailyMenuItemSales(models.Model):
+    date = models.DateField()
+    status = models.BooleanField()
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE, db_index=False)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ('date', 'status', 'menuitem')
+        # Covers the per menu item report, so it never reads the table itself
+        indexes = [
+            models.Index(fields=['menuitem', 'date', 'status', 'quantity', 'revenue']),
+        ]
+    
+class DailyCategorySales(models.Model):
+    date = models.DateField()
+    status = models.BooleanField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, db_index=False)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ('date', 'status', 'category')
+        indexes = [
+            models.Index(fields=['category', 'date', 'status', 'quantity', 'revenue']),
+        ]
\ No newline at end of file
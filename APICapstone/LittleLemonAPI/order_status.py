@@ -0,0 +1,47 @@
+from .models import Order
+from .reports import add_orders, remove_orders
+from .roles import get_roles
+from .writes import write_transaction
+
+# Batch order status changes. The role rules of OrderViewSet.get_queryset
+# go into the WHERE clause, so a delivery crew member can only touch their
+# own orders, and every changed order is written by one UPDATE. Orders are
+# moved between sales rollup rows in the same transaction.
+MAX_ORDERS = 1000
+
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+NOT_FOUND = "not_found"
+
+
+def visible_orders(user):
+    # The orders a user may change the status of
+    roles = get_roles(user)
+    if roles.can_manage:
+        return Order.objects.all()
+    if roles.is_delivery_crew:
+        return Order.objects.filter(delivery_crew=user)
+    return Order.objects.none()
+
+
+def set_status(user, order_ids, status):
+    # Returns {order_id: UPDATED | UNCHANGED | NOT_FOUND}. Orders the user
+    # may not see are reported as not found, like a single PATCH would.
+    orders = visible_orders(user).filter(id__in=order_ids)
+    with write_transaction():
+        current = dict(orders.select_for_update().values_list("id", "status"))
+        changed = [order_id for order_id, order_status in current.items() if order_status != status]
+        if changed:
+            remove_orders(changed)
+            orders.filter(id__in=changed).update(status=status)
+            add_orders(changed)
+
+    results = {}
+    for order_id in order_ids:
+        if order_id not in current:
+            results[order_id] = NOT_FOUND
+        elif current[order_id] != status:
+            results[order_id] = UPDATED
+        else:
+            results[order_id] = UNCHANGED
+    return results
@@ -0,0 +1,206 @@
+import base64
+import hashlib
+import json
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_TIMEOUT = 60
+
+
+class KeysetPagination(BasePagination):
+    # Keyset (cursor) pagination on (ordering field, id). Clients opt in by
+    # sending a cursor param (empty for the first page); without one the
+    # regular page number pagination is used, so existing clients keep
+    # getting count/next/previous pages. Every keyset page is an indexed
+    # range scan, so page N costs the same as page 1. Counts are only run
+    # when asked for with count=true, and are cached for a minute.
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+    max_page_size = 100
+
+    def __init__(self):
+        self.page_number_pagination = PageNumberPagination()
+        self.page_number_pagination.page_size_query_param = self.page_size_query_param
+        self.page_number_pagination.max_page_size = self.max_page_size
+        self.keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return self.page_number_pagination.paginate_queryset(queryset, request, view)
+
+        page_queryset, position, reverse = self.keyset_queryset(queryset, request, view)
+        self.count = self.get_count(queryset) if self.count_requested(request) else None
+        return self.keyset_page(list(page_queryset), position, reverse)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Same as paginate_queryset, using the async ORM
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return await apaginate_page_number(self.page_number_pagination, queryset, request, view)
+
+        page_queryset, position, reverse = self.keyset_queryset(queryset, request, view)
+        self.count = await self.aget_count(queryset) if self.count_requested(request) else None
+        return self.keyset_page([row async for row in page_queryset], position, reverse)
+
+    def keyset_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.page_number_pagination.get_page_size(request)
+        self.ordering = self.get_ordering(request, view)
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = [_flip(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        # Fetch one extra row to know whether there is another page
+        return queryset[:self.page_size + 1], position, reverse
+
+    def keyset_page(self, rows, position, reverse):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = self.position(rows[-1])
+            if position is not None and (has_more or not reverse):
+                self.previous_position = self.position(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return self.page_number_pagination.get_paginated_response(data)
+        response = {}
+        if self.count is not None:
+            response["count"] = self.count
+        response["next"] = self.encode_link(self.next_position, False)
+        response["previous"] = self.encode_link(self.previous_position, True)
+        response["results"] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_pagination.get_paginated_response_schema(schema)
+
+    def get_ordering(self, request, view):
+        # Use the ?ordering= field when the view allows it, with id as the
+        # tiebreaker; otherwise fall back to the view's keyset_ordering
+        ordering = request.query_params.get("ordering", "")
+        allowed = getattr(view, "ordering_fields", None) or []
+        if ordering.lstrip("-") in allowed:
+            return [ordering, "-id" if ordering.startswith("-") else "id"]
+        return list(getattr(view, "keyset_ordering", ["id"]))
+
+    def after(self, ordering, position):
+        # Rows strictly after position in the given ordering. Two column
+        # keys are written as a >= x AND (a > x OR id > y) so the leading
+        # column stays sargable.
+        lookups = [
+            (field.lstrip("-"), "lt" if field.startswith("-") else "gt", value)
+            for field, value in zip(ordering, position)
+        ]
+        if len(lookups) == 1:
+            name, op, value = lookups[0]
+            return Q(**{f"{name}__{op}": value})
+        (name, op, value), (tiebreak, tiebreak_op, last_id) = lookups
+        return Q(**{f"{name}__{op}e": value}) & (
+            Q(**{f"{name}__{op}": value}) | Q(**{f"{tiebreak}__{tiebreak_op}": last_id})
+        )
+
+    def position(self, row):
+        return [getattr(row, field.lstrip("-")) for field in self.ordering]
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param, "").lower() in ("1", "true", "exact")
+
+    def count_key(self, queryset):
+        return "littlelemon:count:" + hashlib.sha1(str(queryset.query).encode()).hexdigest()
+
+    def get_count(self, queryset):
+        # Exact counts are opt-in and cached per filtered query
+        key = self.count_key(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, COUNT_TIMEOUT)
+        return count
+
+    async def aget_count(self, queryset):
+        key = self.count_key(queryset)
+        count = await cache.aget(key)
+        if count is None:
+            count = await queryset.acount()
+            await cache.aset(key, count, COUNT_TIMEOUT)
+        return count
+
+    def encode_link(self, position, reverse):
+        if position is None:
+            return None
+        cursor = encode_cursor(self.ordering, position, reverse)
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.cursor_query_param, cursor)
+        return remove_query_param(url, self.count_query_param)
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if payload["o"] != self.ordering:
+                raise ValueError("cursor ordering does not match")
+            fields = [model._meta.get_field(field.lstrip("-")) for field in self.ordering]
+            if len(payload["p"]) != len(fields):
+                raise ValueError("cursor position does not match")
+            position = [field.to_python(value) for field, value in zip(fields, payload["p"])]
+        except (TypeError, ValueError, KeyError, LookupError, ValidationError):
+            raise NotFound("Invalid cursor")
+        return position, bool(payload.get("r"))
+
+
+async def apaginate_page_number(pagination, queryset, request, view=None):
+    # PageNumberPagination.paginate_queryset using the async ORM. The count
+    # is run up front so the Django paginator never queries by itself.
+    pagination.request = request
+    page_size = pagination.get_page_size(request)
+    if not page_size:
+        return None
+
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    paginator.count = await queryset.acount()
+    page_number = pagination.get_page_number(request, paginator)
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+    pagination.page.object_list = [row async for row in pagination.page.object_list]
+    return list(pagination.page)
+
+
+def encode_cursor(ordering, position, reverse=False):
+    payload = {"p": [_dump(value) for value in position], "o": list(ordering)}
+    if reverse:
+        payload["r"] = 1
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else "-" + field
+
+
+def _dump(value):
+    # Dates and decimals go into the cursor as strings
+    if isinstance(value, (int, str)):
+        return value
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
@@ -1,36 +1,31 @@
 from rest_framework.permissions import BasePermission
+from .roles import get_roles
 
 class MenuItemPermissions(BasePermission):
     def has_permission(self, request, view):
         if request.method in ("GET", "HEAD", "OPTIONS"):
             return True
         elif request.method in ("POST", "PUT", "PATCH", "DELETE"):
-            return request.user.is_superuser or request.user.groups.filter(name="Manager").exists()
+            return get_roles(request.user).can_manage
         else:
             return False
             
 class ManagerPermissions(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_superuser or request.user.groups.filter(name="Manager").exists()
+        return get_roles(request.user).can_manage
     
 class CartPermissions(BasePermission):
     def has_permission(self, request, view):
-        return len(request.user.groups.all()) == 0
+        return not get_roles(request.user).in_any_group
 
 class OrderPermissions(BasePermission):
     def has_permission(self, request, view):
+        roles = get_roles(request.user)
         if request.method == 'POST':
-            return not request.user.is_superuser and not request.user.groups.exists()
+            return not roles.is_superuser and not roles.in_any_group
         elif request.method in ('DELETE', 'PUT'):
-            return request.user.is_superuser or request.user.groups.filter(name="Manager").exists()
+            return roles.can_manage
         elif request.method == 'PATCH':
-            return request.user.is_superuser or request.user.groups.exists()
+            return roles.is_superuser or roles.in_any_group
         else:
             return request.user.is_authenticated
-            
-        
-    
-                    
-                
-    
-            
@@ -0,0 +1,131 @@
+import re
+import time
+from dataclasses import dataclass, field
+from django.db import transaction
+
+# Query shapes and SQLite query plans, for the advise_indexes command.
+#
+# QueryRecorder is an execute_wrapper that groups the queries it sees by
+# shape: the SQL with its placeholders, IN lists of any length counted as
+# one. Each shape keeps one set of params, so it can be explained and
+# timed again later. The plans come from EXPLAIN QUERY PLAN, so this is
+# SQLite only.
+IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+EXPLAINED = ("SELECT", "UPDATE", "DELETE")
+
+# EXPLAIN QUERY PLAN details: "SCAN t" reads every row of t, "SCAN t USING
+# (COVERING) INDEX i" every entry of i, and a temp b-tree sorts the rows.
+# Virtual tables (full text search) and SQLite's own tables are left out.
+SCAN = re.compile(r"^SCAN (?:TABLE )?(?!sqlite_)(\S+)(?: USING (?:COVERING )?INDEX (\S+))?$")
+TEMP_BTREE = re.compile(r"^USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)")
+TABLE = re.compile(r"^(?:SCAN|SEARCH) (?:TABLE )?(\S+)")
+
+
+@dataclass
+class Shape:
+    sql: str
+    params: tuple
+    count: int = 0
+    seconds: float = 0.0
+    routes: set = field(default_factory=set)
+
+
+class QueryRecorder:
+    # execute_wrapper recording the shape, count and time of every query.
+    # Set route to tag the queries of what runs next.
+
+    def __init__(self):
+        self.shapes = {}
+        self.route = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many:
+                self.record(sql, params, time.perf_counter() - start)
+
+    def record(self, sql, params, seconds):
+        key = IN_LIST.sub("IN (...)", sql)
+        shape = self.shapes.get(key)
+        if shape is None:
+            shape = self.shapes[key] = Shape(sql, tuple(params or ()))
+        shape.count += 1
+        shape.seconds += seconds
+        if self.route is not None:
+            shape.routes.add(self.route)
+
+
+def explain(connection, sql, params):
+    # The detail column of EXPLAIN QUERY PLAN, one line per step
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[3] for row in cursor.fetchall()]
+
+
+def problems(plan):
+    # (kind, table) for every full scan of a plan, and (kind, None) for
+    # every temp b-tree sort, which may come from any table of the join
+    found = []
+    for detail in plan:
+        scan = SCAN.match(detail)
+        sort = TEMP_BTREE.match(detail)
+        if scan:
+            found.append(("full index scan" if scan.group(2) else "full table scan", scan.group(1)))
+        elif sort:
+            found.append((f"sort for {sort.group(1)}", None))
+    return found
+
+
+def plan_tables(plan):
+    # The tables a plan reads, in join order
+    return [match.group(1) for match in map(TABLE.match, plan) if match]
+
+
+def best_time(connection, sql, params, repeat=5):
+    # Best of repeat runs, in seconds. Writes are rolled back.
+    best = None
+    for _ in range(repeat):
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                start = time.perf_counter()
+                cursor.execute(sql, params)
+                if sql.lstrip().upper().startswith("SELECT"):
+                    cursor.fetchall()
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True, using=connection.alias)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def candidate_columns(sql, table):
+    # Columns of table worth a composite index for this query: those the
+    # WHERE clause compares for equality (or tests as booleans), then
+    # either the first range comparison or the ORDER BY columns
+    column = r'"%s"\."(\w+)"' % re.escape(table)
+    where, order_by = _clauses(sql)
+    equality, ranges = [], []
+    for match in re.finditer(r"(?:NOT )?%s\s*(=|IN\b|IS\b|>=|<=|>|<|BETWEEN\b)?" % column, where):
+        name, operator = match.group(1), match.group(2)
+        if operator in (None, "=", "IN", "IS"):
+            equality.append(name)
+        else:
+            ranges.append(name)
+    ordering = re.findall(column, order_by)
+
+    columns = []
+    for name in equality + (ranges[:1] or ordering):
+        if name not in columns:
+            columns.append(name)
+    return columns
+
+
+def _clauses(sql):
+    # The WHERE and ORDER BY text of the outermost query, roughly
+    sql = sql.split(" LIMIT ", 1)[0]
+    order_by = ""
+    if " ORDER BY " in sql:
+        sql, order_by = sql.rsplit(" ORDER BY ", 1)
+    where = sql.split(" WHERE ", 1)[1] if " WHERE " in sql else ""
+    return where.split(" GROUP BY ", 1)[0], order_by
@@ -0,0 +1,183 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+# Faster renderers for the API. orjson and msgpack are optional: without
+# orjson, FastJSONRenderer renders with the stdlib like JSONRenderer, and
+# MessagePackRenderer is only registered in settings when msgpack is
+# installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Lists with at least this many rows are streamed out STREAM_CHUNK_SIZE rows
+# at a time instead of being encoded into one bytes object
+STREAM_THRESHOLD = 1000
+STREAM_CHUNK_SIZE = 200
+
+_default = JSONEncoder().default
+
+if orjson is not None:
+    # Dates and times go through JSONEncoder too, so they are formatted the
+    # same way (e.g. "Z" for UTC)
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def _escape_separators(content):
+    # JSONRenderer escapes U+2028 and U+2029 so the output is valid JavaScript
+    if b"\xe2\x80" in content:
+        content = content.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+    return content
+
+
+def _rows(data):
+    # The list a response carries, directly or as the page of a paginator
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        return data["results"]
+    return None
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Byte for byte the output of JSONRenderer, encoded with orjson. Decimals,
+    # lazy strings and anything else orjson does not know go through DRF's
+    # JSONEncoder.default. Indented output (the browsable API) and
+    # non-default JSON settings use the stdlib.
+
+    def fast(self, accepted_media_type, renderer_context):
+        return (
+            orjson is not None and self.compact and not self.ensure_ascii
+            and not self.get_indent(accepted_media_type or "", renderer_context or {})
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.fast(accepted_media_type, renderer_context):
+            return self.dumps(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def dumps(self, data):
+        try:
+            return _escape_separators(orjson.dumps(data, default=_default, option=OPTIONS))
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits
+            return super().render(data)
+
+    def render_iter(self, data, accepted_media_type=None, renderer_context=None):
+        # The same bytes as render(), a chunk of rows at a time
+        if not self.fast(accepted_media_type, renderer_context):
+            yield self.render(data, accepted_media_type, renderer_context)
+            return
+        if isinstance(data, list):
+            yield from self.iter_list(data)
+            return
+        yield b"{"
+        for i, (key, value) in enumerate(data.items()):
+            yield (b"," if i else b"") + self.dumps(str(key)) + b":"
+            if key == "results":
+                yield from self.iter_list(value)
+            else:
+                yield self.dumps(value)
+        yield b"}"
+
+    def iter_list(self, rows):
+        yield b"["
+        for start in range(0, len(rows), STREAM_CHUNK_SIZE):
+            yield (b"," if start else b"") + self.dumps(rows[start:start + STREAM_CHUNK_SIZE])[1:-1]
+        yield b"]"
+
+
+class MessagePackRenderer(BaseRenderer):
+    # MessagePack for the POS terminals, with the same structure as the JSON
+    # output: decimals, dates and the like are sent as the same strings.
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def packer(self):
+        return msgpack.Packer(default=_default, use_bin_type=True)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return self.packer().pack(data)
+
+    def render_iter(self, data, accepted_media_type=None, renderer_context=None):
+        packer = self.packer()
+        if isinstance(data, list):
+            yield from self.iter_list(packer, data)
+            return
+        yield packer.pack_map_header(len(data))
+        for key, value in data.items():
+            yield packer.pack(key)
+            if key == "results":
+                yield from self.iter_list(packer, value)
+            else:
+                yield packer.pack(value)
+
+    def iter_list(self, packer, rows):
+        yield packer.pack_array_header(len(rows))
+        for start in range(0, len(rows), STREAM_CHUNK_SIZE):
+            yield b"".join(packer.pack(row) for row in rows[start:start + STREAM_CHUNK_SIZE])
+
+
+def streaming_content(request, chunks):
+    # The iterator to give StreamingHttpResponse. Under ASGI it reads a sync
+    # iterator with sync_to_async(list), building the whole body before the
+    # first byte goes out, so there the chunks are pulled one
+    # sync_to_async call at a time by an async iterator instead.
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        return _aiter_chunks(iter(chunks))
+    return chunks
+
+
+_END = object()
+
+
+async def _aiter_chunks(chunks):
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, _END)) is not _END:
+        yield chunk
+
+
+class StreamingListMixin:
+    # Stream large list responses through the renderer's render_iter(), so
+    # the encoded body is never held in memory next to the rows. Smaller
+    # responses, errors and renderers without render_iter() are unchanged.
+    # Only for unpaginated lists, such as the sales reports: a page is at
+    # most KeysetPagination.max_page_size rows, far below STREAM_THRESHOLD.
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not isinstance(response, Response) or response.exception or response.status_code not in (200, 201):
+            return response
+        renderer = getattr(response, "accepted_renderer", None)
+        rows = _rows(response.data)
+        if rows is None or len(rows) < STREAM_THRESHOLD or not hasattr(renderer, "render_iter"):
+            return response
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        streaming = StreamingHttpResponse(
+            streaming_content(request, renderer.render_iter(
+                response.data, response.accepted_media_type, response.renderer_context)),
+            status=response.status_code,
+            content_type=content_type,
+        )
+        for header, value in response.items():
+            if header.lower() != "content-type":
+                streaming[header] = value
+        return streaming
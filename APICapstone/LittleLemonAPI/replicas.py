@@ -0,0 +1,121 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+# Read replicas for the LittleLemonAPI models. Every write, and by default
+# every read, goes to the primary ("default"). The read-only endpoints list
+# their actions in ReplicaReadsMixin.replica_actions; while one of them
+# runs, ReplicaRouter sends the LittleLemonAPI reads of the request to one
+# replica picked from LITTLELEMON_READ_REPLICAS.
+#
+# A user whose last unsafe request (a cart change, an order, ...) was less
+# than LITTLELEMON_REPLICA_STICKY_SECONDS ago reads from the primary, so
+# they see their own writes however far the replicas lag behind. The marks
+# live in the "shared" cache, so every worker process sees them.
+APP_LABEL = "LittleLemonAPI"
+
+# The replica the current request reads from, or None for the primary
+_replica = ContextVar("littlelemon_replica", default=None)
+
+
+def get_replicas():
+    return getattr(settings, "LITTLELEMON_READ_REPLICAS", [])
+
+
+def sticky_seconds():
+    return getattr(settings, "LITTLELEMON_REPLICA_STICKY_SECONDS", 5)
+
+
+def current_replica():
+    return _replica.get()
+
+
+def _sticky_key(user):
+    return f"littlelemon:replica-sticky:{user.pk}"
+
+
+def mark_written(user):
+    # Read this user's requests from the primary for a while
+    if get_replicas() and user.is_authenticated:
+        caches["shared"].set(_sticky_key(user), True, sticky_seconds())
+
+
+def is_sticky(user):
+    return user.is_authenticated and caches["shared"].get(_sticky_key(user)) is not None
+
+
+@contextmanager
+def replica_scope():
+    # Reads start on the primary, and read_from_replica() only lasts until
+    # the end of the block
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def read_from_replica(user):
+    # Send the rest of the current request's reads to a replica, unless
+    # there are none or the user has just written. Returns the alias.
+    replicas = get_replicas()
+    if replicas and not is_sticky(user):
+        _replica.set(random.choice(replicas))
+    return _replica.get()
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == APP_LABEL:
+            return _replica.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Never write through an instance that was read from a replica
+        if model._meta.app_label == APP_LABEL:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaReadsMixin:
+    # Reads of the actions in replica_actions may go to a replica. Any
+    # successful unsafe request makes the user read from the primary for
+    # the next LITTLELEMON_REPLICA_STICKY_SECONDS.
+    replica_actions = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_scope():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.use_replica(request)
+
+    def use_replica(self, request):
+        # Called once the user is authenticated and allowed in
+        if self.action in self.replica_actions and request.method in SAFE_METHODS:
+            read_from_replica(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            mark_written(request.user)
+        return response
@@ -0,0 +1,165 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from .models import Category, MenuItem, Order, OrderItem, DailySales, DailyMenuItemSales, DailyCategorySales
+
+# Daily sales rollups: orders, items and revenue per day and status, and
+# quantity and revenue per day, status and menu item or category. Each
+# change is applied as a grouped INSERT ... SELECT ... ON CONFLICT DO UPDATE
+# that adds the affected orders' figures to the rollup rows (or takes them
+# away, with sign -1), so recording one order and rebuilding a year of them
+# run the same three statements. Orders are kept up to date by checkout
+# and the order views, and the cascades of menu item and user deletes by
+# the receivers at the end. Migration 0008 fills the rollups from the
+# orders placed before they existed; backfill_sales_rollups rebuilds
+# everything, e.g. after orders were changed in the admin.
+
+# Order ids per statement, well under SQLite's limit on query parameters
+MAX_ORDER_IDS = 10000
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def rollup_statements(where, sign):
+    order, item, menuitem = _table(Order), _table(OrderItem), _table(MenuItem)
+    return [
+        f"""
+        INSERT INTO {_table(DailySales)} (date, status, orders, items, revenue)
+        SELECT o.date, o.status, {sign:d} * COUNT(*),
+               {sign:d} * COALESCE(SUM((SELECT SUM(i.quantity) FROM {item} i WHERE i.order_id = o.id)), 0),
+               {sign:d} * SUM(o.total)
+        FROM {order} o
+        WHERE {where}
+        GROUP BY o.date, o.status
+        ON CONFLICT (date, status) DO UPDATE SET
+            orders = orders + excluded.orders,
+            items = items + excluded.items,
+            revenue = ROUND(revenue + excluded.revenue, 2)
+        """,
+        f"""
+        INSERT INTO {_table(DailyMenuItemSales)} (date, status, menuitem_id, quantity, revenue)
+        SELECT o.date, o.status, i.menuitem_id, {sign:d} * SUM(i.quantity), {sign:d} * SUM(i.quantity * i.unit_price)
+        FROM {item} i JOIN {order} o ON o.id = i.order_id
+        WHERE {where}
+        GROUP BY o.date, o.status, i.menuitem_id
+        ON CONFLICT (date, status, menuitem_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            revenue = ROUND(revenue + excluded.revenue, 2)
+        """,
+        f"""
+        INSERT INTO {_table(DailyCategorySales)} (date, status, category_id, quantity, revenue)
+        SELECT o.date, o.status, m.category_id, {sign:d} * SUM(i.quantity), {sign:d} * SUM(i.quantity * i.unit_price)
+        FROM {item} i JOIN {order} o ON o.id = i.order_id JOIN {menuitem} m ON m.id = i.menuitem_id
+        WHERE {where}
+        GROUP BY o.date, o.status, m.category_id
+        ON CONFLICT (date, status, category_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            revenue = ROUND(revenue + excluded.revenue, 2)
+        """,
+    ]
+
+
+def _apply(where, params, sign):
+    with connection.cursor() as cursor:
+        for sql in rollup_statements(where, sign):
+            cursor.execute(sql, params)
+
+
+def add_orders(order_ids, sign=1):
+    # Add the given orders to the rollups, as they are now
+    order_ids = list(order_ids)
+    for start in range(0, len(order_ids), MAX_ORDER_IDS):
+        batch = order_ids[start:start + MAX_ORDER_IDS]
+        _apply(f"o.id IN ({', '.join(['%s'] * len(batch))})", batch, sign)
+
+
+def remove_orders(order_ids):
+    # Take the given orders out of the rollups, as they are now
+    add_orders(order_ids, sign=-1)
+
+
+def add_order_range(first_id, last_id):
+    _apply("o.id >= %s AND o.id <= %s", [first_id, last_id], 1)
+
+
+def clear_rollups():
+    for model in (DailySales, DailyMenuItemSales, DailyCategorySales):
+        model.objects.all().delete()
+
+
+def _report(queryset, date_from=None, date_to=None, status=None):
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    if status is not None:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def daily_sales(**filters):
+    return list(
+        _report(DailySales.objects.filter(orders__gt=0), **filters)
+        .values("date")
+        .annotate(orders=Sum("orders"), items=Sum("items"), revenue=Sum("revenue"))
+        .order_by("date")
+    )
+
+
+def _ranked(queryset, key, model, filters):
+    # Group on the covering index alone, then look up the titles of the
+    # groups in one query instead of joining every rollup row
+    rows = list(
+        _report(queryset, **filters)
+        .values(key)
+        .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .filter(quantity__gt=0)
+        .order_by("-revenue", key)
+    )
+    titles = dict(model.objects.filter(pk__in=[row[key] for row in rows]).values_list("pk", "title"))
+    for row in rows:
+        row["title"] = titles[row[key]]
+    return rows
+
+
+def menu_item_sales(**filters):
+    return _ranked(DailyMenuItemSales.objects.all(), "menuitem_id", MenuItem, filters)
+
+
+def category_sales(**filters):
+    return _ranked(DailyCategorySales.objects.all(), "category_id", Category, filters)
+
+
+def totals(rows, fields):
+    return {field: sum(row[field] for row in rows) for field in fields}
+
+
+# Deleting a menu item deletes its order items, and deleting a user deletes
+# their orders. The deletes run in one transaction with these receivers.
+@receiver(pre_delete, sender=MenuItem)
+def remove_menu_item_orders(sender, instance, origin=None, **kwargs):
+    # Take the orders that lose a line out of the rollups while the line
+    # still exists; they are added back without it once it is deleted. A
+    # bulk delete sends this for every item first, so an order holding
+    # several of the items is only taken out, and added back, once: the
+    # orders already taken out are kept on the delete's origin.
+    origin = instance if origin is None else origin
+    removed = origin.__dict__.setdefault("_rollup_removed_order_ids", set())
+    order_ids = set(OrderItem.objects.filter(menuitem=instance).values_list("order_id", flat=True)) - removed
+    removed |= order_ids
+    instance._rollup_order_ids = sorted(order_ids)
+    remove_orders(instance._rollup_order_ids)
+
+
+@receiver(post_delete, sender=MenuItem)
+def add_menu_item_orders(sender, instance, **kwargs):
+    add_orders(getattr(instance, "_rollup_order_ids", []))
+
+
+@receiver(pre_delete, sender=User)
+def remove_user_orders(sender, instance, **kwargs):
+    _apply("o.user_id = %s", [instance.pk], -1)
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+MANAGER = "Manager"
+DELIVERY_CREW = "Delivery Crew"
+
+# Bounded, TTL'd cache of group names per user id. Membership changes made
+# through the API (or anywhere else that touches user.groups) invalidate the
+# entry in this process; the TTL bounds how stale other processes can be.
+ROLE_CACHE_SIZE = getattr(settings, "LITTLELEMON_ROLE_CACHE_SIZE", 10000)
+ROLE_CACHE_TTL = getattr(settings, "LITTLELEMON_ROLE_CACHE_TTL", 60)
+
+
+class Roles:
+    # The roles a user has: superuser, manager, delivery crew or customer
+    __slots__ = ("is_superuser", "groups")
+
+    def __init__(self, is_superuser, groups):
+        self.is_superuser = is_superuser
+        self.groups = frozenset(groups)
+
+    @property
+    def is_manager(self):
+        return MANAGER in self.groups
+
+    @property
+    def is_delivery_crew(self):
+        return DELIVERY_CREW in self.groups
+
+    @property
+    def in_any_group(self):
+        return bool(self.groups)
+
+    @property
+    def is_customer(self):
+        # Customers are users that are not in any group
+        return not self.groups
+
+    @property
+    def can_manage(self):
+        return self.is_superuser or self.is_manager
+
+
+class RoleCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            groups, expires = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return groups
+
+    def set(self, user_id, groups):
+        with self._lock:
+            self._entries[user_id] = (groups, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+role_cache = RoleCache(ROLE_CACHE_SIZE, ROLE_CACHE_TTL)
+
+
+def get_roles(user):
+    # Work out a user's roles once per request. The result is kept on the
+    # user object (which lives for one request) and in the process cache.
+    roles = getattr(user, "_littlelemon_roles", None)
+    if roles is not None:
+        return roles
+
+    if not user.is_authenticated:
+        roles = Roles(False, ())
+    else:
+        groups = role_cache.get(user.pk)
+        if groups is None:
+            groups = frozenset(user.groups.values_list("name", flat=True))
+            role_cache.set(user.pk, groups)
+        roles = Roles(user.is_superuser, groups)
+
+    user._littlelemon_roles = roles
+    return roles
+
+
+async def aget_roles(user):
+    # get_roles for the async views, using the async ORM on a cache miss
+    roles = getattr(user, "_littlelemon_roles", None)
+    if roles is not None:
+        return roles
+
+    if not user.is_authenticated:
+        roles = Roles(False, ())
+    else:
+        groups = role_cache.get(user.pk)
+        if groups is None:
+            groups = frozenset([name async for name in user.groups.values_list("name", flat=True)])
+            role_cache.set(user.pk, groups)
+        roles = Roles(user.is_superuser, groups)
+
+    user._littlelemon_roles = roles
+    return roles
+
+
+def invalidate_roles(user):
+    # Forget the cached roles of a user after their groups change
+    role_cache.invalidate(user.pk)
+    user.__dict__.pop("_littlelemon_roles", None)
+
+
+# Group rows never change name at runtime, so look each one up only once
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name):
+    group = _groups.get(name)
+    if group is None:
+        group = Group.objects.get(name=name)
+        with _groups_lock:
+            _groups[name] = group
+    return group
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        # user.groups.add/remove/clear
+        role_cache.invalidate(instance.pk)
+    elif pk_set:
+        # group.user_set.add/remove
+        for user_id in pk_set:
+            role_cache.invalidate(user_id)
+    else:
+        # group.user_set.clear() does not say which users were affected
+        role_cache.clear()
+
+
+@receiver([post_save, post_delete], sender=Group)
+def _group_changed(sender, **kwargs):
+    with _groups_lock:
+        _groups.clear()
+    role_cache.clear()
@@ -0,0 +1,53 @@
+from django.db import connection
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+FTS_TABLE = "LittleLemonAPI_menuitem_fts"
+MENUITEM_TABLE = "LittleLemonAPI_menuitem"
+
+_available = None
+
+
+def search_index_available():
+    # The FTS5 index only exists on SQLite builds that support it, see
+    # migration 0005. Look it up once per process.
+    global _available
+    if _available is None:
+        _available = FTS_TABLE in connection.introspection.table_names(include_views=False)
+    return _available
+
+
+def match_expression(terms):
+    # Every term has to match, as a prefix of a word in the title, price
+    # or featured columns. Terms are quoted so user input is never parsed
+    # as FTS5 query syntax.
+    return " AND ".join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+class MenuItemSearchFilter(SearchFilter):
+    # ?search= for menu items, backed by the FTS5 index instead of
+    # icontains scans. Results are ranked by bm25 unless the client asks
+    # for an explicit ?ordering=. Falls back to SearchFilter over
+    # search_fields when the index is not available, and when it has no
+    # hits: the index only matches word prefixes, so ?search=urger needs
+    # the substring match to find the burgers.
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not search_index_available():
+            return super().filter_queryset(request, queryset, view)
+
+        # Join the index on rowid = id; the MATCH drives the query, so no
+        # menu item rows are scanned
+        expression = match_expression(terms)
+        matches = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'"{FTS_TABLE}".rowid = "{MENUITEM_TABLE}"."id"', f'"{FTS_TABLE}" MATCH %s'],
+            params=[expression],
+            select={"search_rank": f'"{FTS_TABLE}".rank'},
+        )
+        if not matches.exists():
+            return super().filter_queryset(request, queryset, view)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return matches
+        return matches.order_by("search_rank", "id")
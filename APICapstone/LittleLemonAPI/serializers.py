@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import Category, MenuItem, Cart, Order, OrderItem
+from .order_status import MAX_ORDERS
+from .compiled import CompiledListSerializer
 from rest_framework.validators import UniqueTogetherValidator
 from django.contrib.auth.models import User
 
@@ -20,6 +22,7 @@ class MenuItemSerializer (serializers.ModelSerializer):
     class Meta:
         model = MenuItem
         fields = ['id',  'title', 'price', 'featured', 'category', 'category_id']
+        list_serializer_class = CompiledListSerializer
         extra_kwargs = {
             'price': {'min_value': 0},
         }
@@ -30,6 +33,14 @@ class MenuItemSerializer (serializers.ModelSerializer):
                 message="This category already has an item with that title."
             )
         ]
+
+class MenuItemImportSerializer(serializers.Serializer):
+    # One row of a bulk menu import. Categories and (title, category)
+    # uniqueness are checked for the whole batch at once in menu_import.py
+    title = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0)
+    featured = serializers.BooleanField()
+    category_id = serializers.IntegerField()
         
 class UserSerializer(serializers.ModelSerializer):
     user_id = serializers.PrimaryKeyRelatedField(
@@ -39,12 +50,13 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['user_id', 'username', 'first_name', 'last_name', 'email', 'groups']
+        list_serializer_class = CompiledListSerializer
         read_only_fields = ["username", "first_name", "last_name", 'email', 'groups']
         
 class CartSerializer (serializers.ModelSerializer):
     
     menuitem_id = serializers.PrimaryKeyRelatedField(
-        queryset = MenuItem.objects.all(),
+        queryset = MenuItem.objects.select_related("category"),
         source="menuitem",            # ensures we get
         write_only=True
     )
@@ -54,17 +66,31 @@ class CartSerializer (serializers.ModelSerializer):
     class Meta:
         model = Cart
         fields = ['user','menuitem_id', 'menuitem', 'quantity', 'unit_price', 'price']
+        list_serializer_class = CompiledListSerializer
         read_only_fields = ['unit_price', 'price']
         extra_kwargs = {
             'quantity': {'min_value': 1},
         }
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Cart.objects.all(),
-                fields=['menuitem_id', 'user'],
-                message='This item is already in your cart.'
-            )
-        ]       
+
+class CartLineSerializer(serializers.Serializer):
+    # A line to add to the cart. Menu items are looked up for the whole
+    # request at once in cart.py, and adding an item that is already in
+    # the cart adds to its quantity.
+    menuitem_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=32767)
+
+class CartCategorySummarySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    items = serializers.IntegerField()
+    lines = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class CartSummarySerializer(serializers.Serializer):
+    items = serializers.IntegerField()
+    lines = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+    categories = CartCategorySummarySerializer(many=True)
 
 class OrderItemSerializer(serializers.ModelSerializer):
     menuitem = MenuItemSerializer(read_only=True)
@@ -72,6 +98,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ["menuitem", "quantity", "unit_price"]
+        list_serializer_class = CompiledListSerializer
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -90,6 +117,7 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ["id", "user", "delivery_crew", "delivery_crew_id", "status", "total", "date", "items"]
+        list_serializer_class = CompiledListSerializer
         read_only_fields = ["user", "total", "delivery_crew", "status", "date", "items"]
 
 class ManagerOrderSerializer(serializers.ModelSerializer):
@@ -110,6 +138,7 @@ class ManagerOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ["id", "user_id", "user", "delivery_crew_id", "status", "total", "date", "items"]
+        list_serializer_class = CompiledListSerializer
         read_only_fields = ["user_id", "user", "total", "date", "items"]
         
     def validate(self, attrs):
@@ -121,6 +150,54 @@ class ManagerOrderSerializer(serializers.ModelSerializer):
             )
         return attrs
         
+class OrderExportSerializer(serializers.Serializer):
+    
+    # Query params accepted by the order export
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.BooleanField(required=False, allow_null=True)
+    delivery_crew_id = serializers.IntegerField(required=False)
+    unassigned = serializers.BooleanField(required=False, allow_null=True)
+        
+class OrderAssignmentSerializer(serializers.Serializer):
+    
+    # Body accepted by the bulk delivery crew assignment
+    delivery_crew_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    limit = serializers.IntegerField(required=False, min_value=1)
+        
+class OrderStatusBatchSerializer(serializers.Serializer):
+    
+    # Body accepted by the batch status change
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=MAX_ORDERS)
+    status = serializers.BooleanField()
+        
+class SalesReportSerializer(serializers.Serializer):
+    
+    # Query params accepted by the sales reports
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+class DailySalesTotalsSerializer(serializers.Serializer):
+    orders = serializers.IntegerField()
+    items = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class DailySalesSerializer(DailySalesTotalsSerializer):
+    date = serializers.DateField()
+
+class SalesTotalsSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class MenuItemSalesSerializer(SalesTotalsSerializer):
+    menuitem_id = serializers.IntegerField()
+    title = serializers.CharField()
+
+class CategorySalesSerializer(SalesTotalsSerializer):
+    category_id = serializers.IntegerField()
+    title = serializers.CharField()
+        
 class DeliveryCrewOrderSerializer(serializers.ModelSerializer):
     
     user = serializers.SlugRelatedField(read_only=True, slug_field="username")
@@ -134,6 +211,7 @@ class DeliveryCrewOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ["id", "user_id", "user", "delivery_crew_id", "status", "total", "date", "items"]
+        list_serializer_class = CompiledListSerializer
         read_only_fields = ["user_id","user", "total", "delivery_crew_id", "date", "items"]
         
     def validate(self, attrs):
@@ -1,3 +1,1255 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+from datetime import date
+from importlib.util import find_spec
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+from rest_framework.test import APIClient
+from .async_views import urlpatterns as async_urlpatterns
+from .models import Category, MenuItem, Cart, Order, OrderItem, DailySales, DailyMenuItemSales, DailyCategorySales
+from .metrics import registry
+from .pagination import encode_cursor
+from .reports import add_orders
+from .roles import role_cache
 
 # Create your tests here.
+# Keep the throttle buckets and the shared cache of test runs out of the
+# stores the server uses
+TEST_STORES = {
+    "REST_FRAMEWORK": {**settings.REST_FRAMEWORK, "THROTTLE_STORE": ":memory:"},
+    "CACHES": {**settings.CACHES, "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                             "LOCATION": "shared"}},
+}
+
+
+@override_settings(**TEST_STORES)
+class QueryBudgetTests(TestCase):
+    # Every list endpoint must run a fixed number of queries no matter how
+    # many rows it returns. The budgets include the group lookup made by
+    # the cold role cache.
+    sizes = [1, 100, 10000]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager_group = Group.objects.create(name="Manager")
+        cls.crew_group = Group.objects.create(name="Delivery Crew")
+        cls.manager = User.objects.create_user("manager")
+        cls.manager.groups.add(cls.manager_group)
+        cls.crew = User.objects.create_user("crew")
+        cls.crew.groups.add(cls.crew_group)
+        cls.customer = User.objects.create_user("customer")
+        cls.categories = Category.objects.bulk_create([
+            Category(slug=f"category-{i}", title=f"Category {i}") for i in range(5)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+
+    def seed_menu_items(self, size):
+        return MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("2.50"), featured=False, category=self.categories[i % 5])
+            for i in range(size)
+        ])
+
+    def seed_cart(self, size):
+        Cart.objects.bulk_create([
+            Cart(user=self.customer, menuitem=item, quantity=2, unit_price=item.price, price=item.price * 2)
+            for item in self.seed_menu_items(size)
+        ])
+
+    def seed_orders(self, size):
+        items = self.seed_menu_items(5)
+        orders = Order.objects.bulk_create([
+            Order(user=self.customer, delivery_crew=self.crew, total=Decimal("12.50"), date=date.today())
+            for _ in range(size)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menuitem=item, quantity=1, unit_price=item.price)
+            for order in orders for item in items
+        ])
+
+    def seed_group(self, group, size):
+        users = User.objects.bulk_create([User(username=f"user-{i}") for i in range(size)])
+        group.user_set.add(*users)
+
+    def assertBudget(self, user, url, budget, seed):
+        for size in self.sizes:
+            with self.subTest(url=url, size=size), transaction.atomic():
+                seed(size)
+                cache.clear()
+                role_cache.clear()
+                self.client.force_authenticate(User.objects.get(pk=user.pk))
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url, {"page": 1})
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.data["results"])
+                transaction.set_rollback(True)
+
+    def test_menu_items(self):
+        # count, page
+        self.assertBudget(self.customer, reverse("menu-collection"), 2, self.seed_menu_items)
+
+    def test_cart(self):
+        # groups, count, page
+        self.assertBudget(self.customer, reverse("cart"), 3, self.seed_cart)
+
+    def test_customer_orders(self):
+        # groups, count, page, items
+        self.assertBudget(self.customer, reverse("order-collection"), 4, self.seed_orders)
+
+    def test_manager_orders(self):
+        self.assertBudget(self.manager, reverse("order-collection"), 4, self.seed_orders)
+
+    def test_delivery_crew_orders(self):
+        self.assertBudget(self.crew, reverse("order-collection"), 4, self.seed_orders)
+
+    def test_manager_users(self):
+        # groups, count, page, user groups
+        self.assertBudget(self.manager, "/api/groups/manager/users", 4,
+                          lambda size: self.seed_group(self.manager_group, size))
+
+    def test_delivery_crew_users(self):
+        self.assertBudget(self.manager, "/api/groups/delivery-crew/users", 4,
+                          lambda size: self.seed_group(self.crew_group, size))
+
+
+@override_settings(**TEST_STORES)
+class CompiledSerializerTests(TestCase):
+    # The compiled list serializers must render byte for byte what the DRF
+    # serializers render, for every role and for values that take the slow
+    # path (unsaved rows, decimals that need quantizing, missing relations).
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+        cls.crew = User.objects.create_user("crew")
+        cls.crew.groups.add(Group.objects.create(name="Delivery Crew"))
+        cls.customer = User.objects.create_user("customer")
+        categories = Category.objects.bulk_create([
+            Category(slug="mains", title="Mains"), Category(slug="desserts", title="Desserts \"& more\""),
+        ])
+        cls.items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i} ü", price=price, featured=i % 2 == 0, category=categories[i % 2])
+            for i, price in enumerate([Decimal("0.50"), Decimal("12.00"), Decimal("999.99"), Decimal("7.05")])
+        ])
+        Cart.objects.bulk_create([
+            Cart(user=cls.customer, menuitem=item, quantity=i + 1, unit_price=item.price, price=item.price * (i + 1))
+            for i, item in enumerate(cls.items)
+        ])
+        orders = Order.objects.bulk_create([
+            Order(user=cls.customer, delivery_crew=cls.crew, status=True, total=Decimal("13.00"), date=date(2024, 2, 29)),
+            Order(user=cls.customer, delivery_crew=None, status=False, total=Decimal("0.50"), date=date.today()),
+            Order(user=cls.customer, delivery_crew=cls.crew, status=False, total=Decimal("0.00"), date=date.today()),
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=orders[0], menuitem=cls.items[0], quantity=2, unit_price=Decimal("0.50")),
+            OrderItem(order=orders[0], menuitem=cls.items[1], quantity=1, unit_price=Decimal("12.00")),
+            OrderItem(order=orders[1], menuitem=cls.items[0], quantity=1, unit_price=Decimal("0.50")),
+        ])
+
+    def render(self, user, url):
+        cache.clear()
+        role_cache.clear()
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=user.pk))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_list_endpoints(self):
+        for user, url in [
+            (self.customer, reverse("menu-collection")),
+            (self.customer, reverse("cart")),
+            (self.customer, reverse("order-collection")),
+            (self.crew, reverse("order-collection")),
+            (self.manager, reverse("order-collection")),
+            (self.manager, "/api/groups/delivery-crew/users"),
+        ]:
+            with self.subTest(user=user.username, url=url):
+                with override_settings(LITTLELEMON_COMPILED_SERIALIZERS=False):
+                    expected = self.render(user, url)
+                self.assertEqual(self.render(user, url), expected)
+
+    def test_slow_path_values(self):
+        from rest_framework.renderers import JSONRenderer
+        from .serializers import MenuItemSerializer, CartSerializer, DeliveryCrewOrderSerializer, ManagerOrderSerializer
+        category = Category.objects.first()
+        unsaved_items = [
+            MenuItem(title="Unsaved", price=Decimal("3.5"), featured=1, category=category),
+            MenuItem(title=5, price=2, featured=0, category=category),
+        ]
+        unsaved_cart = [Cart(user=self.customer, menuitem=unsaved_items[0], quantity=1, unit_price=3.5, price="3.456")]
+        orders = list(Order.objects.select_related("user", "delivery_crew").prefetch_related("orderitem_set"))
+        edited = Order.objects.select_related("user").get(pk=orders[1].pk)
+        edited.status, edited.total, edited.date = 0, Decimal("1E+1"), "2024-01-01"
+        for serializer_class, rows in [
+            (MenuItemSerializer, unsaved_items),
+            (CartSerializer, unsaved_cart),
+            (DeliveryCrewOrderSerializer, orders + [edited]),
+            (ManagerOrderSerializer, orders + [edited]),
+        ]:
+            with self.subTest(serializer=serializer_class.__name__):
+                expected = JSONRenderer().render([serializer_class(row).data for row in rows])
+                self.assertEqual(JSONRenderer().render(serializer_class(rows, many=True).data), expected)
+
+
+# The primary stands in as its own replica, so the queries succeed and the
+# tests look at which reads the router would have sent to a replica
+@override_settings(LITTLELEMON_READ_REPLICAS=["default"], **TEST_STORES)
+class ReplicaRoutingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer")
+        category = Category.objects.create(slug="mains", title="Mains")
+        cls.item = MenuItem.objects.create(title="Item", price=Decimal("2.00"), featured=False, category=category)
+        Order.objects.create(user=cls.customer, total=Decimal("2.00"), date=date.today())
+
+    def setUp(self):
+        cache.clear()
+        caches["shared"].clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def replicas_used(self, method, url, data=None):
+        # The replica current when each query of the request ran
+        from django.db import connection
+        from .replicas import current_replica
+        used = []
+
+        def record(execute, sql, params, many, context):
+            used.append(current_replica())
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 400)
+        return set(used)
+
+    def test_reads_go_to_replica(self):
+        # Authentication and permission checks still read from the primary
+        self.assertIn("default", self.replicas_used("get", reverse("order-collection")))
+        self.assertIn("default", self.replicas_used("get", reverse("menu-collection")))
+
+    def test_writes_and_other_reads_use_primary(self):
+        self.assertEqual(self.replicas_used("get", reverse("cart")), {None})
+        self.assertEqual(self.replicas_used("post", reverse("cart"), {"menuitem_id": self.item.id, "quantity": 1}),
+                         {None})
+
+    def test_reads_after_write_stick_to_primary(self):
+        self.replicas_used("post", reverse("cart"), {"menuitem_id": self.item.id, "quantity": 1})
+        self.assertEqual(self.replicas_used("get", reverse("order-collection")), {None})
+        # The mark is shared between worker processes, not kept in one
+        cache.clear()
+        self.assertEqual(self.replicas_used("get", reverse("order-collection")), {None})
+        caches["shared"].clear()
+        self.assertIn("default", self.replicas_used("get", reverse("order-collection")))
+
+    def test_router(self):
+        from .replicas import ReplicaRouter
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Order), "default")
+        self.assertIsNone(router.db_for_read(User))
+        with override_settings(LITTLELEMON_READ_REPLICAS=["replica"]):
+            self.assertFalse(router.allow_migrate("replica", "LittleLemonAPI"))
+            self.assertIsNone(router.allow_migrate("default", "LittleLemonAPI"))
+
+
+class QueryPlanTests(TestCase):
+
+    def test_candidate_columns(self):
+        from .query_plans import candidate_columns
+        sql = ('SELECT "t"."id" FROM "t" INNER JOIN "u" ON ("t"."u_id" = "u"."id") '
+               'WHERE ("t"."a" = %s AND NOT "t"."b" AND "t"."c" > %s AND "u"."d" = %s) ORDER BY "t"."e" DESC LIMIT 3')
+        self.assertEqual(candidate_columns(sql, "t"), ["a", "b", "c"])
+        self.assertEqual(candidate_columns(sql.replace('"t"."c" > %s', '"t"."c" IN (%s, %s)'), "t"), ["a", "b", "c", "e"])
+        self.assertEqual(candidate_columns(sql, "u"), ["d"])
+
+    def test_menu_by_category_and_price_is_indexed(self):
+        from django.db import connection
+        from .query_plans import explain, problems
+        queryset = MenuItem.objects.filter(category_id=1).order_by("price")
+        sql, params = queryset.query.sql_with_params()
+        self.assertEqual(problems(explain(connection, sql, params)), [])
+
+
+@skipUnless(find_spec("msgpack"), "msgpack is not installed")
+@override_settings(**TEST_STORES)
+class MessagePackTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer")
+        category = Category.objects.create(slug="mains", title="Mains")
+        MenuItem.objects.create(title="Item ü", price=Decimal("2.50"), featured=True, category=category)
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_format_and_accept_header(self):
+        import msgpack
+        url = reverse("menu-collection")
+        expected = self.client.get(url).json()
+        for response in [self.client.get(url, {"format": "msgpack"}),
+                         self.client.get(url, HTTP_ACCEPT="application/msgpack")]:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "application/msgpack")
+            self.assertEqual(msgpack.unpackb(response.content), expected)
+
+
+def rollup_rows():
+    # The non-empty rows of the three sales rollups
+    return [
+        sorted(DailySales.objects.exclude(orders=0, items=0, revenue=0)
+               .values_list("date", "status", "orders", "items", "revenue")),
+        sorted(DailyMenuItemSales.objects.exclude(quantity=0, revenue=0)
+               .values_list("date", "status", "menuitem_id", "quantity", "revenue")),
+        sorted(DailyCategorySales.objects.exclude(quantity=0, revenue=0)
+               .values_list("date", "status", "category_id", "quantity", "revenue")),
+    ]
+
+
+def backfilled_rollup_rows():
+    # The rollups as backfill_sales_rollups rebuilds them from the orders
+    call_command("backfill_sales_rollups", stdout=StringIO())
+    return rollup_rows()
+
+
+@override_settings(**TEST_STORES)
+class OrderStatusBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+        crew_group = Group.objects.create(name="Delivery Crew")
+        cls.crew = User.objects.create_user("crew")
+        cls.other_crew = User.objects.create_user("other-crew")
+        crew_group.user_set.add(cls.crew, cls.other_crew)
+        cls.customer = User.objects.create_user("customer")
+        category = Category.objects.create(slug="mains", title="Mains")
+        item = MenuItem.objects.create(title="Item", price=Decimal("2.00"), featured=False, category=category)
+        cls.orders = Order.objects.bulk_create([
+            Order(user=cls.customer, delivery_crew=crew, total=Decimal("4.00"), date=date.today())
+            for crew in [cls.crew, cls.other_crew, None]
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menuitem=item, quantity=2, unit_price=Decimal("2.00")) for order in cls.orders
+        ])
+        add_orders([order.id for order in cls.orders])
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+
+    def set_status(self, user, ids, status):
+        self.client.force_authenticate(user)
+        return self.client.patch(reverse("order-status"), {"ids": ids, "status": status}, format="json")
+
+    def statuses(self):
+        return list(Order.objects.order_by("id").values_list("status", flat=True))
+
+    def test_crew_only_changes_their_orders(self):
+        mine, others, unassigned = [order.id for order in self.orders]
+        response = self.set_status(self.crew, [mine, others, unassigned, 0], True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"updated": 1, "results": {
+            mine: "updated", others: "not_found", unassigned: "not_found", 0: "not_found",
+        }})
+        self.assertEqual(self.statuses(), [True, False, False])
+
+        response = self.set_status(self.crew, [mine], True)
+        self.assertEqual(response.data, {"updated": 0, "results": {mine: "unchanged"}})
+
+    def test_customer_is_forbidden(self):
+        response = self.set_status(self.customer, [order.id for order in self.orders], True)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.statuses(), [False, False, False])
+
+    def test_rollups_follow_status(self):
+        ids = [order.id for order in self.orders]
+        self.assertEqual(self.set_status(self.manager, ids[:2], True).data["updated"], 2)
+        sales = {row.status: row for row in DailySales.objects.filter(date=date.today())}
+        self.assertEqual((sales[True].orders, sales[True].items, sales[True].revenue), (2, 4, Decimal("8.00")))
+        self.assertEqual((sales[False].orders, sales[False].items, sales[False].revenue), (1, 2, Decimal("4.00")))
+        self.assertEqual(rollup_rows(), backfilled_rollup_rows())
+
+
+@override_settings(**TEST_STORES)
+class CartAddTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer")
+        category = Category.objects.create(slug="mains", title="Mains")
+        cls.items = MenuItem.objects.bulk_create([
+            MenuItem(title=f"Item {i}", price=Decimal("2.00"), featured=False, category=category) for i in range(2)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def add(self, data):
+        return self.client.post(reverse("cart"), data, format="json")
+
+    def lines(self):
+        return list(Cart.objects.order_by("menuitem_id").values_list("menuitem_id", "quantity", "unit_price", "price"))
+
+    def test_increments_existing_line_at_current_price(self):
+        item = self.items[0]
+        self.assertEqual(self.add({"menuitem_id": item.id, "quantity": 1}).status_code, 201)
+        MenuItem.objects.filter(id=item.id).update(price=Decimal("2.50"))
+        response = self.add([{"menuitem_id": item.id, "quantity": 1}, {"menuitem_id": item.id, "quantity": 1}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([(line["quantity"], line["price"]) for line in response.json()], [(3, "7.50")])
+        self.assertEqual(self.lines(), [(item.id, 3, Decimal("2.50"), Decimal("7.50"))])
+
+    def test_missing_menu_item_writes_nothing(self):
+        self.add({"menuitem_id": self.items[0].id, "quantity": 1})
+        before = self.lines()
+        response = self.add([
+            {"menuitem_id": self.items[0].id, "quantity": 1},
+            {"menuitem_id": 0, "quantity": 1},
+            {"menuitem_id": self.items[1].id, "quantity": 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"1": {"menuitem_id": ['Invalid pk "0" - object does not exist.']}})
+        self.assertEqual(self.lines(), before)
+
+    def test_single_line_error_shape(self):
+        response = self.add({"menuitem_id": 0, "quantity": 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"menuitem_id": ['Invalid pk "0" - object does not exist.']})
+        self.assertEqual(self.lines(), [])
+
+
+@override_settings(**TEST_STORES)
+class RollupCascadeTests(TestCase):
+    # Deletes that cascade to orders or order items must leave the rollups
+    # as backfill_sales_rollups would rebuild them
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer")
+        cls.other_customer = User.objects.create_user("other-customer")
+        mains = Category.objects.create(slug="mains", title="Mains")
+        desserts = Category.objects.create(slug="desserts", title="Desserts")
+        cls.a = MenuItem.objects.create(title="A", price=Decimal("2.00"), featured=False, category=mains)
+        cls.b = MenuItem.objects.create(title="B", price=Decimal("3.00"), featured=False, category=mains)
+        cls.c = MenuItem.objects.create(title="C", price=Decimal("4.00"), featured=False, category=desserts)
+        orders = Order.objects.bulk_create([
+            Order(user=cls.customer, total=Decimal("5.00"), date=date.today()),
+            Order(user=cls.customer, total=Decimal("2.00"), status=True, date=date(2024, 2, 29)),
+            Order(user=cls.other_customer, total=Decimal("7.00"), date=date.today()),
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=orders[0], menuitem=cls.a, quantity=1, unit_price=Decimal("2.00")),
+            OrderItem(order=orders[0], menuitem=cls.b, quantity=1, unit_price=Decimal("3.00")),
+            OrderItem(order=orders[1], menuitem=cls.a, quantity=1, unit_price=Decimal("2.00")),
+            OrderItem(order=orders[2], menuitem=cls.b, quantity=1, unit_price=Decimal("3.00")),
+            OrderItem(order=orders[2], menuitem=cls.c, quantity=1, unit_price=Decimal("4.00")),
+        ])
+        add_orders([order.id for order in orders])
+
+    def test_delete_menu_item(self):
+        self.a.delete()
+        sales = DailySales.objects.get(date=date.today(), status=False)
+        self.assertEqual(sales.items, 3)
+        mains = DailyCategorySales.objects.get(date=date.today(), status=False, category__slug="mains")
+        self.assertEqual(mains.revenue, Decimal("6.00"))
+        self.assertEqual(rollup_rows(), backfilled_rollup_rows())
+
+    def test_delete_menu_items_in_bulk(self):
+        MenuItem.objects.filter(id__in=[self.a.id, self.c.id]).delete()
+        self.assertEqual(rollup_rows(), backfilled_rollup_rows())
+
+    def test_delete_menu_items_of_one_order(self):
+        # The first order holds both items, and must be counted out once
+        MenuItem.objects.filter(id__in=[self.a.id, self.b.id]).delete()
+        self.assertEqual(DailySales.objects.get(date=date.today(), status=False).items, 1)
+        self.assertFalse(DailyCategorySales.objects.filter(category__slug="mains").exclude(revenue=0).exists())
+        self.assertEqual(rollup_rows(), backfilled_rollup_rows())
+
+    def test_delete_user(self):
+        self.customer.delete()
+        self.assertEqual(DailySales.objects.get(date=date.today(), status=False).orders, 1)
+        self.assertEqual(rollup_rows(), backfilled_rollup_rows())
+
+
+@override_settings(**TEST_STORES)
+class RollupMigrationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Orders placed before the rollups existed
+        customer = User.objects.create_user("customer")
+        mains = Category.objects.create(slug="mains", title="Mains")
+        desserts = Category.objects.create(slug="desserts", title="Desserts")
+        a = MenuItem.objects.create(title="A", price=Decimal("2.50"), featured=False, category=mains)
+        b = MenuItem.objects.create(title="B", price=Decimal("4.00"), featured=False, category=desserts)
+        orders = Order.objects.bulk_create([
+            Order(user=customer, total=Decimal("9.00"), date=date(2024, 2, 29)),
+            Order(user=customer, total=Decimal("2.50"), status=True, date=date(2024, 2, 29)),
+            Order(user=customer, total=Decimal("4.00"), date=date(2024, 3, 1)),
+            Order(user=customer, total=Decimal("0.00"), date=date(2024, 3, 2)),
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=orders[0], menuitem=a, quantity=2, unit_price=Decimal("2.50")),
+            OrderItem(order=orders[0], menuitem=b, quantity=1, unit_price=Decimal("4.00")),
+            OrderItem(order=orders[1], menuitem=a, quantity=1, unit_price=Decimal("2.50")),
+            OrderItem(order=orders[2], menuitem=b, quantity=1, unit_price=Decimal("4.00")),
+        ])
+
+    def test_backfills_orders_placed_before_the_rollups(self):
+        from importlib import import_module
+        from django.db import connection
+        migration = import_module("LittleLemonAPI.migrations.0008_backfill_sales_rollups")
+        # A row recorded since 0006 is rebuilt with the rest
+        DailySales.objects.create(date=date(2024, 3, 1), status=False, orders=1, items=1, revenue=Decimal("4.00"))
+        migration.backfill_sales_rollups(None, mock.Mock(connection=connection))
+        rows = rollup_rows()
+        self.assertEqual(rows[0], [
+            (date(2024, 2, 29), False, 1, 3, Decimal("9.00")),
+            (date(2024, 2, 29), True, 1, 1, Decimal("2.50")),
+            (date(2024, 3, 1), False, 1, 1, Decimal("4.00")),
+            (date(2024, 3, 2), False, 1, 0, Decimal("0.00")),
+        ])
+        self.assertEqual(rows, backfilled_rollup_rows())
+
+
+@override_settings(**TEST_STORES)
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(slug="mains", title="Mains")
+        MenuItem.objects.create(title="Item", price=Decimal("2.00"), featured=False, category=category)
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def menu_series(self):
+        from .metrics import COUNT, QUERIES
+        series = registry.collect()[("menu-collection", "GET", 200)]
+        return series[COUNT], series[QUERIES]
+
+    def test_wsgi_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse("menu-collection")).status_code, 200)
+        self.assertEqual(self.menu_series(), (1, len(queries)))
+        self.assertGreater(len(queries), 0)
+
+    async def test_asgi_queries(self):
+        # The sync view runs in a sync_to_async thread, not in the thread
+        # of the middleware
+        response = await self.async_client.get(reverse("menu-collection"))
+        self.assertEqual(response.status_code, 200)
+        count, queries = self.menu_series()
+        self.assertEqual(count, 1)
+        self.assertGreater(queries, 0)
+
+    def test_scrape_needs_token(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with override_settings(LITTLELEMON_METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get(url).status_code, 401)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+            response = self.client.get(url, HTTP_AUTHORIZATION="Bearer secret")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b"littlelemon_http_request_duration_seconds", response.content)
+        with override_settings(LITTLELEMON_METRICS_PUBLIC=True):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(**TEST_STORES)
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(slug="mains", title="Mains")
+        MenuItem.objects.create(title="Item", price=Decimal("2.00"), featured=False, category=cls.category)
+
+    def setUp(self):
+        cache.clear()
+        caches["shared"].clear()
+
+    def test_version_is_shared_between_workers(self):
+        url = reverse("menu-collection")
+        etag = self.client.get(url)["ETag"]
+        # Another worker process has its own page cache, but the same version
+        cache.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(title="New", price=Decimal("3.00"), featured=False, category=self.category)
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(LITTLELEMON_READ_REPLICAS=["default"])
+    def test_stale_replica_pages_get_no_etag(self):
+        from .replicas import mark_written
+        url = reverse("menu-collection")
+        customer = User.objects.create_user("customer")
+        primary = APIClient()
+        primary.force_authenticate(customer)
+        mark_written(customer)
+
+        # The primary stands in for the replica. Renaming the item without
+        # a version bump leaves the replica's cached page behind the
+        # primary, as a lagging replica would.
+        response = self.client.get(url)
+        self.assertNotIn("ETag", response)
+        MenuItem.objects.update(title="Renamed")
+        self.assertEqual(self.client.get(url).json()["results"][0]["title"], "Item")
+
+        # Readers of the primary neither get the replica's page nor can
+        # revalidate it
+        response = primary.get(url)
+        self.assertEqual(response.json()["results"][0]["title"], "Renamed")
+        etag = response["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+
+    def test_keys_are_safe_for_memcached(self):
+        import warnings
+        from django.core.cache.backends.base import CacheKeyWarning
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            response = self.client.get(reverse("menu-collection"), {"search": "fish and chips " * 30})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(**TEST_STORES)
+class OrderExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+        cls.customer = User.objects.create_user("customer")
+        category = Category.objects.create(slug="mains", title="Mains")
+        item = MenuItem.objects.create(title="Item", price=Decimal("2.00"), featured=False, category=category)
+        order = Order.objects.create(user=cls.customer, total=Decimal("4.00"), date=date(2024, 2, 29))
+        OrderItem.objects.create(order=order, menuitem=item, quantity=2, unit_price=Decimal("2.00"))
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def export(self, export_format, **params):
+        response = self.client.get(reverse("order-export", args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        header = "order_id,date,user_id,user,delivery_crew_id,status,total,menuitem_id,menuitem,quantity,unit_price\r\n"
+        order = Order.objects.get()
+        self.assertEqual(self.export("csv"), header + f"{order.id},2024-02-29,{self.customer.id},customer,,0,4.00,"
+                                                      f"{order.orderitem_set.get().menuitem_id},Item,2,2.00\r\n")
+        # The header is sent even when no order matches
+        self.assertEqual(self.export("csv", status=1), header)
+        self.assertEqual(self.export("ndjson", status=1), "")
+
+    async def test_asgi_streams_chunk_by_chunk(self):
+        from rest_framework.authtoken.models import Token
+        token = await Token.objects.acreate(user=self.manager)
+        response = await self.async_client.get(reverse("order-export", args=["ndjson"]),
+                                               headers={"Authorization": f"Token {token.key}"})
+        self.assertEqual(response.status_code, 200)
+        # An async iterator, so Django does not read the export into a list
+        self.assertTrue(response.is_async)
+        lines = b"".join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 1)
+
+
+@override_settings(**TEST_STORES)
+class SalesReportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def test_long_report_is_streamed(self):
+        from datetime import timedelta
+        from .renderers import STREAM_THRESHOLD
+        first = date(2020, 1, 1)
+        DailySales.objects.bulk_create([
+            DailySales(date=first + timedelta(days=i), status=True, orders=1, items=2, revenue=Decimal("4.50"))
+            for i in range(STREAM_THRESHOLD)
+        ])
+        response = self.client.get(reverse("sales-daily"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(data["results"]), STREAM_THRESHOLD)
+        self.assertEqual(data["results"][0], {"date": "2020-01-01", "orders": 1, "items": 2, "revenue": "4.50"})
+        self.assertEqual(data["totals"]["orders"], STREAM_THRESHOLD)
+
+        response = self.client.get(reverse("sales-daily"), {"date_to": "2020-01-02"})
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+@override_settings(**TEST_STORES)
+class CheckoutTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer")
+        category = Category.objects.create(slug="mains", title="Mains")
+        cls.items = MenuItem.objects.bulk_create([
+            MenuItem(title="A", price=Decimal("2.50"), featured=False, category=category),
+            MenuItem(title="B", price=Decimal("4.00"), featured=False, category=category),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        Cart.objects.bulk_create([
+            Cart(user=self.customer, menuitem=self.items[0], quantity=3, unit_price=Decimal("2.50"), price=Decimal("7.50")),
+            Cart(user=self.customer, menuitem=self.items[1], quantity=1, unit_price=Decimal("4.00"), price=Decimal("4.00")),
+        ])
+
+    def test_checkout(self):
+        response = self.client.post(reverse("order-collection"))
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual((order.user, order.total, order.status, order.date), (self.customer, Decimal("11.50"), False,
+                                                                                date.today()))
+        self.assertEqual(sorted(order.orderitem_set.values_list("menuitem_id", "quantity", "unit_price")), [
+            (self.items[0].id, 3, Decimal("2.50")), (self.items[1].id, 1, Decimal("4.00")),
+        ])
+        self.assertFalse(Cart.objects.exists())
+        sales = DailySales.objects.get(date=date.today(), status=False)
+        self.assertEqual((sales.orders, sales.items, sales.revenue), (1, 4, Decimal("11.50")))
+        self.assertEqual(rollup_rows(), backfilled_rollup_rows())
+
+    def test_empty_cart(self):
+        Cart.objects.all().delete()
+        response = self.client.post(reverse("order-collection"))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_failed_insert_rolls_back(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from .checkout import place_order
+        with mock.patch.object(OrderItem.objects, "bulk_create", side_effect=IntegrityError("failed")):
+            with self.assertRaises(IntegrityError):
+                place_order(self.customer)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Cart.objects.count(), 2)
+        self.assertFalse(DailySales.objects.exists())
+
+
+@override_settings(**TEST_STORES)
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer")
+        # Several orders share a date, so the pages must break ties on id
+        Order.objects.bulk_create([
+            Order(user=cls.customer, total=Decimal("1.00"), date=day)
+            for day in [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 2), date(2024, 1, 2),
+                        date(2024, 1, 3), date(2024, 1, 1), date(2024, 1, 2)]
+        ])
+        cls.expected = list(Order.objects.order_by("-date", "-id").values_list("id", flat=True))
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_next_and_previous_round_trip(self):
+        page = self.get(reverse("order-collection"), {"cursor": "", "page_size": 2})
+        self.assertIsNone(page["previous"])
+        pages = [[order["id"] for order in page["results"]]]
+        while page["next"]:
+            page = self.get(page["next"])
+            pages.append([order["id"] for order in page["results"]])
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(ids) for ids in pages], [2, 2, 2, 1])
+
+        # And back again from the last page
+        backwards = [pages[-1]]
+        while page["previous"]:
+            page = self.get(page["previous"])
+            backwards.append([order["id"] for order in page["results"]])
+        self.assertEqual(backwards, pages[::-1])
+
+    def test_invalid_cursor(self):
+        for cursor in ["not base64!", encode_cursor(["id"], [1]), encode_cursor(["-date", "-id"], ["x", 1])]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse("order-collection"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data, {"detail": "Invalid cursor"})
+
+    def test_count_is_opt_in(self):
+        page = self.get(reverse("order-collection"), {"cursor": "", "page_size": 2})
+        self.assertNotIn("count", page)
+        page = self.get(reverse("order-collection"), {"cursor": "", "page_size": 2, "count": "true"})
+        self.assertEqual(page["count"], len(self.expected))
+        self.assertNotIn("count=", page["next"])
+
+
+@override_settings(**TEST_STORES)
+class MenuImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+        cls.mains = Category.objects.create(slug="mains", title="Mains")
+        cls.desserts = Category.objects.create(slug="desserts", title="Desserts")
+        MenuItem.objects.create(title="Burger", price=Decimal("8.00"), featured=False, category=cls.mains)
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def items(self):
+        return list(MenuItem.objects.order_by("title", "category_id").values_list("title", "price", "featured", "category_id"))
+
+    def csv(self, *rows):
+        return "title,price,featured,category_id\r\n" + "".join(f"{row}\r\n" for row in rows)
+
+    def test_json_upserts_by_title_and_category(self):
+        response = self.client.post(reverse("menu-import"), [
+            {"title": "Burger", "price": "9.50", "featured": True, "category_id": self.mains.id},
+            {"title": "Burger", "price": "4.00", "featured": False, "category_id": self.desserts.id},
+            {"title": "Tiramisu", "price": "5.00", "featured": False, "category_id": self.desserts.id},
+        ], format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"created": 2, "updated": 1})
+        self.assertEqual(self.items(), [
+            ("Burger", Decimal("9.50"), True, self.mains.id),
+            ("Burger", Decimal("4.00"), False, self.desserts.id),
+            ("Tiramisu", Decimal("5.00"), False, self.desserts.id),
+        ])
+
+    def test_csv_body_with_bom(self):
+        body = "\ufeff" + self.csv(f"Burger,9.50,true,{self.mains.id}", f"Tiramisu,5.00,false,{self.desserts.id}")
+        response = self.client.post(reverse("menu-import"), body.encode("utf-8"), content_type="text/csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"created": 1, "updated": 1})
+        self.assertIn(("Tiramisu", Decimal("5.00"), False, self.desserts.id), self.items())
+
+    def test_multipart_csv_file(self):
+        upload = SimpleUploadedFile("menu.csv", ("\ufeff" + self.csv(f"Tiramisu,5.00,false,{self.desserts.id}")).encode("utf-8"))
+        response = self.client.post(reverse("menu-import"), {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"created": 1, "updated": 0})
+
+    def test_row_errors_write_nothing(self):
+        before = self.items()
+        response = self.client.post(reverse("menu-import"), [
+            {"title": "Burger", "price": "9.50", "featured": True, "category_id": self.mains.id},
+            {"title": "Salad", "price": "-1", "featured": False, "category_id": self.mains.id},
+            {"title": "Soup", "price": "3.00", "featured": False, "category_id": 0},
+            {"title": "Burger", "price": "9.00", "featured": True, "category_id": self.mains.id},
+        ], format="json")
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertEqual(sorted(errors), ["1", "2", "3"])
+        self.assertIn("price", errors["1"])
+        self.assertEqual(errors["2"], {"category_id": ['Invalid pk "0" - object does not exist.']})
+        self.assertEqual(errors["3"], {"non_field_errors": ["Duplicate of row 0."]})
+        self.assertEqual(self.items(), before)
+
+    def test_lookups_are_batched(self):
+        rows = [{"title": f"Item {i}", "price": "1.00", "featured": False, "category_id": self.mains.id} for i in range(5)]
+        rows.append({"title": "Burger", "price": "9.50", "featured": True, "category_id": self.mains.id})
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with mock.patch("LittleLemonAPI.menu_import.BATCH_SIZE", 2), CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("menu-import"), rows, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"created": 5, "updated": 1})
+        # Six titles, two to a query
+        title_lookups = [q for q in queries if '"title" IN' in q["sql"] and q["sql"].startswith("SELECT")]
+        self.assertEqual(len(title_lookups), 3)
+
+
+@override_settings(**TEST_STORES)
+class BucketThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+
+    def test_bucket_takes_cost_and_refills(self):
+        from .throttling import BucketStore
+        store = BucketStore(":memory:")
+        # Three tokens, refilled at one a second
+        self.assertEqual(store.take("k", 3, 1, 2, now=100), (True, 1))
+        self.assertEqual(store.take("k", 3, 1, 2, now=100), (False, 1))
+        self.assertEqual(store.take("k", 3, 1, 2, now=101), (True, 0))
+        # Refills stop at the capacity
+        self.assertEqual(store.take("k", 3, 1, 1, now=200), (True, 2))
+        # A cost above the capacity is never granted and takes nothing
+        self.assertEqual(store.take("k", 3, 1, 4, now=200), (False, 2))
+        self.assertEqual(store.take("other", 3, 1, 4, now=200), (False, 3))
+
+    def test_costly_action_is_throttled_with_retry_after(self):
+        # Anonymous clients get 10 tokens a day; each list takes 4
+        rest_framework = {**TEST_STORES["REST_FRAMEWORK"], "THROTTLE_COSTS": {"MenuItemsViewSet.list": 4}}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            responses = [self.client.get(reverse("menu-collection")) for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        # Two tokens are left, so two more have to be refilled
+        self.assertEqual(responses[2]["Retry-After"], str(2 * 24 * 60 * 60 // 10))
+
+    def test_cost_above_capacity_has_no_retry_after(self):
+        rest_framework = {**TEST_STORES["REST_FRAMEWORK"], "THROTTLE_COSTS": {"MenuItemsViewSet.list": 11}}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            response = self.client.get(reverse("menu-collection"))
+        self.assertEqual(response.status_code, 429)
+        self.assertNotIn("Retry-After", response)
+
+
+@override_settings(**TEST_STORES)
+class BlacklistIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer")
+
+    def setUp(self):
+        from .blacklist import blacklist_index
+        cache.clear()
+        role_cache.clear()
+        blacklist_index.clear()
+        self.addCleanup(blacklist_index.clear)
+        self.client = APIClient()
+
+    def refresh(self, token):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("jwt-refresh"), {"refresh": str(token)}, format="json")
+        lookups = [q for q in queries if "token_blacklist_blacklistedtoken" in q["sql"] and "token_blacklist_outstandingtoken" in q["sql"]]
+        return response.status_code, len(lookups)
+
+    def token(self):
+        from .authentication import RoleClaimsRefreshToken
+        return RoleClaimsRefreshToken.for_user(self.customer)
+
+    def test_clean_token_skips_the_blacklist_query(self):
+        token = self.token()
+        self.refresh(token)
+        self.assertEqual(self.refresh(token), (200, 0))
+
+    def test_blacklisted_token_is_rejected(self):
+        token = self.token()
+        self.refresh(token)
+        token.blacklist()
+        status_code, lookups = self.refresh(token)
+        self.assertEqual(status_code, 401)
+        self.assertEqual(lookups, 1)
+
+    def test_false_positive_falls_back_to_the_query(self):
+        from .blacklist import blacklist_index
+        token = self.token()
+        with mock.patch.object(blacklist_index, "might_contain", return_value=True):
+            self.assertEqual(self.refresh(token), (200, 1))
+
+    def test_rows_from_other_processes_are_picked_up_on_sync(self):
+        import time
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from .blacklist import SYNC_INTERVAL
+        token = self.token()
+        self.refresh(token)
+        # bulk_create sends no post_save, like a row written by another worker
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=OutstandingToken.objects.get(jti=token["jti"]))])
+        self.assertEqual(self.refresh(token)[0], 200)
+        later = time.monotonic() + SYNC_INTERVAL
+        with mock.patch("LittleLemonAPI.blacklist.time.monotonic", return_value=later):
+            self.assertEqual(self.refresh(token)[0], 401)
+
+
+@override_settings(**TEST_STORES)
+class RoleCacheInvalidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from rest_framework.authtoken.models import Token
+        cls.manager_group = Group.objects.create(name="Manager")
+        cls.manager = User.objects.create_user("manager")
+        cls.manager.groups.add(cls.manager_group)
+        cls.customer = User.objects.create_user("customer")
+        cls.key = Token.objects.create(user=cls.customer).key
+
+    def setUp(self):
+        from .authentication import token_cache
+        cache.clear()
+        role_cache.clear()
+        token_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.key}")
+
+    def test_logout_drops_the_cached_token(self):
+        from .authentication import token_cache
+        self.assertEqual(self.client.get(reverse("cart")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("cart")).status_code, 200)
+        self.assertEqual(token_cache.hits, 1)
+        self.assertEqual(self.client.post(reverse("logout")).status_code, 204)
+        self.assertEqual(self.client.get(reverse("cart")).status_code, 401)
+
+    def test_deactivating_the_user_drops_the_cached_token(self):
+        self.assertEqual(self.client.get(reverse("cart")).status_code, 200)
+        customer = User.objects.get(pk=self.customer.pk)
+        customer.is_active = False
+        customer.save()
+        self.assertEqual(self.client.get(reverse("cart")).status_code, 401)
+
+    def test_promotion_through_the_api_applies_to_the_next_request(self):
+        self.assertEqual(self.client.get(reverse("cart")).status_code, 200)
+        self.assertEqual(self.client.get("/api/groups/manager/users").status_code, 403)
+        manager = APIClient()
+        manager.force_authenticate(self.manager)
+        response = manager.post("/api/groups/manager/users", {"user_id": self.customer.pk}, format="json")
+        self.assertEqual(response.status_code, 201)
+        # Managers have no cart, but may list the managers
+        self.assertEqual(self.client.get(reverse("cart")).status_code, 403)
+        self.assertEqual(self.client.get("/api/groups/manager/users").status_code, 200)
+        self.assertEqual(manager.delete(f"/api/groups/manager/users/{self.customer.pk}").status_code, 200)
+        self.assertEqual(self.client.get(reverse("cart")).status_code, 200)
+
+    def test_membership_changes_from_either_side_invalidate(self):
+        from .roles import get_roles
+
+        def roles():
+            return get_roles(User.objects.get(pk=self.customer.pk))
+
+        self.assertTrue(roles().is_customer)
+        self.manager_group.user_set.add(self.customer)
+        self.assertTrue(roles().is_manager)
+        self.customer.groups.remove(self.manager_group)
+        self.assertTrue(roles().is_customer)
+        self.customer.groups.add(self.manager_group)
+        self.assertTrue(roles().is_manager)
+        self.manager_group.user_set.clear()
+        self.assertTrue(roles().is_customer)
+
+
+@override_settings(**TEST_STORES)
+class OrderAssignmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        crew_group = Group.objects.create(name="Delivery Crew")
+        cls.manager = User.objects.create_user("manager")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+        cls.customer = User.objects.create_user("customer")
+        cls.crew = [User.objects.create_user(f"crew{i}") for i in range(3)]
+        crew_group.user_set.add(*cls.crew)
+
+        def order(day, crew=None, delivered=False):
+            return Order(user=cls.customer, delivery_crew=crew, status=delivered, total=Decimal("1.00"), date=date(2024, 1, day))
+
+        # Open orders already out: two for crew0, one for crew2, and a
+        # delivered one for crew1 that does not count towards its load
+        Order.objects.bulk_create([
+            order(1, cls.crew[0]), order(1, cls.crew[0]), order(1, cls.crew[2]), order(1, cls.crew[1], delivered=True),
+        ])
+        cls.unassigned = [row.id for row in Order.objects.bulk_create([order(day) for day in range(10, 15)])]
+        delivered = order(2, delivered=True)
+        delivered.save()
+        cls.delivered = delivered.id
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def assign(self, data=None):
+        return self.client.post(reverse("order-assign"), data or {}, format="json")
+
+    def open_orders(self):
+        return {crew.id: Order.objects.filter(status=False, delivery_crew=crew).count() for crew in self.crew}
+
+    def test_balances_by_open_orders_oldest_first(self):
+        response = self.assign()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["assigned"], 5)
+        self.assertEqual([row["id"] for row in response.json()["assignments"]], self.unassigned)
+        # crew1 starts empty, so the oldest order goes to it
+        self.assertEqual(response.json()["assignments"][0]["delivery_crew_id"], self.crew[1].id)
+        self.assertEqual(self.open_orders(), {self.crew[0].id: 3, self.crew[1].id: 3, self.crew[2].id: 2})
+        self.assertIsNone(Order.objects.get(id=self.delivered).delivery_crew_id)
+        # Nothing is left to hand out
+        self.assertEqual(self.assign().json(), {"assigned": 0, "assignments": []})
+
+    def test_limit_and_chosen_crew(self):
+        response = self.assign({"delivery_crew_ids": [self.crew[0].id, self.crew[2].id], "limit": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.json()["assignments"]], self.unassigned[:3])
+        self.assertEqual(self.open_orders(), {self.crew[0].id: 3, self.crew[1].id: 0, self.crew[2].id: 3})
+
+    def test_rejects_users_outside_the_crew(self):
+        response = self.assign({"delivery_crew_ids": [self.crew[0].id, self.customer.id]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"delivery_crew_ids": [f"User {self.customer.id} is not in the Delivery Crew group."]})
+        self.assertFalse(Order.objects.filter(id__in=self.unassigned, delivery_crew__isnull=False).exists())
+
+    def test_managers_only(self):
+        self.client.force_authenticate(self.crew[0])
+        self.assertEqual(self.assign().status_code, 403)
+
+
+class AsyncURLs:
+    # The project's URLs with the async routes in front, as they are with
+    # LITTLELEMON_ASYNC_VIEWS on
+    urlpatterns = [path("api/", include(async_urlpatterns)), path("", include(settings.ROOT_URLCONF))]
+
+
+@override_settings(ROOT_URLCONF=AsyncURLs, **TEST_STORES)
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from rest_framework.authtoken.models import Token
+        cls.customer = User.objects.create_user("customer")
+        cls.other = User.objects.create_user("other")
+        category = Category.objects.create(slug="mains", title="Mains")
+        cls.items = MenuItem.objects.bulk_create([
+            MenuItem(title="A", price=Decimal("2.50"), featured=False, category=category),
+            MenuItem(title="B", price=Decimal("4.00"), featured=True, category=category),
+        ])
+        cls.headers = {"Authorization": f"Token {Token.objects.create(user=cls.customer).key}"}
+        cls.other_order = Order.objects.create(user=cls.other, total=Decimal("1.00"), date=date(2024, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+
+    def test_routes_are_async(self):
+        from inspect import iscoroutinefunction
+        from django.urls import resolve
+        for name, args in [("menu-collection", []), ("menu-single", [1]), ("cart", []), ("cart-summary", []),
+                           ("order-collection", []), ("order-single", [1])]:
+            with self.subTest(name):
+                self.assertTrue(iscoroutinefunction(resolve(reverse(name, args=args)).func))
+
+    async def test_menu(self):
+        response = await self.async_client.get(reverse("menu-collection"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["title"] for row in response.json()["results"]], ["A", "B"])
+        response = await self.async_client.get(reverse("menu-single", args=[self.items[1].id]))
+        self.assertEqual((response.status_code, response.json()["title"]), (200, "B"))
+        response = await self.async_client.get(reverse("menu-single", args=[0]))
+        self.assertEqual(response.status_code, 404)
+        # Writes fall through to the sync view and its permissions
+        response = await self.async_client.delete(reverse("menu-single", args=[self.items[0].id]), headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+
+    async def test_cart(self):
+        response = await self.async_client.post(reverse("cart"), [
+            {"menuitem_id": self.items[0].id, "quantity": 2}, {"menuitem_id": self.items[1].id, "quantity": 1},
+        ], content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        response = await self.async_client.get(reverse("cart"), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted((row["menuitem"]["id"], row["quantity"]) for row in response.json()["results"]),
+                         [(self.items[0].id, 2), (self.items[1].id, 1)])
+        response = await self.async_client.get(reverse("cart-summary"), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        self.assertEqual((summary["items"], summary["lines"], summary["subtotal"]), (3, 2, "9.00"))
+        response = await self.async_client.delete(reverse("cart"), headers=self.headers)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(await Cart.objects.filter(user=self.customer).aexists())
+        response = await self.async_client.get(reverse("cart"))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_orders(self):
+        await Cart.objects.acreate(user=self.customer, menuitem=self.items[0], quantity=2,
+                                   unit_price=Decimal("2.50"), price=Decimal("5.00"))
+        response = await self.async_client.post(reverse("order-collection"), headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        order = await Order.objects.aget(user=self.customer)
+        self.assertEqual(order.total, Decimal("5.00"))
+        response = await self.async_client.get(reverse("order-collection"), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.json()["results"]], [order.id])
+        response = await self.async_client.get(reverse("order-single", args=[order.id]), headers=self.headers)
+        self.assertEqual((response.status_code, response.json()["id"]), (200, order.id))
+        # Other customers' orders stay hidden
+        response = await self.async_client.get(reverse("order-single", args=[self.other_order.id]), headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(**TEST_STORES)
+class MenuSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(slug="mains", title="Mains")
+        for title in ["Burger", "Cheeseburger", "Veggie Burger", "Pasta"]:
+            MenuItem.objects.create(title=title, price=Decimal("5.00"), featured=False, category=category)
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.client = APIClient()
+
+    def search(self, term):
+        response = self.client.get(reverse("menu-collection"), {"search": term})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["title"] for row in response.json()["results"])
+
+    def test_word_prefixes_use_the_index(self):
+        from .search import search_index_available
+        expected = ["Burger", "Veggie Burger"] if search_index_available() else ["Burger", "Cheeseburger", "Veggie Burger"]
+        self.assertEqual(self.search("burg"), expected)
+
+    def test_substrings_fall_back_to_icontains(self):
+        self.assertEqual(self.search("urger"), ["Burger", "Cheeseburger", "Veggie Burger"])
+        self.assertEqual(self.search("sta"), ["Pasta"])
+        self.assertEqual(self.search("sushi"), [])
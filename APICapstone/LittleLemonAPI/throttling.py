@@ -0,0 +1,143 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+# Token bucket throttles whose buckets live in a SQLite file shared by every
+# worker process on the host, so N workers enforce the configured rate once
+# instead of N times. A check is a single UPSERT ... RETURNING statement that
+# refills the bucket for the time since its last request, takes the
+# request's cost if there are enough tokens and reports whether it did, so
+# it costs the same however busy the client is.
+#
+# Configured from REST_FRAMEWORK:
+#   DEFAULT_THROTTLE_RATES  the rate for each scope, as for DRF's throttles;
+#                           "100/day" is a bucket of 100 tokens refilled
+#                           over a day
+#   THROTTLE_COSTS          tokens taken by "<ViewName>.<action>", default 1
+#   THROTTLE_STORE          path of the bucket file, or ":memory:" for a
+#                           store private to each thread (tests)
+DEFAULT_STORE = "throttle.sqlite3"
+# Buckets idle for longer than their refill period are full again, so a
+# small share of requests delete those rows to keep the table bounded
+PURGE_PROBABILITY = 0.001
+
+TAKE_SQL = """
+INSERT INTO bucket (key, tokens, stamp, granted)
+VALUES (:key, CASE WHEN :cost <= :capacity THEN :capacity - :cost ELSE :capacity END, :now, :cost <= :capacity)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = min(:capacity, tokens + max(0, :now - stamp) * :rate)
+        - CASE WHEN min(:capacity, tokens + max(0, :now - stamp) * :rate) >= :cost THEN :cost ELSE 0 END,
+    granted = min(:capacity, tokens + max(0, :now - stamp) * :rate) >= :cost,
+    stamp = max(stamp, :now)
+RETURNING granted, tokens
+"""
+
+
+class BucketStore:
+    def __init__(self, location):
+        self.location = str(location)
+        self.local = threading.local()
+
+    def connection(self):
+        # One connection per thread, reopened in forked workers
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.location, timeout=5, isolation_level=None, check_same_thread=False)
+            if self.location != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            # Losing the last few buckets in a crash only forgives a few
+            # requests, so do not wait for the disk
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bucket ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL, granted INTEGER NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, capacity, rate, cost, now=None):
+        # Returns (granted, tokens left)
+        params = {"key": key, "capacity": capacity, "rate": rate, "cost": cost,
+                  "now": time.time() if now is None else now}
+        granted, tokens = self.connection().execute(TAKE_SQL, params).fetchone()
+        return bool(granted), tokens
+
+    def purge(self, prefix, older_than):
+        self.connection().execute(
+            "DELETE FROM bucket WHERE key >= ? AND key < ? AND stamp < ?",
+            (prefix, prefix + "\uffff", older_than),
+        )
+
+    def clear(self):
+        self.connection().execute("DELETE FROM bucket")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                location = rest_framework_setting("THROTTLE_STORE", None)
+                _store = BucketStore(location or os.path.join(settings.BASE_DIR, DEFAULT_STORE))
+    return _store
+
+
+@receiver(setting_changed)
+def _reset_store(setting, **kwargs):
+    global _store
+    if setting == "REST_FRAMEWORK":
+        _store = None
+
+
+def rest_framework_setting(name, default):
+    # DRF's api_settings rejects keys it does not know
+    return getattr(settings, "REST_FRAMEWORK", {}).get(name, default)
+
+
+def get_cost(request, view):
+    name = getattr(view, "action", None) or request.method.lower()
+    return rest_framework_setting("THROTTLE_COSTS", {}).get(f"{type(view).__name__}.{name}", 1)
+
+
+class BucketThrottleMixin:
+    # Drop-in replacement for SimpleRateThrottle.allow_request/wait, for
+    # throttles that keep their scope, rate and cache key logic
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        store = get_store()
+        self.cost = get_cost(request, view)
+        granted, self.tokens = store.take(self.key, self.num_requests, self.num_requests / self.duration, self.cost)
+        if random.random() < PURGE_PROBABILITY:
+            store.purge(self.cache_format % {"scope": self.scope, "ident": ""}, time.time() - self.duration)
+        return granted
+
+    def wait(self):
+        if self.cost > self.num_requests:
+            return None
+        return (self.cost - self.tokens) * self.duration / self.num_requests
+
+
+class AnonBucketThrottle(BucketThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class UserBucketThrottle(BucketThrottleMixin, UserRateThrottle):
+    pass
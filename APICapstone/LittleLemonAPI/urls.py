@@ -1,6 +1,8 @@
 from django.contrib import admin
 from . import views
+from .menu_import import CSVParser
 from django.urls import path, include
+from django.conf import settings
 
 urlpatterns = [
     path('', include('djoser.urls')),
@@ -8,6 +10,9 @@ urlpatterns = [
             'get': 'list',
             'post': 'create',
         }), name="menu-collection"),
+    path('menu-items/import',views.MenuItemsViewSet.as_view({
+            'post': 'bulk_import',
+        }, parser_classes=views.MenuItemsViewSet.parser_classes + [CSVParser]), name="menu-import"),
     path('menu-items/<int:pk>',views.MenuItemsViewSet.as_view({
             'get': 'retrieve',
             'put': 'update',
@@ -33,15 +38,42 @@ urlpatterns = [
             'post': 'create',
             'delete': 'clear',
         }), name="cart"),
+    path('cart/summary',views.CartViewSet.as_view({
+            'get': 'summary',
+        }), name="cart-summary"),
     path('orders',views.OrderViewSet.as_view({
             'get': 'list',
             'post': 'order',
         }), name="order-collection"),
+    path('orders/export.<str:export_format>',views.OrderViewSet.as_view({
+            'get': 'export',
+        }), name="order-export"),
+    path('orders/assign',views.OrderViewSet.as_view({
+            'post': 'assign',
+        }), name="order-assign"),
+    path('orders/status',views.OrderViewSet.as_view({
+            'patch': 'batch_status',
+        }), name="order-status"),
     path('orders/<int:pk>',views.OrderViewSet.as_view({
             'get': 'retrieve',
             'put': 'update',
             'patch': 'partial_update',
             'delete': 'destroy',
         }), name="order-single"),
+    path('reports/sales/daily',views.SalesReportViewSet.as_view({
+            'get': 'daily',
+        }), name="sales-daily"),
+    path('reports/sales/menu-items',views.SalesReportViewSet.as_view({
+            'get': 'menu_items',
+        }), name="sales-menu-items"),
+    path('reports/sales/categories',views.SalesReportViewSet.as_view({
+            'get': 'categories',
+        }), name="sales-categories"),
 ]
 
+
+if settings.LITTLELEMON_ASYNC_VIEWS:
+    # Under ASGI, serve the hot endpoints with native async views. Methods
+    # they do not handle fall through to the sync views above.
+    from .async_views import urlpatterns as async_urlpatterns
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -1,27 +1,59 @@
 from django.shortcuts import render
-from datetime import date
 from rest_framework import generics, viewsets, status
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
-from django.contrib.auth.models import User, Group
-from django.db import IntegrityError
+from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
 from .models import MenuItem, Cart, Order, OrderItem
+from .cart import add_to_cart, summary_queryset, summarize
+from .checkout import place_order
+from .assignment import assign_orders
+from .order_status import set_status, UPDATED
+from . import reports
+from .catalog import CatalogCacheMixin
+from .renderers import StreamingListMixin, streaming_content
+from .replicas import ReplicaReadsMixin, current_replica
+from .writes import write_transaction
+from .pagination import KeysetPagination
+from .search import MenuItemSearchFilter
+from .export import EXPORT_FORMATS
+from .menu_import import import_rows, import_menu_items
+from .roles import MANAGER, DELIVERY_CREW, get_roles, get_group, invalidate_roles
 from .permissions import MenuItemPermissions, ManagerPermissions, CartPermissions, OrderPermissions
-from .serializers import MenuItemSerializer, UserSerializer, CartSerializer, OrderSerializer, ManagerOrderSerializer, DeliveryCrewOrderSerializer
+from .serializers import MenuItemSerializer, UserSerializer, CartSerializer, CartLineSerializer, CartSummarySerializer, OrderSerializer, ManagerOrderSerializer, DeliveryCrewOrderSerializer, OrderExportSerializer, OrderAssignmentSerializer, OrderStatusBatchSerializer
+from .serializers import SalesReportSerializer, DailySalesSerializer, DailySalesTotalsSerializer, MenuItemSalesSerializer, CategorySalesSerializer, SalesTotalsSerializer
 
 # Create your views here.
-class MenuItemsViewSet(viewsets.ModelViewSet):
-    queryset = MenuItem.objects.all()
+class MenuItemsViewSet(ReplicaReadsMixin, CatalogCacheMixin, viewsets.ModelViewSet):
+    replica_actions = ("list", "retrieve")
+    queryset = MenuItem.objects.select_related("category")
     serializer_class = MenuItemSerializer
     search_fields = ['title', 'price', 'featured']
+    filter_backends = [DjangoFilterBackend, OrderingFilter, MenuItemSearchFilter]
     filterset_fields = ['category']
     ordering_fields = ['price']
     permission_classes = [MenuItemPermissions] 
+    pagination_class = KeysetPagination
+    keyset_ordering = ["id"]
+    
+    def bulk_import(self, request, *args, **kwargs):
+        
+        # Validate the whole batch, then upsert it in one transaction
+        result, errors = import_menu_items(import_rows(request.data))
+        
+        # Report invalid rows by their position and write nothing
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
 
 class ManagerViewSet(viewsets.ModelViewSet):
     
-    queryset = User.objects.filter(groups__name="Manager")
+    queryset = User.objects.filter(groups__name="Manager").prefetch_related("groups")
     serializer_class = UserSerializer
     permission_classes = [ManagerPermissions] 
     
@@ -48,10 +80,11 @@ class ManagerViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
             
         # Get Manager group
-        manager_group = Group.objects.get(name="Manager")
+        manager_group = get_group(MANAGER)
         
         # Add user to the Manager group
         user.groups.add(manager_group)
+        invalidate_roles(user)
         
         # Return that user has been added
         return Response(UserSerializer(user).data, status=status.HTTP_201_CREATED)
@@ -66,10 +99,11 @@ class ManagerViewSet(viewsets.ModelViewSet):
             return Response({"detail": "User is not in the Manager group."},
                             status=status.HTTP_400_BAD_REQUEST)
         # Get manager group
-        manager_group = Group.objects.get(name="Manager")
+        manager_group = get_group(MANAGER)
 
         # Remove user from group
         user.groups.remove(manager_group)
+        invalidate_roles(user)
         
         # Return 200 response that tells client that user has been removed from manager group
         return Response({"detail": f"User {user.username} removed from Manager group."},
@@ -77,7 +111,7 @@ class ManagerViewSet(viewsets.ModelViewSet):
         
 class DeliveryCrewViewSet(viewsets.ModelViewSet):
     
-    queryset = User.objects.filter(groups__name="Delivery Crew")
+    queryset = User.objects.filter(groups__name="Delivery Crew").prefetch_related("groups")
     serializer_class = UserSerializer
     permission_classes = [ManagerPermissions] 
     
@@ -104,10 +138,11 @@ class DeliveryCrewViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
             
         # Get Delivery Crew group
-        delivery_crew_group = Group.objects.get(name="Delivery Crew")
+        delivery_crew_group = get_group(DELIVERY_CREW)
         
         # Add user to the Deliver Crew group
         user.groups.add(delivery_crew_group)
+        invalidate_roles(user)
         
         # Return that user has been added
         return Response(UserSerializer(user).data, status=status.HTTP_201_CREATED)
@@ -123,126 +158,184 @@ class DeliveryCrewViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
             
         # Get Delivery Crew group
-        delivery_crew_group = Group.objects.get(name="Delivery Crew")
+        delivery_crew_group = get_group(DELIVERY_CREW)
 
         # Remove user from group
         user.groups.remove(delivery_crew_group)
+        invalidate_roles(user)
         
         # Return 200 response that tells client that user has been removed from Delivery Crew group
         return Response({"detail": f"User {user.username} removed from Delivery Crew group."},
                         status=status.HTTP_200_OK)
         
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated, CartPermissions]
     
     def get_queryset(self):
         # Only return cart items for the logged-in user
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.filter(user=self.request.user).select_related("menuitem__category")
         
     
     def create(self, request, *args, **kwargs):
         
-        # Validate input with serializer
-        serializer = self.get_serializer(data=request.data)
+        # Take one line, or a list of lines to add in one go
+        many = isinstance(request.data, list)
+        serializer = CartLineSerializer(data=request.data, many=many)
         serializer.is_valid(raise_exception=True)
+        lines = serializer.validated_data if many else [serializer.validated_data]
         
-        # then the validated menu item is at:
-        menuitem = serializer.validated_data["menuitem"]
-        # Quantity
-        quantity = serializer.validated_data["quantity"]
-
-        # Prices
-        unit_price = menuitem.price  # Decimal
-        price = unit_price * quantity  # Decimal * int is fine
-
-        # Insert user’s cart line (unique_together: (menuitem, user))
-        try:
-            cart_item = Cart.objects.create(
-                user=request.user,
-                menuitem=menuitem,
-                quantity=quantity,
-                unit_price=unit_price,
-                price=price
-            )
-        except IntegrityError:
-            return Response(
-                {"detail": "This menu item is already in your cart"},
-                status=status.HTTP_400_BAD_REQUEST)
+        # Insert new lines and add to the quantity of lines already in the cart
+        cart_items, missing = add_to_cart(request.user, [(line["menuitem_id"], line["quantity"]) for line in lines])
+        
+        # Report unknown menu items the way a PrimaryKeyRelatedField would
+        if missing:
+            errors = {
+                index: {"menuitem_id": [f'Invalid pk "{line["menuitem_id"]}" - object does not exist.']}
+                for index, line in enumerate(lines) if line["menuitem_id"] in missing
+            }
+            raise ValidationError(errors if many else errors[0])
             
-        # Return the saved object using the read serializer
-        read_data = self.get_serializer(cart_item).data
-        return Response(read_data, status=status.HTTP_201_CREATED)      
+        # Return the saved objects using the read serializer
+        read_data = self.get_serializer(cart_items, many=True).data
+        return Response(read_data if many else read_data[0], status=status.HTTP_201_CREATED)      
     
     def clear(self, request, *args, **kwargs):
-        self.get_queryset().delete()
+        with write_transaction():
+            self.get_queryset().delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
     
-class OrderViewSet(viewsets.ModelViewSet):
+    def summary(self, request, *args, **kwargs):
+        # Item count, subtotal and per-category breakdown in one query
+        summary = summarize(summary_queryset(request.user))
+        return Response(CartSummarySerializer(summary).data)
+    
+class OrderViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
+    replica_actions = ("list", "retrieve", "export")
     permission_classes = [OrderPermissions]
+    pagination_class = KeysetPagination
+    keyset_ordering = ["-date", "-id"]
+    
+    def get_permissions(self):
+        # Only managers can export and assign orders
+        if self.action in ("export", "assign"):
+            return [ManagerPermissions()]
+        return super().get_permissions()
     
     def get_serializer_class(self):
-        if self.request.user.is_superuser or self.request.user.groups.filter(name="Manager").exists():
+        roles = get_roles(self.request.user)
+        if roles.can_manage:
             return ManagerOrderSerializer
-        elif self.request.user.groups.filter(name="Delivery Crew").exists():
+        elif roles.is_delivery_crew:
             return DeliveryCrewOrderSerializer
         else:
             return OrderSerializer
     
     def get_queryset(self):
         # Only return cart items for the logged-in user
-        if self.request.user.is_superuser or self.request.user.groups.filter(name="Manager").exists():
-            return Order.objects.all().prefetch_related("orderitem_set__menuitem")
-        elif self.request.user.groups.filter(name="Delivery Crew").exists():
-            return Order.objects.filter(delivery_crew=self.request.user).prefetch_related("orderitem_set__menuitem")
+        roles = get_roles(self.request.user)
+        if roles.can_manage:
+            orders = Order.objects.all()
+        elif roles.is_delivery_crew:
+            orders = Order.objects.filter(delivery_crew=self.request.user)
         else:
-            return Order.objects.filter(user=self.request.user).prefetch_related("orderitem_set__menuitem")
+            orders = Order.objects.filter(user=self.request.user)
+        
+        # Load users, items, menu items and categories in a fixed number of queries
+        return orders.select_related("user", "delivery_crew").prefetch_related(
+            Prefetch("orderitem_set", queryset=OrderItem.objects.select_related("menuitem__category"))
+        )
     
     def order(self, request, *args, **kwargs):
         
-        if request.user.groups.exists():
+        if get_roles(request.user).in_any_group:
             return Response({"detail": "Only customers can order"}, 
                             status=status.HTTP_403_FORBIDDEN)
         
-        # Get cart for this user
-        user_cart = Cart.objects.filter(user=request.user)
+        # Move the cart into a new order in one transaction
+        new_order = place_order(request.user)
         
-        # If there are no items in cart, in order should not be created
-        if not user_cart.exists():
+        # If there were no items in cart, no order was created
+        if new_order is None:
             return Response("No items in cart to order", status=status.HTTP_400_BAD_REQUEST)
         
-        # Make new Order
-        new_order = Order.objects.create(
-            user = request.user,
-            delivery_crew = None,
-            status = False,
-            total = 0,
-            date = date.today()
-        )
+        # Let user know order was made
+        return Response({"detail": "Order created successfully"}, status=status.HTTP_201_CREATED)
+    
+    def assign(self, request, *args, **kwargs):
         
-        total = 0
+        params = OrderAssignmentSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
         
-        # Make new OrderItem for every item in cart
-        for item in user_cart:
-            OrderItem.objects.create(
-                order = new_order,
-                menuitem = item.menuitem,
-                quantity = item.quantity,
-                unit_price = item.unit_price,
-            )
-            
-            # Update order total price based on price (qunaitity * unit_price)
-            total += item.price
-            
-        new_order.total = total
-        new_order.save()
+        # Spread the open, unassigned orders over the delivery crew in one transaction
+        assignments, errors = assign_orders(params.validated_data.get("delivery_crew_ids"),
+                                            params.validated_data.get("limit"))
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "assigned": len(assignments),
+            "assignments": [{"id": order_id, "delivery_crew_id": crew_id} for order_id, crew_id in assignments],
+        }, status=status.HTTP_200_OK)
+    
+    def batch_status(self, request, *args, **kwargs):
         
-        # Delete all items in the user's cart
-        user_cart.delete()
+        params = OrderStatusBatchSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
         
-        # Let user know order was made
-        return Response({"detail": "Order created successfully"}, status=status.HTTP_201_CREATED)
+        # One UPDATE for every order the user may change, without loading the orders
+        results = set_status(request.user, params.validated_data["ids"], params.validated_data["status"])
+        return Response({
+            "updated": sum(result == UPDATED for result in results.values()),
+            "results": results,
+        }, status=status.HTTP_200_OK)
+    
+    def perform_update(self, serializer):
+        # A status change moves the order between rollup rows, so take it out
+        # of the sales rollups as it was and add it back as it is now
+        order = serializer.instance
+        moved = serializer.validated_data.get("status", order.status) != order.status
+        with write_transaction():
+            if moved:
+                reports.remove_orders([order.id])
+            serializer.save()
+            if moved:
+                reports.add_orders([order.id])
+    
+    def perform_destroy(self, instance):
+        # Take the order out of the sales rollups while its items still exist
+        with write_transaction():
+            reports.remove_orders([instance.id])
+            instance.delete()
+    
+    def export(self, request, export_format, *args, **kwargs):
+        
+        if export_format not in EXPORT_FORMATS:
+            raise Http404
+        
+        # Validate the filters given as query params
+        params = OrderExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        
+        # Pinned to this request's database, as the export is read after the view returns
+        orders = Order.objects.using(current_replica())
+        if filters.get("date_from"):
+            orders = orders.filter(date__gte=filters["date_from"])
+        if filters.get("date_to"):
+            orders = orders.filter(date__lte=filters["date_to"])
+        if filters.get("status") is not None:
+            orders = orders.filter(status=filters["status"])
+        if filters.get("delivery_crew_id"):
+            orders = orders.filter(delivery_crew_id=filters["delivery_crew_id"])
+        if filters.get("unassigned"):
+            orders = orders.filter(delivery_crew__isnull=True)
+        
+        # Stream the orders out chunk by chunk instead of building the response in memory
+        lines, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(streaming_content(request, lines(orders)), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="orders.{export_format}"'
+        return response
             
             
         
@@ -250,4 +343,34 @@ class OrderViewSet(viewsets.ModelViewSet):
     
         
         
-        
\ No newline at end of file
+        
+
+class SalesReportViewSet(ReplicaReadsMixin, StreamingListMixin, viewsets.ViewSet):
+    permission_classes = [ManagerPermissions]
+    replica_actions = ("daily", "menu_items", "categories")
+    
+    # Sales reports for managers, read from the daily rollups kept by reports.py
+    # so a year of orders costs a few hundred rows instead of every order item
+    def report(self, rows, serializer_class, totals_serializer_class):
+        totals = reports.totals(rows, totals_serializer_class().fields)
+        return Response({
+            "totals": totals_serializer_class(totals).data,
+            "results": serializer_class(rows, many=True).data,
+        })
+    
+    def get_filters(self, request):
+        params = SalesReportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+    
+    def daily(self, request, *args, **kwargs):
+        rows = reports.daily_sales(**self.get_filters(request))
+        return self.report(rows, DailySalesSerializer, DailySalesTotalsSerializer)
+    
+    def menu_items(self, request, *args, **kwargs):
+        rows = reports.menu_item_sales(**self.get_filters(request))
+        return self.report(rows, MenuItemSalesSerializer, SalesTotalsSerializer)
+    
+    def categories(self, request, *args, **kwargs):
+        rows = reports.category_sales(**self.get_filters(request))
+        return self.report(rows, CategorySalesSerializer, SalesTotalsSerializer)
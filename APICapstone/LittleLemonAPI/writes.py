@@ -0,0 +1,28 @@
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# SQLite has a single writer. When threads of the same process write at
+# once, all but one wait in SQLite's busy handler, which sleeps and polls
+# the database file and fails with "database is locked" once busy_timeout
+# runs out. write_transaction() queues those threads on a lock instead, so
+# each write starts as soon as the previous one commits. Readers do not
+# take the lock, and with WAL they are not blocked by the writer either.
+#
+# The lock is reentrant, so write paths can call each other, and is per
+# process: writes from other worker processes still wait on busy_timeout.
+_locks = {}
+
+
+@contextmanager
+def write_transaction(using=None):
+    # transaction.atomic(), run one at a time per database on SQLite
+    using = using or DEFAULT_DB_ALIAS
+    if connections[using].vendor != "sqlite" or not getattr(settings, "LITTLELEMON_SQLITE_WRITE_QUEUE", True):
+        with transaction.atomic(using=using):
+            yield
+        return
+    lock = _locks.get(using) or _locks.setdefault(using, threading.RLock())
+    with lock, transaction.atomic(using=using):
+        yield
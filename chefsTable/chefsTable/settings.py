@@ -83,7 +83,11 @@ DATABASES = {
         'PORT': '3306',   
         'OPTIONS': {   
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"   
-        }   
+        },
+        # Keep connections open between requests instead of reconnecting
+        # to MySQL every time
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }   
 } 
 
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 
 from pathlib import Path
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -76,13 +78,38 @@ WSGI_APPLICATION = 'littlelemon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# SQLite tuned for concurrent requests: WAL so readers are not blocked by a
+# write, BEGIN IMMEDIATE so writers queue on busy_timeout instead of failing
+# with "database is locked", and connections kept open between requests.
+# The pragmas are run on every new connection by the restaurant app (see
+# restaurant/apps.py), since the init_command option needs Django 5.1;
+# transaction_mode needs it too, so older versions keep deferred BEGINs.
+#
+# journal_mode = WAL is stored in the database file: the first connection
+# rewrites the header of the committed db.sqlite3, which then shows as
+# modified in git, and creates db.sqlite3-wal and db.sqlite3-shm next to it
+# (both ignored). Run "git checkout db.sqlite3" to drop the change.
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+if django.VERSION >= (5, 1):
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+
 # The settings for media files have been updated for the Graded assessment
 MEDIA_URL = '/media/'
 
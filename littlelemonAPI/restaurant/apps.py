@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    # settings.SQLITE_PRAGMAS, run on every new SQLite connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for pragma in getattr(settings, 'SQLITE_PRAGMAS', []):
+                cursor.execute(pragma)
 
 
 class RestaurantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurant'
+
+    def ready(self):
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='restaurant.apply_sqlite_pragmas')